@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Time of flattening the allOf compositions of the Asana spec, with and without reusing merged schemas.
+
+The unmemoized flattener merges a referenced schema again for every reference, as a flattener
+that inlines references one by one does; its output is the same, but shares no nodes.
+
+Usage: python benchmarks/bench_allof.py [--factor N] [--repeat N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from synthetic_spec import ASANA_SPEC, write_synthetic_json
+from openapi_allof import AllOfFlattener
+from openapi_operations import load_openapi_spec
+
+
+class UnmemoizedFlattener(AllOfFlattener):
+    """Flattener that forgets every flattened node, so that each reference is merged again."""
+
+    def flatten(self, data):
+        self._memo.clear()
+        return super().flatten(data)
+
+
+def count_containers(data, seen):
+    """Return the number of distinct containers in a tree, counting shared ones once."""
+    if not isinstance(data, (dict, list)) or id(data) in seen:
+        return 0
+    seen.add(id(data))
+    values = data.values() if isinstance(data, dict) else data
+    return 1 + sum(count_containers(value, seen) for value in values)
+
+
+def measure(spec, flattener_class, repeat):
+    """Print the best time of flattening a spec, and the size of the result."""
+    best = None
+    for _ in range(repeat):
+        flattener = flattener_class(spec)
+        start = time.perf_counter()
+        result = flattener.flatten(spec)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    containers = count_containers(result, set())
+    print(f"  {flattener_class.__name__:<20} {best:7.3f} s  merged {flattener.merged:5d}  kept {flattener.kept:3d}  "
+          f"containers {containers:9d}  JSON {len(json.dumps(result)) / 2**20:6.1f} MiB")
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--factor", type=int, default=20, help="Size of the synthetic spec relative to Asana")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of which the best one is reported")
+    args = parser.parse_args()
+
+    synthetic = write_synthetic_json(os.path.join(tempfile.gettempdir(), f"asana_x{args.factor}.json"), args.factor)
+    for file_path in (ASANA_SPEC, synthetic):
+        spec = load_openapi_spec(file_path)
+        print(f"{os.path.basename(file_path)} ({os.path.getsize(file_path) / 2**20:.1f} MiB, "
+              f"{count_containers(spec, set())} containers)")
+        memoized = measure(spec, AllOfFlattener, args.repeat)
+        unmemoized = measure(spec, UnmemoizedFlattener, args.repeat)
+        assert json.dumps(memoized) == json.dumps(unmemoized)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
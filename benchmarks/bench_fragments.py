@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Time of writing the shards of a specification with json.dumps and from a fragment cache.
+
+Usage: python benchmarks/bench_fragments.py [--repeat N] [--split-by tag|path-prefix] [FILE]
+"""
+import gc
+import io
+import sys
+import json
+import time
+import argparse
+from synthetic_spec import ASANA_SPEC
+from openapi_fragments import FragmentCache
+from openapi_operations import load_openapi_spec
+from openapi_refs import build_reference_graph, split_openapi_spec
+
+
+def write_shards(shards, fragments=None) -> None:
+    """Serialize every shard, from the fragment cache if one is given."""
+    for shard in shards.values():
+        if fragments is None:
+            json.dumps(shard, indent=2)
+        else:
+            fragments.write(shard, io.StringIO())
+
+
+def measure(label: str, run, repeat: int) -> None:
+    """Print the best wall time of a run out of repeat runs."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    print(f"  {label:<24} {min(times):6.3f} s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", nargs="?", default=ASANA_SPEC, help="Specification to split")
+    parser.add_argument("--split-by", choices=["tag", "path-prefix"], default="tag", help="How to split")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs; the best one is reported")
+    args = parser.parse_args()
+
+    spec = load_openapi_spec(args.file)
+    shards = split_openapi_spec(spec, args.split_by, build_reference_graph(spec))
+    print(f"{args.file}: {len(shards)} shards by {args.split_by}")
+    measure("json.dumps", lambda: write_shards(shards), args.repeat)
+    measure("fragments, cold cache", lambda: write_shards(shards, FragmentCache()), args.repeat)
+    warm = FragmentCache()
+    write_shards(shards, warm)
+    measure("fragments, warm cache", lambda: write_shards(shards, warm), args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
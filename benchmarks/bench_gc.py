@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Time that the cyclic garbage collector costs when specifications are loaded and transformed.
+
+The first part runs the pipeline of the console application (load, remove descriptions and
+extensions, flatten allOf, serialize) with the collector enabled throughout, as it was before
+paused_gc(), and with the collector paused. The second part keeps a spec loaded, as the daemon
+and long-lived SubsetGenerator instances do, and generates path subsets with the collector
+enabled, before and after freezing the loaded spec.
+
+Usage: python benchmarks/bench_gc.py [--factor N] [--repeat N] [--runs N]
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+from contextlib import contextmanager
+from synthetic_spec import ASANA_SPEC, write_synthetic_json
+from gc_control import freeze_loaded_objects, paused_gc
+from openapi_allof import flatten_allof
+from openapi_lazy import extract_paths_subset
+from openapi_operations import load_openapi_spec, remove_descriptions, remove_extensions
+
+
+class CollectionTimer:
+    """Measures the time spent in collections, through gc.callbacks."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.collections = [0, 0, 0]
+        self._start = 0.0
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        else:
+            self.seconds += time.perf_counter() - self._start
+            self.collections[info['generation']] += 1
+
+    @contextmanager
+    def measure(self):
+        """Measure the collections of a block, starting from zero."""
+        self.seconds, self.collections = 0.0, [0, 0, 0]
+        gc.callbacks.append(self)
+        try:
+            yield self
+        finally:
+            gc.callbacks.remove(self)
+
+
+@contextmanager
+def collector_left_enabled():
+    """Make paused_gc() leave the collector enabled, as the code ran before it was used."""
+    disable = gc.disable
+    gc.disable = lambda: None
+    try:
+        yield
+    finally:
+        gc.disable = disable
+
+
+def run_pipeline(file_path):
+    """Load, transform and serialize a spec as the console application does."""
+    spec = load_openapi_spec(file_path)
+    spec = remove_descriptions(spec, in_place=True)
+    spec = remove_extensions(spec, in_place=True)
+    return len(json.dumps(flatten_allof(spec)))
+
+
+def measure_pipeline(file_path, timer, repeat):
+    """Print the best time of the pipeline, and of its collections, with the collector enabled and paused."""
+    for label, context in (("enabled", collector_left_enabled), ("paused", paused_gc)):
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            with context(), timer.measure():
+                start = time.perf_counter()
+                run_pipeline(file_path)
+                elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, timer.seconds, timer.collections)
+        print(f"  collector {label:<8} {best[0]:6.2f} s  in collections {best[1]:5.2f} s  "
+              f"collections by generation {best[2]}")
+
+
+def measure_long_lived(spec, paths, runs, timer, label):
+    """Print the time of generating path subsets of a loaded spec, and of their collections."""
+    with timer.measure():
+        start = time.perf_counter()
+        for run in range(runs):
+            subset = extract_paths_subset(spec, paths[run % len(paths):][:10])
+            json.dumps(remove_descriptions(subset))
+        elapsed = time.perf_counter() - start
+    print(f"  {label:<17} {elapsed:6.2f} s  in collections {timer.seconds:5.2f} s  "
+          f"collections by generation {timer.collections}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--factor", type=int, default=20, help="Size of the synthetic spec relative to Asana")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of pipeline runs of which the best one is reported")
+    parser.add_argument("--runs", type=int, default=100, help="Number of subsets generated from the loaded spec")
+    args = parser.parse_args()
+
+    timer = CollectionTimer()
+    synthetic = write_synthetic_json(os.path.join(tempfile.gettempdir(), f"asana_x{args.factor}.json"), args.factor)
+    for file_path in (ASANA_SPEC, synthetic):
+        print(f"Pipeline on {os.path.basename(file_path)} ({os.path.getsize(file_path) / 2**20:.1f} MiB)")
+        measure_pipeline(file_path, timer, args.repeat)
+
+    print(f"{args.runs} path subsets of the loaded {os.path.basename(synthetic)}")
+    spec = load_openapi_spec(synthetic)
+    paths = list(spec['paths'])
+    gc.collect()
+    measure_long_lived(spec, paths, args.runs, timer, "spec not frozen")
+    freeze_loaded_objects()
+    measure_long_lived(spec, paths, args.runs, timer, "spec frozen")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
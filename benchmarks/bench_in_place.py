@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Peak memory of removing descriptions and extensions from a loaded specification, by copying and in place.
+
+Usage: python benchmarks/bench_in_place.py [--factor N]
+"""
+import os
+import gc
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from synthetic_spec import ASANA_SPEC, write_synthetic_json
+from openapi_operations import load_openapi_spec, remove_descriptions, remove_extensions
+
+
+def measure(file_path: str, in_place: bool) -> None:
+    """Print the tracemalloc peak of loading a spec and removing its fields, and the time of the removal."""
+    gc.collect()
+    tracemalloc.start()
+    spec = load_openapi_spec(file_path)
+    loaded, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    spec = remove_descriptions(spec, in_place=in_place)
+    spec = remove_extensions(spec, in_place=in_place)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del spec
+    print(f"  {'in place' if in_place else 'copying':<10} loaded {loaded / 2**20:8.1f} MiB  "
+          f"peak {peak / 2**20:8.1f} MiB  retained {current / 2**20:8.1f} MiB  removal {elapsed:6.2f} s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--factor", type=int, default=20, help="Size of the synthetic spec relative to Asana")
+    args = parser.parse_args()
+
+    synthetic = write_synthetic_json(os.path.join(tempfile.gettempdir(), f"asana_x{args.factor}.json"), args.factor)
+    for file_path in (ASANA_SPEC, synthetic):
+        print(f"{os.path.basename(file_path)} ({os.path.getsize(file_path) / 2**20:.1f} MiB)")
+        measure(file_path, in_place=False)
+        measure(file_path, in_place=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
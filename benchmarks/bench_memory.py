@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Peak memory of loading a specification with and without the compact node representation.
+
+Usage: python benchmarks/bench_memory.py [--factor N]
+"""
+import os
+import gc
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from synthetic_spec import ASANA_SPEC, write_synthetic_json
+from openapi_operations import load_openapi_spec
+
+
+def measure(file_path: str, **options) -> None:
+    """Print the tracemalloc peak and wall time of loading a spec."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    spec = load_openapi_spec(file_path, **options)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del spec
+    print(f"  {str(options):<24} retained {current / 2**20:8.1f} MiB  peak {peak / 2**20:8.1f} MiB  {elapsed:6.2f} s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--factor", type=int, default=100, help="Size of the synthetic spec relative to Asana")
+    args = parser.parse_args()
+
+    synthetic = write_synthetic_json(os.path.join(tempfile.gettempdir(), f"asana_x{args.factor}.json"), args.factor)
+    for file_path in (ASANA_SPEC, synthetic):
+        print(f"{os.path.basename(file_path)} ({os.path.getsize(file_path) / 2**20:.1f} MiB)")
+        measure(file_path)
+        measure(file_path, compact=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Time of loading a YAML specification with yaml.safe_load and with the loaders of the app.
+
+Usage: python benchmarks/bench_yaml_scalars.py [--repeat N] [FILE]
+"""
+import gc
+import sys
+import time
+import argparse
+import yaml
+from synthetic_spec import ASANA_SPEC
+from openapi_operations import load_openapi_spec
+
+
+def measure(label: str, load, repeat: int) -> None:
+    """Print the best wall time of a load out of repeat runs."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    print(f"  {label:<32} {min(times):6.2f} s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", nargs="?", default=ASANA_SPEC, help="YAML specification to load")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs; the best one is reported")
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as f:
+        content = f.read()
+    print(f"{args.file} ({len(content) / 2**20:.1f} MiB), libyaml {'available' if yaml.__with_libyaml__ else 'missing'}")
+    measure("yaml.safe_load", lambda: yaml.safe_load(content), args.repeat)
+    measure("load_openapi_spec", lambda: load_openapi_spec(args.file), args.repeat)
+    measure("load_openapi_spec json_scalars", lambda: load_openapi_spec(args.file, json_scalars=True), args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Synthetic large OpenAPI specifications for benchmarks, built by replicating the Asana spec.
+"""
+import os
+import sys
+import json
+from typing import Dict, Any
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_DIR = os.path.join(REPO_ROOT, 'build')
+ASANA_SPEC = os.path.join(REPO_ROOT, 'asana_oas.yaml')
+
+if BUILD_DIR not in sys.path:
+    sys.path.insert(0, BUILD_DIR)
+
+from compact_nodes import to_builtin
+
+
+def _rename_refs(data: Any, suffix: str) -> Any:
+    """Return a copy of data in which every component reference points to the suffixed component."""
+    if isinstance(data, dict):
+        return {
+            key: (value + suffix if key == '$ref' and isinstance(value, str) and value.startswith('#/components/')
+                  else _rename_refs(value, suffix))
+            for key, value in data.items()
+        }
+    elif isinstance(data, list):
+        return [_rename_refs(item, suffix) for item in data]
+    return data
+
+
+def make_synthetic_spec(spec: Dict[str, Any], factor: int) -> Dict[str, Any]:
+    """
+    Build a specification with factor copies of every path item and component.
+
+    Copy i renames paths to '/v{i}/...' and components to '<name>_{i}', with references
+    rewritten accordingly, so the reference structure of the original is preserved.
+    """
+    spec = json.loads(json.dumps(spec, default=to_builtin))
+    result = {key: value for key, value in spec.items() if key not in ('paths', 'components')}
+    result['paths'] = {}
+    result['components'] = {section: {} for section in spec.get('components', {})}
+    for i in range(factor):
+        suffix = f"_{i}"
+        for path, item in spec['paths'].items():
+            result['paths'][f"/v{i}{path}"] = _rename_refs(item, suffix)
+        for section, entries in spec.get('components', {}).items():
+            for name, component in entries.items():
+                # Security schemes are referenced by name, not by $ref, so they are not replicated
+                if section == 'securitySchemes':
+                    result['components'][section][name] = component
+                else:
+                    result['components'][section][name + suffix] = _rename_refs(component, suffix)
+    return result
+
+
+def write_synthetic_json(file_path: str, factor: int) -> str:
+    """Write a synthetic specification built from the Asana spec as JSON, unless it already exists."""
+    if not os.path.exists(file_path):
+        from openapi_operations import load_openapi_spec
+        spec = make_synthetic_spec(load_openapi_spec(ASANA_SPEC), factor)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(spec, f)
+    return file_path
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory representation of OpenAPI specification nodes.
+
+Most mappings in an OpenAPI specification are small and share the same handful of keys
+(type, description, properties, $ref, ...). A CompactMapping stores such a mapping as a tuple
+of keys, shared between all mappings with the same keys in the same order, and a tuple of
+values, which takes a fraction of the memory of a dict.
+"""
+import yaml
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, List, Tuple
+
+
+# Mappings with more keys than this are kept as dicts, where lookups do not degrade
+COMPACT_MAX_KEYS = 8
+
+# Strings up to this length are interned by the loaders; longer strings are rarely repeated
+INTERN_MAX_LENGTH = 64
+
+
+class CompactMapping(Mapping):
+    """Immutable, ordered mapping backed by a shared key tuple and a value tuple."""
+
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, keys: Tuple[Any, ...], values: Tuple[Any, ...]):
+        self._keys = keys
+        self._values = values
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        return self._values
+
+    def items(self):
+        return zip(self._keys, self._values)
+
+    def __repr__(self) -> str:
+        return f"CompactMapping({dict(self.items())!r})"
+
+
+# Types that the transforms and the output layer treat as mappings
+MAPPING_TYPES = (dict, CompactMapping)
+
+
+class Interner:
+    """Deduplicates keys, short strings and key tuples while a specification is loaded."""
+
+    def __init__(self):
+        self._strings: Dict[str, str] = {}
+        self._key_tuples: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+
+    def string(self, value: str) -> str:
+        """Return the shared instance of a string if it is short enough to be worth sharing."""
+        if len(value) > INTERN_MAX_LENGTH:
+            return value
+        return self._strings.setdefault(value, value)
+
+    def mapping(self, pairs: List[Tuple[Any, Any]]) -> Any:
+        """
+        Build a mapping from key-value pairs, compact if it is small enough.
+
+        Args:
+            pairs: The key-value pairs in document order
+
+        Returns:
+            A CompactMapping for small mappings, otherwise a dict
+        """
+        if len(pairs) > COMPACT_MAX_KEYS or not pairs:
+            return dict(pairs)
+        keys, values = zip(*pairs)
+        shared_keys = self._key_tuples.get(keys)
+        if shared_keys is None:
+            if len(set(keys)) != len(keys):
+                # Later duplicates win, as in a dict
+                return self.mapping(list(dict(pairs).items()))
+            shared_keys = self._key_tuples.setdefault(keys, keys)
+        return CompactMapping(shared_keys, values)
+
+    def json_object_pairs_hook(self, pairs: List[Tuple[str, Any]]) -> Any:
+        """Object hook for json.loads that builds compact mappings with interned string values."""
+        strings = self._strings
+        return self.mapping([
+            (key, strings.setdefault(value, value) if type(value) is str and len(value) <= INTERN_MAX_LENGTH else value)
+            for key, value in pairs
+        ])
+
+
+def to_builtin(value: Any) -> Any:
+    """
+    Convert a compact node to the builtin type json.dump can serialize.
+
+    Intended as the default hook of json.dump.
+
+    Args:
+        value: An object json.dump does not know how to serialize
+
+    Returns:
+        A dict with the same items
+
+    Raises:
+        TypeError: If the value is not a compact node
+    """
+    if isinstance(value, CompactMapping):
+        return dict(value.items())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _represent_compact_mapping(dumper: yaml.Dumper, data: CompactMapping) -> yaml.Node:
+    """Represent a compact mapping as a regular YAML mapping."""
+    return dumper.represent_mapping('tag:yaml.org,2002:map', data.items())
+
+
+yaml.add_representer(CompactMapping, _represent_compact_mapping, Dumper=yaml.Dumper)
+yaml.add_representer(CompactMapping, _represent_compact_mapping, Dumper=yaml.SafeDumper)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Transparent compression of OpenAPI specification files with the stdlib codecs.
+"""
+import os
+import io
+import bz2
+import gzip
+import lzma
+from typing import Any, Optional
+
+
+COMPRESSION_FORMATS = ('gzip', 'bz2', 'xz')
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.lzma': 'xz',
+}
+
+# Leading bytes of each compressed format; lzma.LZMAFile also reads the legacy .lzma format
+_MAGIC_NUMBERS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x5d\x00\x00', 'xz'),
+)
+
+# gzip at level 6 is several times faster than the default of 9 for a few percent in size
+GZIP_COMPRESS_LEVEL = 6
+
+
+def strip_compression_extension(file_path: str) -> str:
+    """
+    Remove a compression extension from a file path, e.g. 'spec.yaml.gz' -> 'spec.yaml'.
+
+    Args:
+        file_path: The file path
+
+    Returns:
+        The file path without its compression extension, if it has one
+    """
+    root, extension = os.path.splitext(file_path)
+    return root if extension.lower() in COMPRESSION_EXTENSIONS else file_path
+
+
+def compression_from_extension(file_path: str) -> Optional[str]:
+    """
+    Determine the compression format of a file from its extension.
+
+    Args:
+        file_path: The file path
+
+    Returns:
+        The compression format, or None if the extension is not a compression extension
+    """
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+
+def compression_from_magic(header: bytes) -> Optional[str]:
+    """
+    Determine the compression format of content from its leading bytes.
+
+    Args:
+        header: The first bytes of the content (at least 6 for a reliable result)
+
+    Returns:
+        The compression format, or None if the content is not compressed
+    """
+    for magic, compression in _MAGIC_NUMBERS:
+        if header[:len(magic)] == magic:
+            return compression
+    return None
+
+
+def detect_compression(file_path: str, raw: Any) -> Optional[str]:
+    """
+    Determine the compression format of an open file from its extension or its magic number.
+
+    Args:
+        file_path: Path of the file
+        raw: The file opened in binary mode; the magic number is peeked without consuming it
+
+    Returns:
+        The compression format, or None if the file is not compressed
+    """
+    compression = compression_from_extension(file_path)
+    if compression is None and hasattr(raw, 'peek'):
+        compression = compression_from_magic(raw.peek(6)[:6])
+    return compression
+
+
+def open_decompressing_reader(raw: Any, compression: str) -> Any:
+    """
+    Wrap a binary stream so that reading from it decompresses incrementally.
+
+    Args:
+        raw: Readable binary stream of compressed data
+        compression: One of COMPRESSION_FORMATS
+
+    Returns:
+        Readable binary stream of the decompressed data
+    """
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(raw, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(raw, mode='rb')
+    raise ValueError(f"Unsupported compression format: {compression}")
+
+
+def open_compressing_writer(raw: Any, compression: str) -> Any:
+    """
+    Wrap a binary stream so that text written to it is compressed incrementally.
+
+    The output is deterministic: gzip headers carry neither a file name nor a timestamp,
+    so identical specifications compress to identical bytes.
+
+    Args:
+        raw: Writable binary stream
+        compression: One of COMPRESSION_FORMATS
+
+    Returns:
+        Writable UTF-8 text stream; closing it finishes the compressed stream but leaves raw open
+    """
+    if compression == 'gzip':
+        compressed = gzip.GzipFile(filename='', fileobj=raw, mode='wb', compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+    elif compression == 'bz2':
+        compressed = bz2.BZ2File(raw, mode='wb')
+    elif compression == 'xz':
+        compressed = lzma.LZMAFile(raw, mode='wb')
+    else:
+        raise ValueError(f"Unsupported compression format: {compression}")
+    return io.TextIOWrapper(compressed, encoding='utf-8')
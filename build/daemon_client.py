@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Client side of the local daemon that runs the console application with its modules imported.
+
+The console application hands its command line to a running daemon (see subset_daemon) before
+it imports anything else, and writes what the daemon streams back to its own standard output
+and standard error. When no daemon is running, the application runs in-process as usual.
+
+This module only imports the standard library modules needed for talking to the daemon.
+
+Protocol, over a Unix stream socket:
+
+- The client sends one JSON line: {"argv": [...], "cwd": "..."}
+- The daemon answers with frames of a channel byte, a 4-byte big-endian payload length and the
+  payload: b'o' for standard output, b'e' for standard error and, last, b'x' with the exit
+  code in ASCII
+
+The client only connects to a socket that the current user owns, and, where the platform tells,
+that a process of the current user listens on, since the default socket may be in a shared
+directory such as /tmp where another user could create it first.
+"""
+import os
+import sys
+import json
+import stat
+import socket
+import struct
+from typing import Any, List, Optional
+
+# Path of the socket, overriding the default one
+SOCKET_ENV = 'OPENAPI_SUBSET_DAEMON_SOCKET'
+# If set to a non-empty value, the console application never hands its runs to the daemon
+NO_DAEMON_ENV = 'OPENAPI_SUBSET_NO_DAEMON'
+
+STDOUT_CHANNEL = b'o'
+STDERR_CHANNEL = b'e'
+EXIT_CHANNEL = b'x'
+
+_FRAME_HEADER = struct.Struct('>cI')
+
+# Commands that read standard input, which the daemon cannot read, run in-process
+_STDIN_ARGUMENT = '-'
+
+
+class DaemonProtocolError(ValueError):
+    """Raised when the response of the daemon does not follow the protocol."""
+
+
+def daemon_socket_path() -> str:
+    """Return the path of the daemon socket of the current user."""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    directory = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(directory, f'openapi-subset-generator-{os.getuid()}.sock')
+
+
+def send_frame(sock: socket.socket, channel: bytes, payload: bytes) -> None:
+    """Send a frame of the response to the client."""
+    sock.sendall(_FRAME_HEADER.pack(channel, len(payload)) + payload)
+
+
+def _owned_by_current_user(socket_path: str) -> Optional[bool]:
+    """Return whether a path is a socket owned by the current user, or None if there is nothing at the path."""
+    try:
+        status = os.lstat(socket_path)
+    except FileNotFoundError:
+        return None
+    return stat.S_ISSOCK(status.st_mode) and status.st_uid == os.getuid()
+
+
+def _peer_is_current_user(sock: socket.socket) -> bool:
+    """Return whether the process listening on a connected socket runs as the current user, where this can be told."""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return True
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    _pid, uid, _gid = struct.unpack('3i', credentials)
+    return uid == os.getuid()
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Receive exactly size bytes, or return None if the connection is closed first."""
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def delegate_to_daemon(argv: List[str], socket_path: Optional[str] = None) -> Optional[int]:
+    """
+    Run the console application in the daemon, if one is running.
+
+    Args:
+        argv: The command line arguments of the console application
+        socket_path: Path of the daemon socket (defaults to daemon_socket_path())
+
+    Returns:
+        The exit code of the run, or None if it has to run in-process: no daemon of the current
+        user is running, it failed before sending any output, or the command reads standard input
+    """
+    if os.environ.get(NO_DAEMON_ENV) or _STDIN_ARGUMENT in argv:
+        return None
+    socket_path = socket_path or daemon_socket_path()
+    owned = _owned_by_current_user(socket_path)
+    if owned is None:
+        return None
+    if not owned:
+        sys.stderr.write(f"Warning: Ignoring {socket_path}, which is not a socket of the current user.\n")
+        return None
+
+    # Bind the streams before the daemon gets the request; it may redirect sys.stdout when it runs in this process
+    streams = {STDOUT_CHANNEL: sys.stdout, STDERR_CHANNEL: sys.stderr}
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+            if not _peer_is_current_user(sock):
+                sys.stderr.write(f"Warning: Ignoring {socket_path}, on which another user listens.\n")
+                return None
+            request = json.dumps({'argv': list(argv), 'cwd': os.getcwd()}) + '\n'
+            sock.sendall(request.encode('utf-8'))
+        except OSError:
+            return None
+        answered = False
+        while True:
+            header = _receive_exactly(sock, _FRAME_HEADER.size)
+            if header is None:
+                break
+            channel, size = _FRAME_HEADER.unpack(header)
+            payload = _receive_exactly(sock, size)
+            if payload is None:
+                break
+            if channel == EXIT_CHANNEL:
+                return _parse_exit_code(payload)
+            if channel not in streams:
+                raise DaemonProtocolError(f"Unexpected channel {channel!r} in the response of the daemon")
+            answered = True
+            _write_binary(streams[channel], payload)
+    except DaemonProtocolError as e:
+        streams[STDERR_CHANNEL].write(f"Error: {e}\n")
+        return 1
+    finally:
+        sock.close()
+
+    if not answered:
+        return None
+    sys.stderr.write("Error: The daemon stopped before the command completed.\n")
+    return 1
+
+
+def _parse_exit_code(payload: bytes) -> int:
+    """Return the exit code sent by the daemon."""
+    try:
+        return int(payload)
+    except ValueError:
+        raise DaemonProtocolError(f"Invalid exit code {payload!r} in the response of the daemon")
+
+
+def _write_binary(stream: Any, payload: bytes) -> None:
+    """Write bytes to a text stream, through its binary buffer."""
+    stream.flush()
+    stream.buffer.write(payload)
+    stream.buffer.flush()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Control of the cyclic garbage collector around the allocation bursts of loading and transforming specifications.
+
+Loading a specification allocates millions of containers, and every few hundred of them the
+cyclic garbage collector runs; the full collections among those runs scan every container that
+is alive, although the trees that are built contain no reference cycles and are freed by
+reference counting alone. Pausing the collector while a tree is built avoids these scans.
+
+Only the loading is paused: the rest of a run, and of the daemon serving many runs, creates
+reference cycles too, such as those of exceptions and their tracebacks, which must be collected.
+
+Specifications that stay loaded, such as those cached by the daemon, can also be moved out of
+the collector's view with freeze_loaded_objects(), so that the collections triggered by later
+work do not scan them again.
+"""
+import gc
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+_lock = threading.Lock()
+# Number of paused_gc() blocks being run, and whether the collector was enabled before the first
+_pauses = 0
+_enabled_before = False
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """
+    Disable the cyclic garbage collector while the block runs.
+
+    Blocks can be nested and run from several threads at once; the collector is enabled again
+    when the last of them ends, if it was enabled when the first one started. Reference
+    counting still frees every object that is not part of a reference cycle.
+
+    Can also be used as a decorator.
+    """
+    global _pauses, _enabled_before
+    with _lock:
+        if _pauses == 0:
+            _enabled_before = gc.isenabled()
+            gc.disable()
+        _pauses += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _pauses -= 1
+            if _pauses == 0 and _enabled_before:
+                gc.enable()
+
+
+def freeze_loaded_objects() -> None:
+    """
+    Move all the objects that are tracked by the garbage collector into its permanent generation.
+
+    The collector does not scan the frozen objects again. They are still freed by reference
+    counting when they are no longer used, but reference cycles among them are never collected,
+    so this is meant for processes that keep large acyclic trees loaded, such as the daemon.
+    Unreachable objects are collected first, so that only live objects are frozen.
+    """
+    gc.collect()
+    gc.freeze()
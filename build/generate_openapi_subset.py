@@ -3,40 +3,122 @@
 Entry point for the console application.
 """
 import sys
+
+if __name__ == "__main__":
+    # Hand the run to a running daemon before importing the modules that it keeps imported
+    from daemon_client import delegate_to_daemon
+    _daemon_exit_code = delegate_to_daemon(sys.argv[1:])
+    if _daemon_exit_code is not None:
+        sys.exit(_daemon_exit_code)
+
 import os
+import json
 import logging
 import argparse
+import functools
 from openapi_operations import (
+    LoadLimits,
+    Projection,
+    SpecLimitError,
+    JSON_EXTENSIONS,
+    YAML_EXTENSIONS,
+    STDIN_PATH,
     load_openapi_spec,
+    save_openapi_spec,
     remove_descriptions,
     remove_extensions,
-    output_openapi_spec_to_stdout
+    output_openapi_spec_to_stdout,
+    output_compressed_openapi_spec_to_stdout,
+    output_openapi_spec_as_ndjson,
+    write_openapi_spec_shards
 )
+from openapi_refs import HTTP_METHODS, SelectionNotFoundError, build_reference_graph, split_openapi_spec
+from openapi_budget import apply_size_budget, budget_from_limits
+from openapi_parallel import PARALLEL_MIN_INPUT_BYTES, input_size, write_openapi_spec_parallel
+from openapi_index import build_openapi_index, open_openapi_index
+from openapi_allof import flatten_allof
+from openapi_lazy import extract_paths_subset, load_openapi_paths_subset, load_openapi_pointers_subset
+from openapi_pointers import parse_json_pointer, select_json_pointers
+from openapi_inventory import compute_inventory
+from openapi_rules import filter_rules_from_options
+from compression import COMPRESSION_FORMATS, compression_from_extension, strip_compression_extension
+from profiling import profile_call
+
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Program name in usage messages and logger name of the application, the same whether it runs as
+# a script, in the daemon or embedded, so that their output is identical
+PROG = 'generate_openapi_subset.py'
+LOGGER_NAME = '__main__'
 
 
 def setup_logging():
     """Configure logging for the application."""
     logging.basicConfig(
         level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format=LOG_FORMAT,
         handlers=[logging.StreamHandler()]
     )
-    return logging.getLogger(__name__)
+    return logging.getLogger(LOGGER_NAME)
+
+
+def add_profile_arguments(parser):
+    """
+    Add the profiling options, which every command accepts, to a parser.
+
+    Args:
+        parser: The parser of a command
+    """
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="OUT",
+        help="Profile the run with cProfile and write OUT.pstats and OUT.collapsed (collapsed stacks "
+             "for flame-graph tools)"
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        default=False,
+        help="With --profile, also trace allocations and write the top allocation sites to OUT.tracemalloc.txt"
+    )
 
 
-def parse_arguments():
+def parse_arguments(argv=None):
     """
     Parse command line arguments.
     
+    Args:
+        argv: The arguments to parse; defaults to sys.argv[1:]
+
     Returns:
         argparse.Namespace: Parsed command line arguments
     """
     parser = argparse.ArgumentParser(
+        prog=PROG,
         description="Process an OpenAPI specification file."
     )
     parser.add_argument(
         "openapi_spec",
-        help="Path to the OpenAPI specification file (JSON or YAML format)"
+        help="Path to the OpenAPI specification file (JSON or YAML format), or '-' to read it from stdin"
+    )
+    parser.add_argument(
+        "--path",
+        action="append",
+        dest="paths",
+        default=None,
+        help="Keep only the operations of this path, with the components they reference; can be repeated"
+    )
+    parser.add_argument(
+        "--select",
+        action="append",
+        dest="selects",
+        default=None,
+        metavar="POINTER",
+        help="Keep only the node at this JSON pointer, such as '/components/schemas/Task' or '/paths/~1tasks', "
+             "with the components it references; the openapi and info members are always kept, so the "
+             "result is an OpenAPI document that the other options apply to; can be repeated"
     )
     parser.add_argument(
         "--remove-descriptions",
@@ -50,68 +132,544 @@ def parse_arguments():
         default=False,
         help="Remove OpenAPI Extensions (properties starting with x-) from the specification"
     )
+    parser.add_argument(
+        "--flatten-allof",
+        action="store_true",
+        default=False,
+        help="Merge allOf compositions into single schemas, inlining the component schemas they reference"
+    )
+    parser.add_argument(
+        "--drop",
+        action="append",
+        default=None,
+        metavar="PATTERN",
+        help="Remove the entries whose key path matches the pattern, such as '/**/example' or '/**/x-*'; "
+             "a pattern ending with [KEY=VALUE] only matches mappings whose KEY has the JSON VALUE, such as "
+             "'/paths/*/*[deprecated=true]' for the deprecated operations; can be repeated"
+    )
+    parser.add_argument(
+        "--keep",
+        action="append",
+        default=None,
+        metavar="PATTERN",
+        help="Keep the entries whose key path matches the pattern even if --drop, --remove-descriptions "
+             "or --remove-extensions would remove them; takes conditions as --drop does; can be repeated"
+    )
     parser.add_argument(
         "--yaml",
         action="store_true",
         default=False,
         help="Output the OpenAPI specification in YAML format instead of JSON"
     )
+    parser.add_argument(
+        "--max-input-size",
+        type=int,
+        default=LoadLimits.max_input_bytes,
+        help="Reject inputs larger than the given number of bytes"
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        default=LoadLimits.max_nodes,
+        help="Reject inputs with more nodes than given, counting every expansion of a YAML alias"
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=LoadLimits.max_depth,
+        help="Reject inputs nested deeper than given"
+    )
+    parser.add_argument(
+        "--max-alias-expansions",
+        type=int,
+        default=LoadLimits.max_alias_expansions,
+        help=f"Reject YAML inputs whose aliases expand to more nodes than given "
+             f"(default: {LoadLimits.max_alias_expansions})"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        default=False,
+        help="Use a compact in-memory representation to reduce peak memory on large specifications"
+    )
+    parser.add_argument(
+        "--json-scalars",
+        action="store_true",
+        default=False,
+        help="Recognize only null, booleans, integers and floats in plain YAML scalars and keep everything "
+             "else, such as dates, as strings; also parses YAML faster"
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        default=False,
+        help="Read the OpenAPI specification file through a memory mapping to reduce peak memory"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Transform and serialize large specifications (from 8 MiB) in this many worker processes"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Write the OpenAPI specification to the given file instead of stdout; "
+             "the format is inferred from the extension (.json, .yaml or .yml)"
+    )
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSION_FORMATS,
+        default=None,
+        help="Compress the output; inferred from the extension of --output (.gz, .bz2, .xz) if not given"
+    )
+    parser.add_argument(
+        "--no-yaml-aliases",
+        action="store_true",
+        default=False,
+        help="Write shared nodes in full instead of as YAML anchors and aliases"
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        default=False,
+        help="Output one JSON line per operation with the names of the components it references"
+    )
+    parser.add_argument(
+        "--inventory",
+        action="store_true",
+        default=False,
+        help="Output a JSON summary of operation counts, component sizes, $ref fan-in and fan-out, "
+             "and the bytes each removal option would save, instead of the spec; cannot be combined with "
+             "the removal options"
+    )
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        default=None,
+        help="Trim the JSON output until it fits into the given number of bytes"
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help="Trim the JSON output until it fits into the given estimated number of tokens"
+    )
+    parser.add_argument(
+        "--split-by",
+        choices=["tag", "path-prefix"],
+        default=None,
+        help="Write one self-contained subset per tag or per first path segment (requires --output-dir)"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=None,
+        help="Directory to write the shards to when --split-by is used"
+    )
+    add_profile_arguments(parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.output is not None:
+        # The extension of the output file decides the format
+        extension = os.path.splitext(strip_compression_extension(args.output))[1].lower()
+        if extension in YAML_EXTENSIONS:
+            args.yaml = True
+        elif extension in JSON_EXTENSIONS:
+            args.yaml = False
+        if args.compress is None:
+            args.compress = compression_from_extension(args.output)
+        if args.split_by or args.ndjson:
+            parser.error("--output cannot be combined with --split-by or --ndjson")
+    if args.compress and (args.split_by or args.ndjson):
+        parser.error("--compress cannot be combined with --split-by or --ndjson")
+    if (args.split_by is None) != (args.output_dir is None):
+        parser.error("--split-by and --output-dir must be used together")
+    if args.ndjson and (args.yaml or args.split_by):
+        parser.error("--ndjson cannot be combined with --yaml or --split-by")
+    if (args.max_bytes is not None or args.max_tokens is not None) and (args.yaml or args.ndjson or args.split_by):
+        parser.error("--max-bytes and --max-tokens only apply to the JSON output")
+    if args.jobs is not None:
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        if args.yaml or args.ndjson or args.split_by or args.max_bytes is not None or args.max_tokens is not None:
+            parser.error("--jobs only applies to the JSON output without --max-bytes or --max-tokens")
+    try:
+        filter_rules_from_options(args.drop, args.keep)
+        for pointer in args.selects or []:
+            parse_json_pointer(pointer)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.selects and args.paths:
+        parser.error("--select cannot be combined with --path")
+    if args.inventory and (args.output or args.compress or args.yaml or args.ndjson or args.split_by or args.jobs
+                           or args.max_bytes is not None or args.max_tokens is not None):
+        parser.error("--inventory cannot be combined with output options")
+    if args.inventory and (args.remove_descriptions or args.remove_extensions):
+        # The removals would happen before the inventory, which reports what they save
+        parser.error("--inventory cannot be combined with --remove-descriptions or --remove-extensions")
+    if args.profile_memory and not args.profile:
+        parser.error("--profile-memory requires --profile")
     
     # Return the parsed arguments
     return args
 
 
-def main():
+# Subcommands that work with a persistent index instead of parsing the specification
+INDEX_COMMANDS = ('index', 'get')
+
+
+def is_index_command(argv):
     """
-    Main entry point for the application.
-    
+    Return whether a command line runs one of the index subcommands.
+
+    A first argument that names an existing file is the specification file, so that files
+    named like a subcommand can still be processed.
+
+    Args:
+        argv: The command line arguments
+
+    Returns:
+        bool: True if the first argument is a subcommand
+    """
+    return bool(argv) and argv[0] in INDEX_COMMANDS and not os.path.exists(argv[0])
+
+
+def parse_index_arguments(argv=None):
+    """
+    Parse the command line arguments of the index subcommands.
+
+    Args:
+        argv: The arguments to parse, starting with the subcommand; defaults to sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description="Build or query a persistent index of an OpenAPI specification file."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser(
+        "index",
+        help="Build or rebuild the index of an OpenAPI specification file"
+    )
+    get_parser = subparsers.add_parser(
+        "get",
+        help="Output the subset for operations, read from the index, which is rebuilt if the file changed"
+    )
+    for subparser in (index_parser, get_parser):
+        subparser.add_argument(
+            "openapi_spec",
+            help="Path to the OpenAPI specification file (JSON or YAML format)"
+        )
+        subparser.add_argument(
+            "--index-file",
+            default=None,
+            help="Path of the index file (defaults to the specification path with an .index.sqlite suffix)"
+        )
+        add_profile_arguments(subparser)
+
+    selection = get_parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument(
+        "--operation-id",
+        action="append",
+        dest="operation_ids",
+        help="operationId of an operation to include; can be repeated"
+    )
+    selection.add_argument(
+        "--path",
+        help="Path whose operations to include"
+    )
+    get_parser.add_argument(
+        "--method",
+        choices=HTTP_METHODS,
+        default=None,
+        help="Method of the operation to include from --path"
+    )
+    get_parser.add_argument(
+        "--remove-descriptions",
+        action="store_true",
+        default=False,
+        help="Remove description fields from the subset"
+    )
+    get_parser.add_argument(
+        "--remove-extensions",
+        action="store_true",
+        default=False,
+        help="Remove OpenAPI Extensions (properties starting with x-) from the subset"
+    )
+    get_parser.add_argument(
+        "--yaml",
+        action="store_true",
+        default=False,
+        help="Output in YAML format instead of JSON"
+    )
+    get_parser.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Write the subset to this file instead of stdout; .json, .yaml and .yml select the format"
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.profile_memory and not args.profile:
+        parser.error("--profile-memory requires --profile")
+    if args.command == "get":
+        if args.method and not args.path:
+            parser.error("--method requires --path")
+        if args.output is not None:
+            extension = os.path.splitext(strip_compression_extension(args.output))[1].lower()
+            if extension in YAML_EXTENSIONS:
+                args.yaml = True
+            elif extension in JSON_EXTENSIONS:
+                args.yaml = False
+    return args
+
+
+def run_index_command(args, logger):
+    """
+    Run an index subcommand.
+
+    Args:
+        args: Parsed command line arguments, as returned by parse_index_arguments
+        logger: The application logger
+
     Returns:
         int: Exit code (0 for success, non-zero for errors)
     """
+    if not os.path.isfile(args.openapi_spec):
+        logger.error(f"Error: The file '{args.openapi_spec}' does not exist.")
+        return 1
+
     try:
-        logger = setup_logging()
+        if args.command == "index":
+            index_path = build_openapi_index(args.openapi_spec, args.index_file)
+            logger.debug(f"Wrote the index of {args.openapi_spec} to {index_path}")
+            return 0
 
-        # Parse command line arguments
-        args = parse_arguments()
-        
-        # Log the start of the application with the provided file name
-        logger.debug(f"Application started with OpenAPI spec file: {args.openapi_spec}")
-        
-        # Validate that the file exists and is readable
+        index, built = open_openapi_index(args.openapi_spec, args.index_file)
+        with index:
+            if built:
+                logger.debug(f"Built the index of {args.openapi_spec} in {index.index_path}")
+            operations = index.find_operations(args.operation_ids, args.path, args.method)
+            subset = index.subset(operations)
+
+        # The subset is decoded from the index for this run only, so the fields are removed in place
+        if args.remove_descriptions:
+            subset = remove_descriptions(subset, in_place=True)
+        if args.remove_extensions:
+            subset = remove_extensions(subset, in_place=True)
+
+        if args.output:
+            save_openapi_spec(subset, args.output, use_yaml=args.yaml)
+        else:
+            output_openapi_spec_to_stdout(subset, use_yaml=args.yaml)
+    except (SpecLimitError, SelectionNotFoundError) as e:
+        logger.error(f"Error: {str(e)}")
+        return 1
+    except Exception as e:
+        logger.error(f"Error processing OpenAPI spec index: {str(e)}", exc_info=True)
+        return 1
+    return 0
+
+
+def run_subset_command(args, logger, spec_cache=None):
+    """
+    Generate the subset of an OpenAPI specification.
+
+    Args:
+        args: Parsed command line arguments, as returned by parse_arguments
+        logger: The application logger
+        spec_cache: Cache to load the OpenAPI spec from, such as the SpecCache of the daemon;
+            the spec is then loaded in full and never modified
+
+    Returns:
+        int: Exit code (0 for success, non-zero for errors)
+    """
+    # Log the start of the application with the provided file name
+    logger.debug(f"Application started with OpenAPI spec file: {args.openapi_spec}")
+
+    # Validate that the file exists and is readable; standard input is read as it is
+    if args.openapi_spec != STDIN_PATH:
         if not os.path.isfile(args.openapi_spec):
             logger.error(f"Error: The file '{args.openapi_spec}' does not exist.")
             return 1
-        
+
         if not os.access(args.openapi_spec, os.R_OK):
             logger.error(f"Error: The file '{args.openapi_spec}' is not readable.")
             return 1
 
         logger.debug(f"Successfully validated OpenAPI spec file: {args.openapi_spec}")
 
-        # Load the OpenAPI spec
-        try:
-            openapi_spec = load_openapi_spec(args.openapi_spec)
+    # Load the OpenAPI spec
+    try:
+        limits = LoadLimits(
+            max_input_bytes=args.max_input_size,
+            max_nodes=args.max_nodes,
+            max_depth=args.max_depth,
+            max_alias_expansions=args.max_alias_expansions
+        )
+        # Descriptions and extensions are left out while the spec is loaded, unless they are still needed
+        # after loading: --path and --select follow the references within them, and --keep can keep them
+        rules_applied = bool(args.drop or args.keep)
+        selected = bool(args.paths or args.selects)
+        remove_after_load = selected and not rules_applied
+        if args.paths and spec_cache is None:
+            # Only the selected paths are decoded from JSON files
+            openapi_spec = load_openapi_paths_subset(args.openapi_spec, args.paths, compact=args.compact,
+                                                     limits=limits, use_mmap=args.mmap,
+                                                     json_scalars=args.json_scalars)
+        elif args.selects and spec_cache is None:
+            # Only the selected nodes are decoded from JSON files
+            openapi_spec = load_openapi_pointers_subset(args.openapi_spec, args.selects, compact=args.compact,
+                                                        limits=limits, use_mmap=args.mmap,
+                                                        json_scalars=args.json_scalars)
+        else:
+            projection = None
+            if (args.remove_descriptions or args.remove_extensions) and not rules_applied and not selected:
+                projection = Projection(remove_descriptions=args.remove_descriptions,
+                                        remove_extensions=args.remove_extensions)
+            load = load_openapi_spec if spec_cache is None else spec_cache.load
+            openapi_spec = load(args.openapi_spec, compact=args.compact, limits=limits, use_mmap=args.mmap,
+                                projection=projection, json_scalars=args.json_scalars)
+            # The cached spec is complete; the subset is extracted from it
+            if args.paths:
+                openapi_spec = extract_paths_subset(openapi_spec, args.paths)
+            elif args.selects:
+                openapi_spec = select_json_pointers(openapi_spec, args.selects)
+
+        # Apply the filter rules, with the removal options as rules that --keep can make exceptions to
+        if rules_applied:
+            logger.debug("Applying the filter rules to the OpenAPI spec")
+            rules = filter_rules_from_options(args.drop, args.keep, remove_descriptions=args.remove_descriptions,
+                                              remove_extensions=args.remove_extensions)
+            openapi_spec = rules.apply(openapi_spec)
+
+        # Merge the allOf compositions; the result shares the unchanged nodes of the loaded spec
+        if args.flatten_allof:
+            logger.debug("Flattening the allOf compositions of the OpenAPI spec")
+            openapi_spec = flatten_allof(openapi_spec)
 
-            # Remove descriptions if requested
-            if args.remove_descriptions:
-                logger.debug("Removing description fields from the OpenAPI spec")
-                openapi_spec = remove_descriptions(openapi_spec)
+        # Large specs are transformed and serialized by worker processes while they are written
+        writer = None
+        if args.jobs is not None and args.jobs > 1 and input_size(args.openapi_spec) >= PARALLEL_MIN_INPUT_BYTES:
+            logger.debug(f"Transforming the OpenAPI spec with {args.jobs} worker processes")
+            writer = functools.partial(write_openapi_spec_parallel, openapi_spec, jobs=args.jobs,
+                                       remove_descriptions=args.remove_descriptions and remove_after_load,
+                                       remove_extensions=args.remove_extensions and remove_after_load)
 
-            # Remove extensions if requested
-            if args.remove_extensions:
-                logger.debug("Removing extension fields from the OpenAPI spec")
-                openapi_spec = remove_extensions(openapi_spec)
+        # The loaded spec is not used again, so fields are removed in place, unless it is cached for other runs
+        in_place = spec_cache is None
 
+        # Remove descriptions if requested
+        if args.remove_descriptions and remove_after_load and writer is None:
+            logger.debug("Removing description fields from the OpenAPI spec")
+            openapi_spec = remove_descriptions(openapi_spec, in_place=in_place)
+
+        # Remove extensions if requested
+        if args.remove_extensions and remove_after_load and writer is None:
+            logger.debug("Removing extension fields from the OpenAPI spec")
+            openapi_spec = remove_extensions(openapi_spec, in_place=in_place)
+
+        # Trim the OpenAPI spec to fit into the output size budget if requested
+        max_bytes = budget_from_limits(args.max_bytes, args.max_tokens)
+        if max_bytes is not None:
+            openapi_spec, report = apply_size_budget(openapi_spec, max_bytes)
+            for step in report["steps"]:
+                logger.info(f"Size budget: step '{step['step']}' removed {step['removed']} entries "
+                            f"({step['bytes_saved']} bytes)")
+            logger.info(f"Size budget: {report['initial_bytes']} -> {report['final_bytes']} bytes "
+                        f"(limit {max_bytes})")
+            if not report["fits"]:
+                logger.error(f"Error: The OpenAPI spec does not fit into {max_bytes} bytes "
+                             f"even after all trimming steps.")
+                return 1
+
+        if args.inventory:
+            # Output the statistics of the OpenAPI spec instead of the spec
+            json.dump(compute_inventory(openapi_spec), sys.stdout, indent=2)
+            sys.stdout.write('\n')
+        elif args.split_by:
+            # Write one subset per shard, all computed from a shared reference graph
+            logger.debug(f"Splitting the OpenAPI spec by {args.split_by} into {args.output_dir}")
+            graph = build_reference_graph(openapi_spec)
+            shards = split_openapi_spec(openapi_spec, args.split_by, graph)
+            write_openapi_spec_shards(shards, args.output_dir, use_yaml=args.yaml,
+                                      yaml_aliases=not args.no_yaml_aliases)
+            logger.debug(f"Wrote {len(shards)} shards to {args.output_dir}")
+        elif args.ndjson:
+            # Stream one line per operation to stdout
+            count = output_openapi_spec_as_ndjson(openapi_spec)
+            logger.debug(f"Wrote {count} operations as NDJSON")
+        elif args.output:
+            # Write the OpenAPI spec to the output file, unless it is unchanged
+            if save_openapi_spec(openapi_spec, args.output, use_yaml=args.yaml,
+                                 yaml_aliases=not args.no_yaml_aliases, compression=args.compress,
+                                 writer=writer):
+                logger.debug(f"Wrote the OpenAPI spec to {args.output}")
+            else:
+                logger.debug(f"The OpenAPI spec in {args.output} is up to date")
+        elif args.compress:
+            # Output the compressed OpenAPI spec to stdout
+            output_compressed_openapi_spec_to_stdout(openapi_spec, args.compress, use_yaml=args.yaml,
+                                                     yaml_aliases=not args.no_yaml_aliases, writer=writer)
+        elif writer is not None:
+            # Output the OpenAPI spec to stdout as the workers serialize it
+            writer(sys.stdout)
+        else:
             # Output the OpenAPI spec to stdout in JSON format
-            output_openapi_spec_to_stdout(openapi_spec, use_yaml=args.yaml)
-        except Exception as e:
-            logger.error(f"Error processing OpenAPI spec: {str(e)}", exc_info=True)
-            return 1
+            output_openapi_spec_to_stdout(openapi_spec, use_yaml=args.yaml,
+                                          yaml_aliases=not args.no_yaml_aliases)
+    except (SpecLimitError, SelectionNotFoundError) as e:
+        logger.error(f"Error: {str(e)}")
+        return 1
+    except Exception as e:
+        logger.error(f"Error processing OpenAPI spec: {str(e)}", exc_info=True)
+        return 1
+
+    logger.debug("Application completed successfully")
+    return 0
+
+
+def main(argv=None, spec_cache=None):
+    """
+    Main entry point for the application.
+    
+    Args:
+        argv: The command line arguments; defaults to sys.argv[1:]. When they are given, the
+            application is embedded in another program: logging is left as configured by that
+            program, and usage errors return an exit code instead of exiting.
+        spec_cache: Cache to load the OpenAPI spec from, kept by the embedding program across runs
+
+    Returns:
+        int: Exit code (0 for success, non-zero for errors)
+    """
+    try:
+        if argv is None:
+            logger = setup_logging()
+        else:
+            logger = logging.getLogger(LOGGER_NAME)
+
+        # Parse command line arguments
+        command_argv = sys.argv[1:] if argv is None else argv
+        try:
+            if is_index_command(command_argv):
+                args, command = parse_index_arguments(command_argv), run_index_command
+            else:
+                args = parse_arguments(argv)
+                command = functools.partial(run_subset_command, spec_cache=spec_cache)
+        except SystemExit as e:
+            if argv is None:
+                raise
+            return e.code
 
-        logger.debug("Application completed successfully")
-        return 0
+        if args.profile:
+            # Profile the command, keeping its exit code
+            return profile_call(functools.partial(command, args, logger), args.profile,
+                                trace_memory=args.profile_memory)
+        return command(args, logger)
     except Exception as e:
         # If logger is not defined (e.g., setup_logging failed), use root logger
         try:
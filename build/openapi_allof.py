@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Flattening of allOf compositions in OpenAPI specifications.
+
+A schema with allOf is replaced by a single schema that merges the schemas it is composed of,
+with the component schemas they reference inlined. Every component schema is flattened once,
+and each schema that includes it gets its own copy, so that the YAML output does not gain
+anchors and aliases that the source does not have, which many code generators cannot read.
+
+The keywords of the parts are combined: the required names are joined, a property defined by
+several parts must satisfy all their definitions, and for annotations such as description the
+last part wins, and the schema itself over its parts. A keyword that only one part has applies
+to the merged schema, which includes nullable, readOnly and writeOnly, as code generators read
+them. Compositions whose parts assert different values for a keyword, reference schemas that
+cannot be inlined, or include themselves through their references, are left as they are.
+"""
+import logging
+from typing import Dict, Any, List, Set
+from compact_nodes import MAPPING_TYPES
+from openapi_refs import COMPONENT_REF_PREFIX, parse_component_ref
+
+# Keywords that only describe a schema; when merged schemas disagree, the last one wins
+ANNOTATION_KEYWORDS = frozenset(['title', 'description', 'example', 'examples', 'externalDocs', 'deprecated',
+                                 'default'])
+
+
+def _copy_tree(data: Any) -> Any:
+    """Return a copy of a tree of mappings and lists that shares none of them with the original."""
+    if isinstance(data, MAPPING_TYPES):
+        return {key: _copy_tree(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_copy_tree(item) for item in data]
+    return data
+
+
+class _MergeConflict(Exception):
+    """Raised when the parts of a composition cannot be merged into one schema."""
+
+
+class AllOfFlattener:
+    """Flattens the allOf compositions of one specification, remembering every flattened node."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        components = spec.get('components')
+        schemas = components.get('schemas') if isinstance(components, MAPPING_TYPES) else None
+        self._schemas = schemas if isinstance(schemas, MAPPING_TYPES) else {}
+        # Flattened nodes by the id of the original node
+        self._memo: Dict[int, Any] = {}
+        # Ids of the nodes being flattened, which references must not inline again
+        self._active: Set[int] = set()
+        self.merged = 0
+        self.kept = 0
+
+    def flatten(self, data: Any) -> Any:
+        """Return a node with its compositions flattened, sharing the nodes that do not change."""
+        if isinstance(data, MAPPING_TYPES):
+            key = id(data)
+            if key in self._memo:
+                return self._memo[key]
+            self._active.add(key)
+            try:
+                result = {k: self.flatten(v) for k, v in data.items()}
+                unchanged = all(result[k] is v for k, v in data.items())
+                if isinstance(result.get('allOf'), list) and result['allOf']:
+                    try:
+                        result = self._merge_composition(result)
+                        unchanged = False
+                        self.merged += 1
+                    except _MergeConflict:
+                        self.kept += 1
+            finally:
+                self._active.discard(key)
+        elif isinstance(data, list):
+            key = id(data)
+            if key in self._memo:
+                return self._memo[key]
+            result = [self.flatten(item) for item in data]
+            unchanged = all(new is old for new, old in zip(result, data))
+        else:
+            return data
+        if unchanged:
+            result = data
+        self._memo[key] = result
+        return result
+
+    def _resolve(self, schema: Any) -> Any:
+        """Return a part of a composition with the component schema it references flattened and inlined."""
+        followed: Set[str] = set()
+        while isinstance(schema, MAPPING_TYPES) and '$ref' in schema:
+            ref = schema['$ref']
+            component = parse_component_ref(ref)
+            # Only whole component schemas are inlined, not the schemas nested in them
+            if (len(schema) > 1 or component is None or component[0] != 'schemas'
+                    or ref.count('/', len(COMPONENT_REF_PREFIX)) != 1):
+                raise _MergeConflict(ref)
+            target = self._schemas.get(component[1])
+            # A composition cannot include itself, or a schema that is being flattened to include it
+            if target is None or id(target) in self._active or ref in followed:
+                raise _MergeConflict(ref)
+            followed.add(ref)
+            schema = self.flatten(target)
+        return schema
+
+    def _merge_into(self, merged: Dict[Any, Any], schema: Any) -> None:
+        """Merge a flattened schema into the schema merged so far."""
+        resolved = self._resolve(schema)
+        if not isinstance(resolved, MAPPING_TYPES) or 'allOf' in resolved:
+            raise _MergeConflict()
+        # An inlined component schema stays in its place too, so it is copied
+        schema = resolved if resolved is schema else _copy_tree(resolved)
+        for key, value in schema.items():
+            if key not in merged:
+                merged[key] = value
+                continue
+            current = merged[key]
+            if current is value or current == value:
+                continue
+            if key == 'required' and isinstance(current, list) and isinstance(value, list):
+                merged[key] = current + [name for name in value if name not in current]
+            elif key == 'properties' and isinstance(current, MAPPING_TYPES) and isinstance(value, MAPPING_TYPES):
+                merged[key] = self._merge_properties(current, value)
+            elif key in ANNOTATION_KEYWORDS or (isinstance(key, str) and key.startswith('x-')):
+                merged[key] = value
+            else:
+                raise _MergeConflict(key)
+
+    def _merge_properties(self, first: Dict[Any, Any], second: Dict[Any, Any]) -> Dict[Any, Any]:
+        """Merge two properties keywords; a property defined in both must satisfy both definitions."""
+        properties = dict(first)
+        for name, schema in second.items():
+            if name in properties and properties[name] is not schema and properties[name] != schema:
+                schema = self._merge_parts([properties[name], schema])
+            properties[name] = schema
+        return properties
+
+    def _merge_parts(self, parts: List[Any]) -> Any:
+        """Merge schemas into one schema, or compose them with allOf if they cannot be merged."""
+        merged: Dict[Any, Any] = {}
+        try:
+            for part in parts:
+                self._merge_into(merged, part)
+        except _MergeConflict:
+            self.kept += 1
+            return {'allOf': parts}
+        self.merged += 1
+        return merged
+
+    def _merge_composition(self, schema: Dict[Any, Any]) -> Dict[Any, Any]:
+        """
+        Merge a schema with allOf into one schema, in which its own keywords win over those of its parts.
+
+        Raises:
+            _MergeConflict: If the schema cannot be merged
+        """
+        merged: Dict[Any, Any] = {}
+        for part in schema['allOf']:
+            self._merge_into(merged, part)
+        self._merge_into(merged, {key: value for key, value in schema.items() if key != 'allOf'})
+        # The keywords of the parts take the place of allOf among the keywords of the schema
+        result: Dict[Any, Any] = {}
+        for key in schema:
+            for merged_key in (merged if key == 'allOf' else (key,)):
+                if merged_key not in result:
+                    result[merged_key] = merged[merged_key]
+        return result
+
+
+def flatten_allof(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge the allOf compositions of an OpenAPI specification into single schemas.
+
+    Referenced component schemas are inlined into the compositions that include them; the
+    references elsewhere, and the components themselves, are kept.
+
+    Args:
+        spec: The OpenAPI specification, which is not modified
+
+    Returns:
+        The OpenAPI specification with its compositions flattened; it shares the unchanged nodes
+        with the original, and each composition has its own copy of the schemas it inlines
+    """
+    logger = logging.getLogger(__name__)
+    flattener = AllOfFlattener(spec)
+    result = flattener.flatten(spec)
+    logger.debug(f"Flattened {flattener.merged} allOf compositions, kept {flattener.kept}")
+    return result
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Output size budget for OpenAPI specifications.
+
+The size of the JSON output (as written by json.dump with indent=2) is computed once and then
+tracked incrementally: every trimming step subtracts the exact number of bytes of the entries it
+removes, so the document is never re-serialized to check whether it fits.
+"""
+import json
+from typing import Dict, Any, List, Set, Tuple, Callable, Optional
+from compact_nodes import MAPPING_TYPES
+from openapi_refs import (
+    HTTP_METHODS,
+    build_reference_graph,
+    collect_component_refs,
+    iter_operations,
+    resolve_component_closure,
+    security_scheme_names
+)
+
+
+JSON_INDENT = 2
+
+# Estimated number of bytes per token, used by the token variant of the budget
+BYTES_PER_TOKEN = 4
+
+# Trimming steps in the order they are applied
+TRIM_STEPS = ('descriptions', 'extensions', 'examples', 'unused-components', 'operations')
+
+EXAMPLE_KEYS = ('example', 'examples')
+
+
+def serialized_key_size(key: Any) -> int:
+    """Return the serialized size of a mapping key, following json.dump's key coercion."""
+    if isinstance(key, str):
+        return len(json.dumps(key))
+    if key is True:
+        return len('"true"')
+    if key is False:
+        return len('"false"')
+    if key is None:
+        return len('"null"')
+    if isinstance(key, float):
+        return len(json.dumps(float.__repr__(key)))
+    return len(json.dumps(str(key)))
+
+
+def serialized_size(data: Any, depth: int = 0, indent: int = JSON_INDENT) -> int:
+    """
+    Compute the size of a value as serialized by json.dump with the given indent, without serializing it.
+
+    Args:
+        data: The value to measure
+        depth: Nesting depth of the value within the document
+        indent: Number of spaces per indentation level
+
+    Returns:
+        Size of the serialized value in bytes
+    """
+    if isinstance(data, MAPPING_TYPES):
+        if not data:
+            return 2
+        # Braces, the newline and indentation before the closing brace, and the separating commas
+        size = 3 + depth * indent + len(data) - 1
+        entry_indent = 1 + (depth + 1) * indent
+        for key, value in data.items():
+            size += entry_indent + serialized_key_size(key) + 2 + serialized_size(value, depth + 1, indent)
+        return size
+    elif isinstance(data, list):
+        if not data:
+            return 2
+        size = 3 + depth * indent + len(data) - 1
+        entry_indent = 1 + (depth + 1) * indent
+        for item in data:
+            size += entry_indent + serialized_size(item, depth + 1, indent)
+        return size
+    else:
+        return len(json.dumps(data))
+
+
+def removal_saving(remaining: int, removed_costs: List[int], depth: int, indent: int) -> int:
+    """
+    Compute the bytes saved by removing entries from a non-empty container.
+
+    Args:
+        remaining: Number of entries left in the container after the removal
+        removed_costs: Sizes of the removed entries, without their separating commas
+        depth: Nesting depth of the container
+        indent: Number of spaces per indentation level
+
+    Returns:
+        Number of bytes saved
+    """
+    if not removed_costs:
+        return 0
+    saved = sum(removed_costs) + len(removed_costs)
+    if remaining == 0:
+        # '{\n' + entries + '\n' + indent + '}' collapses to '{}'; there is one comma less than entries
+        saved += depth * indent
+    return saved
+
+
+def _entry_cost(key: Any, value: Any, depth: int, indent: int) -> int:
+    """Return the size of a mapping entry within a container at the given depth, without its comma."""
+    return 1 + (depth + 1) * indent + serialized_key_size(key) + 2 + serialized_size(value, depth + 1, indent)
+
+
+def _prune(data: Any, should_drop: Callable[[Any], bool], depth: int, indent: int) -> Tuple[Any, int, int]:
+    """
+    Recursively remove the mapping entries whose key matches a predicate.
+
+    Args:
+        data: The OpenAPI specification or a part of it
+        should_drop: Predicate deciding whether an entry is removed, given its key
+        depth: Nesting depth of data within the document
+        indent: Number of spaces per indentation level
+
+    Returns:
+        Tuple of (pruned data, bytes saved, number of removed entries)
+    """
+    if isinstance(data, MAPPING_TYPES):
+        result = {}
+        saved = 0
+        removed = 0
+        removed_costs = []
+        for key, value in data.items():
+            if isinstance(key, str) and should_drop(key):
+                removed_costs.append(_entry_cost(key, value, depth, indent))
+            else:
+                result[key], child_saved, child_removed = _prune(value, should_drop, depth + 1, indent)
+                saved += child_saved
+                removed += child_removed
+        saved += removal_saving(len(result), removed_costs, depth, indent)
+        return result, saved, removed + len(removed_costs)
+    elif isinstance(data, list):
+        result = []
+        saved = 0
+        removed = 0
+        for item in data:
+            pruned, child_saved, child_removed = _prune(item, should_drop, depth + 1, indent)
+            result.append(pruned)
+            saved += child_saved
+            removed += child_removed
+        return result, saved, removed
+    else:
+        return data, 0, 0
+
+
+def _remove_mapping_entries(mapping: Dict[Any, Any], keys: Set[Any], depth: int, indent: int) -> int:
+    """Remove entries from a mapping in place and return the bytes saved."""
+    removed_costs = [_entry_cost(key, mapping.pop(key), depth, indent) for key in list(mapping) if key in keys]
+    return removal_saving(len(mapping), removed_costs, depth, indent)
+
+
+class _BudgetState:
+    """The specification being trimmed, with its incrementally tracked serialized size."""
+
+    def __init__(self, spec: Dict[str, Any], indent: int):
+        self.indent = indent
+        # Copy the containers that entries are removed from; their contents stay shared
+        self.spec = dict(spec)
+        if isinstance(self.spec.get('paths'), MAPPING_TYPES):
+            self.spec['paths'] = {path: dict(item) if isinstance(item, MAPPING_TYPES) else item
+                                  for path, item in self.spec['paths'].items()}
+        if isinstance(self.spec.get('components'), MAPPING_TYPES):
+            self.spec['components'] = {section: dict(entries) if isinstance(entries, MAPPING_TYPES) else entries
+                                       for section, entries in self.spec['components'].items()}
+        self.size = serialized_size(self.spec, 0, indent)
+
+    def prune(self, should_drop: Callable[[Any], bool]) -> int:
+        """Remove matching entries everywhere in the specification and return their count."""
+        self.spec, saved, removed = _prune(self.spec, should_drop, 0, self.indent)
+        self.size -= saved
+        return removed
+
+    def pinned_components(self) -> Set[Tuple[str, str]]:
+        """Return the components referenced from outside of the paths and the components."""
+        pinned = collect_component_refs({k: v for k, v in self.spec.items() if k not in ('paths', 'components')})
+        pinned.update(('securitySchemes', name) for name in security_scheme_names(self.spec.get('security')))
+        return pinned
+
+    def operation_closures(self, graph) -> List[Tuple[str, str, Set[Tuple[str, str]]]]:
+        """Return each operation with the components it reaches, including path-level references."""
+        closures = []
+        path_level_refs = {}
+        for path, method, operation in iter_operations(self.spec):
+            if path not in path_level_refs:
+                path_level_refs[path] = collect_component_refs(
+                    {key: value for key, value in self.spec['paths'][path].items() if key not in HTTP_METHODS})
+            reached = resolve_component_closure(graph, collect_component_refs(operation) | path_level_refs[path])
+            reached.update(('securitySchemes', name) for name in security_scheme_names(operation.get('security')))
+            closures.append((path, method, reached))
+        return closures
+
+    def remove_components(self, components: Set[Tuple[str, str]]) -> int:
+        """Remove components from their sections and return the number removed."""
+        by_section = {}
+        for section, name in components:
+            by_section.setdefault(section, set()).add(name)
+        removed = 0
+        for section, names in by_section.items():
+            entries = self.spec['components'].get(section)
+            if isinstance(entries, MAPPING_TYPES):
+                before = len(entries)
+                self.size -= _remove_mapping_entries(entries, names, 2, self.indent)
+                removed += before - len(entries)
+        return removed
+
+    def remove_operation(self, path: str, method: str) -> None:
+        """Remove an operation, and its path item once no operations are left in it."""
+        path_item = self.spec['paths'][path]
+        self.size -= _remove_mapping_entries(path_item, {method}, 2, self.indent)
+        if not any(key in HTTP_METHODS for key in path_item):
+            self.size -= _remove_mapping_entries(self.spec['paths'], {path}, 1, self.indent)
+
+
+def apply_size_budget(spec: Dict[str, Any], max_bytes: int,
+                      indent: int = JSON_INDENT) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Trim an OpenAPI specification until its JSON serialization fits into a size budget.
+
+    The trimming steps are applied in priority order, and only until the specification fits:
+    descriptions, extensions, examples, components not referenced by any operation, and finally
+    whole operations. Deprecated operations are dropped first, then the operations whose
+    components are shared with the fewest other operations, latest in the document first.
+    Components only used by dropped operations are dropped with them.
+
+    Args:
+        spec: The OpenAPI specification
+        max_bytes: Maximum size of the JSON output in bytes
+        indent: Indentation of the JSON output
+
+    Returns:
+        Tuple of (trimmed specification, report), where the report lists the bytes saved and
+        the number of entries removed by each applied step, and whether the budget was met
+    """
+    state = _BudgetState(spec, indent)
+    report = {"max_bytes": max_bytes, "initial_bytes": state.size, "steps": []}
+
+    prune_predicates = {
+        'descriptions': lambda key: key == 'description',
+        'extensions': lambda key: key.startswith('x-'),
+        'examples': lambda key: key in EXAMPLE_KEYS,
+    }
+
+    for step in TRIM_STEPS:
+        if state.size <= max_bytes:
+            break
+        size_before = state.size
+        if step in prune_predicates:
+            removed = state.prune(prune_predicates[step])
+        elif step == 'unused-components':
+            graph = build_reference_graph(state.spec)
+            used = resolve_component_closure(graph, state.pinned_components())
+            for _, _, reached in state.operation_closures(graph):
+                used |= reached
+            removed = state.remove_components(set(graph) - used)
+        else:
+            removed = _drop_operations(state, max_bytes)
+        report["steps"].append({"step": step, "removed": removed, "bytes_saved": size_before - state.size})
+
+    report["final_bytes"] = state.size
+    report["fits"] = state.size <= max_bytes
+    return state.spec, report
+
+
+def _drop_operations(state: _BudgetState, max_bytes: int) -> int:
+    """Drop the least-used operations, and the components only they use, until the budget is met."""
+    graph = build_reference_graph(state.spec)
+    pinned = resolve_component_closure(graph, state.pinned_components())
+    closures = state.operation_closures(graph)
+
+    usage = {}
+    for _, _, reached in closures:
+        for component in reached:
+            usage[component] = usage.get(component, 0) + 1
+
+    def rank(indexed):
+        index, (path, method, reached) = indexed
+        deprecated = bool(state.spec['paths'][path][method].get('deprecated'))
+        return (not deprecated, sum(usage[component] for component in reached), -index)
+
+    removed = 0
+    for _, (path, method, reached) in sorted(enumerate(closures), key=rank):
+        if state.size <= max_bytes:
+            break
+        state.remove_operation(path, method)
+        removed += 1
+        unused = set()
+        for component in reached:
+            usage[component] -= 1
+            if usage[component] == 0 and component not in pinned:
+                unused.add(component)
+        state.remove_components(unused)
+    return removed
+
+
+def budget_from_limits(max_bytes: Optional[int], max_tokens: Optional[int]) -> Optional[int]:
+    """
+    Combine a byte limit and a token limit into a single byte budget.
+
+    Args:
+        max_bytes: Maximum output size in bytes, or None
+        max_tokens: Maximum output size in estimated tokens, or None
+
+    Returns:
+        The byte budget, or None if no limit was given
+    """
+    limits = [limit for limit in (max_bytes, max_tokens * BYTES_PER_TOKEN if max_tokens is not None else None)
+              if limit is not None]
+    return min(limits) if limits else None
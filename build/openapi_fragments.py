@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Cache of serialized JSON fragments for writing many subsets of the same specification.
+
+Subsets share their operations and components with the specification they are extracted from.
+The cache keeps the JSON of every such node, as it appears at its depth in the output of
+json.dump(indent=2), so writing another subset that contains the node concatenates the cached
+text instead of encoding the node again. The output is byte-identical to json.dump(indent=2).
+"""
+import json
+import threading
+from typing import Dict, Any, Tuple
+from compact_nodes import MAPPING_TYPES, to_builtin
+
+
+JSON_INDENT = 2
+
+# Top-level properties whose entries, and the entries of their values, are written entry by entry;
+# e.g. the operations of a path item or the schemas of components
+_SKELETON_KEYS = ('paths', 'components')
+
+
+def encode_json_key(key: Any) -> str:
+    """Encode a mapping key as json.dump does, including its coercion of non-string keys."""
+    if isinstance(key, str):
+        return json.dumps(key)
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, float):
+        return json.dumps(float.__repr__(key))
+    return json.dumps(str(key))
+
+
+def serialize_fragment(value: Any, depth: int) -> str:
+    """Serialize a value as it appears at the given depth of the output of json.dump(indent=2)."""
+    # Strings never contain raw newlines in JSON, so every newline is indentation
+    return json.dumps(value, indent=JSON_INDENT, default=to_builtin).replace('\n', '\n' + ' ' * (depth * JSON_INDENT))
+
+
+class FragmentCache:
+    """
+    Serialized JSON of the operations and components of a specification.
+
+    Fragments are keyed by the identity of the node and its depth in the output. The cache keeps
+    a reference to every node it has serialized, so the identity of a node is not reused while it
+    is cached; the nodes must not be modified while the cache is in use. It can be shared between
+    threads.
+    """
+
+    def __init__(self):
+        self._fragments: Dict[Tuple[int, int], Tuple[Any, str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def clear(self) -> None:
+        """Drop all cached fragments."""
+        with self._lock:
+            self._fragments.clear()
+
+    def serialize(self, value: Any, depth: int) -> str:
+        """
+        Serialize a value at a depth of the output, reusing the cached fragment if there is one.
+
+        Args:
+            value: The node to serialize
+            depth: Nesting depth of the node in the output
+
+        Returns:
+            The JSON of the node, indented for its depth
+        """
+        if not isinstance(value, (list,) + MAPPING_TYPES):
+            return serialize_fragment(value, depth)
+        key = (id(value), depth)
+        entry = self._fragments.get(key)
+        if entry is None:
+            entry = (value, serialize_fragment(value, depth))
+            with self._lock:
+                self._fragments[key] = entry
+        return entry[1]
+
+    def _write_mapping(self, mapping: Any, stream: Any, depth: int, skeleton_levels: int) -> None:
+        """Write a mapping entry by entry; skeleton_levels more levels below it are written the same way."""
+        if not mapping:
+            stream.write('{}')
+            return
+        entry_indent = '\n' + ' ' * ((depth + 1) * JSON_INDENT)
+        separator = '{'
+        for key, value in mapping.items():
+            stream.write(f"{separator}{entry_indent}{encode_json_key(key)}: ")
+            separator = ','
+            if skeleton_levels and isinstance(value, MAPPING_TYPES):
+                self._write_mapping(value, stream, depth + 1, skeleton_levels - 1)
+            else:
+                stream.write(self.serialize(value, depth + 1))
+        stream.write('\n' + ' ' * (depth * JSON_INDENT) + '}')
+
+    def write(self, spec: Dict[str, Any], stream: Any) -> None:
+        """
+        Write a specification to a text stream as json.dump(indent=2) does, from cached fragments.
+
+        The paths object and its path items, and the components object and its sections, are
+        written entry by entry, so that their entries (operations, components) are cached
+        individually and shared between subsets. Other top-level values, which subsets may
+        rebuild (such as the filtered tags), are serialized without caching.
+
+        Args:
+            spec: The OpenAPI specification, or a subset of it
+            stream: Writable text stream
+        """
+        if not isinstance(spec, MAPPING_TYPES):
+            stream.write(serialize_fragment(spec, 0))
+            return
+        if not spec:
+            stream.write('{}')
+            return
+        separator = '{'
+        for key, value in spec.items():
+            stream.write(f"{separator}\n{' ' * JSON_INDENT}{encode_json_key(key)}: ")
+            separator = ','
+            if key in _SKELETON_KEYS and isinstance(value, MAPPING_TYPES):
+                self._write_mapping(value, stream, 1, 1)
+            else:
+                stream.write(serialize_fragment(value, 1))
+        stream.write('\n}')
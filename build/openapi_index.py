@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite index of an OpenAPI specification for extracting single operations.
+
+The index stores every top-level property, path item entry and component of the specification
+as JSON, together with the $ref edges between them. Extracting the subset for an operation
+reads only that operation, its path-level properties and the components it reaches, instead
+of parsing the whole specification.
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from compact_nodes import MAPPING_TYPES, to_builtin
+from openapi_refs import HTTP_METHODS, SelectionNotFoundError, collect_component_refs, extract_operations_subset
+from openapi_operations import LoadLimits, load_openapi_spec
+
+
+# Bump when the schema changes; indexes of other versions are rebuilt
+INDEX_SCHEMA_VERSION = '1'
+
+INDEX_SUFFIX = '.index.sqlite'
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE document (position INTEGER PRIMARY KEY, key TEXT NOT NULL, value TEXT);
+CREATE TABLE path_entries (
+    path_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    operation_id TEXT,
+    value TEXT NOT NULL,
+    PRIMARY KEY (path, key)
+);
+CREATE INDEX path_entries_operation_id ON path_entries (operation_id);
+CREATE TABLE components (
+    position INTEGER PRIMARY KEY,
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE (section, name)
+);
+CREATE TABLE path_entry_refs (path TEXT NOT NULL, key TEXT NOT NULL, section TEXT NOT NULL, name TEXT NOT NULL);
+CREATE INDEX path_entry_refs_entry ON path_entry_refs (path, key);
+CREATE TABLE component_refs (
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    target_section TEXT NOT NULL,
+    target_name TEXT NOT NULL
+);
+CREATE INDEX component_refs_source ON component_refs (section, name);
+"""
+
+# Components transitively reachable from the references of the selected path entries
+_REACHED_COMPONENTS_QUERY = """
+WITH RECURSIVE reached(section, name) AS (
+    SELECT section, name FROM path_entry_refs WHERE path = ? AND key IN ({placeholders})
+    UNION
+    SELECT component_refs.target_section, component_refs.target_name
+    FROM component_refs JOIN reached
+    ON component_refs.section = reached.section AND component_refs.name = reached.name
+)
+SELECT components.section, components.name, components.value
+FROM components JOIN reached ON components.section = reached.section AND components.name = reached.name
+"""
+
+# Components reached from the components given as (section, name) rows of VALUES
+_COMPONENT_CLOSURE_QUERY = """
+WITH RECURSIVE reached(section, name) AS (
+    VALUES {rows}
+    UNION
+    SELECT component_refs.target_section, component_refs.target_name
+    FROM component_refs JOIN reached
+    ON component_refs.section = reached.section AND component_refs.name = reached.name
+)
+SELECT components.section, components.name, components.value
+FROM components JOIN reached ON components.section = reached.section AND components.name = reached.name
+"""
+
+
+def default_index_path(spec_path: str) -> str:
+    """Return the default location of the index of a specification file, next to the file."""
+    return spec_path + INDEX_SUFFIX
+
+
+def source_hash(spec_path: str) -> str:
+    """Return the SHA-256 digest of a specification file."""
+    digest = hashlib.sha256()
+    with open(spec_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dumps(value: Any) -> str:
+    """Serialize a part of the specification for storage in the index."""
+    return json.dumps(value, separators=(',', ':'), default=to_builtin)
+
+
+def build_openapi_index(spec_path: str, index_path: Optional[str] = None,
+                        limits: Optional[LoadLimits] = None) -> str:
+    """
+    Parse an OpenAPI specification file and write its index, atomically replacing an existing one.
+
+    Args:
+        spec_path: Path to the OpenAPI specification file
+        index_path: Path of the index file (defaults to the spec path with an .index.sqlite suffix)
+        limits: Limits on the size and shape of the input (defaults to LoadLimits())
+
+    Returns:
+        The path of the index file
+    """
+    logger = logging.getLogger(__name__)
+
+    index_path = index_path or default_index_path(spec_path)
+    stat_result = os.stat(spec_path)
+    digest = source_hash(spec_path)
+    spec = load_openapi_spec(spec_path, limits=limits)
+
+    # SQLite creates the file with the permissions of the umask, as for a regularly written index
+    temp_path = os.path.join(os.path.dirname(os.path.abspath(index_path)),
+                             f".{os.path.basename(index_path)}.{os.getpid()}.tmp")
+    if os.path.exists(temp_path):
+        os.unlink(temp_path)
+    try:
+        connection = sqlite3.connect(temp_path)
+        try:
+            connection.executescript(_SCHEMA)
+            _write_index(connection, spec)
+            connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                ('version', INDEX_SCHEMA_VERSION),
+                ('source_size', str(stat_result.st_size)),
+                ('source_mtime_ns', str(stat_result.st_mtime_ns)),
+                ('source_sha256', digest),
+            ])
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(temp_path, index_path)
+    except Exception as e:
+        logger.error(f"Error building the index of {spec_path}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    logger.debug(f"Indexed {spec_path} into {index_path}")
+    return index_path
+
+
+def _write_index(connection: sqlite3.Connection, spec: Dict[str, Any]) -> None:
+    """Insert the parts of a specification and their references into an empty index."""
+    for position, (key, value) in enumerate(spec.items()):
+        # Mappings of path items and of components are stored entry by entry
+        stored = None if key in ('paths', 'components') and isinstance(value, MAPPING_TYPES) else _dumps(value)
+        connection.execute("INSERT INTO document (position, key, value) VALUES (?, ?, ?)", (position, key, stored))
+
+    paths = spec.get('paths')
+    if isinstance(paths, MAPPING_TYPES):
+        for path_position, (path, path_item) in enumerate(paths.items()):
+            if not isinstance(path_item, MAPPING_TYPES):
+                continue
+            for position, (key, value) in enumerate(path_item.items()):
+                operation_id = None
+                if key in HTTP_METHODS and isinstance(value, MAPPING_TYPES):
+                    operation_id = value.get('operationId')
+                connection.execute(
+                    "INSERT INTO path_entries (path_position, position, path, key, operation_id, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (path_position, position, path, key, operation_id, _dumps(value)))
+                connection.executemany("INSERT INTO path_entry_refs (path, key, section, name) VALUES (?, ?, ?, ?)",
+                                       [(path, key, section, name) for section, name in collect_component_refs(value)])
+
+    components = spec.get('components')
+    if isinstance(components, MAPPING_TYPES):
+        position = 0
+        for section, entries in components.items():
+            if not isinstance(entries, MAPPING_TYPES):
+                continue
+            for name, component in entries.items():
+                connection.execute("INSERT INTO components (position, section, name, value) VALUES (?, ?, ?, ?)",
+                                   (position, section, name, _dumps(component)))
+                connection.executemany(
+                    "INSERT INTO component_refs (section, name, target_section, target_name) VALUES (?, ?, ?, ?)",
+                    [(section, name, target_section, target_name)
+                     for target_section, target_name in collect_component_refs(component)])
+                position += 1
+
+
+class OpenAPIIndex:
+    """An open index of an OpenAPI specification."""
+
+    def __init__(self, index_path: str):
+        """
+        Open an index file.
+
+        Args:
+            index_path: Path of the index file
+        """
+        self.index_path = index_path
+        self.connection = sqlite3.connect(index_path)
+
+    def close(self) -> None:
+        """Close the index file."""
+        self.connection.close()
+
+    def __enter__(self) -> 'OpenAPIIndex':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def meta(self) -> Dict[str, str]:
+        """Return the metadata of the index: its version and the fingerprint of the indexed file."""
+        return dict(self.connection.execute("SELECT key, value FROM meta"))
+
+    def find_operations(self, operation_ids: Optional[List[str]] = None, path: Optional[str] = None,
+                        method: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Look up operations by operationId, or by path and optionally method.
+
+        Args:
+            operation_ids: The operationIds of the operations
+            path: The path of the operations, if no operationIds are given
+            method: The method of the operation within the path
+
+        Returns:
+            Dict mapping each path to its selected methods, in document order
+
+        Raises:
+            SelectionNotFoundError: If an operation is not found
+        """
+        if operation_ids:
+            placeholders = ', '.join('?' * len(operation_ids))
+            rows = self.connection.execute(
+                f"SELECT path, key, operation_id FROM path_entries WHERE operation_id IN ({placeholders}) "
+                f"ORDER BY path_position, position", operation_ids).fetchall()
+            missing = set(operation_ids) - {operation_id for _, _, operation_id in rows}
+            if missing:
+                raise SelectionNotFoundError(f"Operation not found: {', '.join(sorted(missing))}")
+        else:
+            methods = [method.lower()] if method else list(HTTP_METHODS)
+            placeholders = ', '.join('?' * len(methods))
+            rows = self.connection.execute(
+                f"SELECT path, key, operation_id FROM path_entries WHERE path = ? AND key IN ({placeholders}) "
+                f"ORDER BY position", [path] + methods).fetchall()
+            if not rows:
+                raise SelectionNotFoundError(f"Operation not found: {method.upper() + ' ' if method else ''}{path}")
+
+        operations = {}
+        for path, key, _ in rows:
+            operations.setdefault(path, []).append(key)
+        return operations
+
+    def subset(self, operations: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Build the subset of the indexed specification that contains only the given operations.
+
+        The result is the same as extract_operations_subset on the whole specification.
+
+        Args:
+            operations: Dict mapping each path to the list of methods to keep
+
+        Returns:
+            Dict containing the subset of the OpenAPI specification
+        """
+        paths = {}
+        components = {}
+        reached = []
+        document = [(key, None if value is None else json.loads(value)) for key, value in self.connection.execute(
+            "SELECT key, value FROM document ORDER BY position")]
+        # Top-level properties other than the paths, such as webhooks, are kept with their references
+        roots = sorted(collect_component_refs({key: value for key, value in document
+                                               if key not in ('paths', 'components')}))
+        if roots:
+            query = _COMPONENT_CLOSURE_QUERY.format(rows=', '.join(['(?, ?)'] * len(roots)))
+            reached.extend(self.connection.execute(query, [token for root in roots for token in root]))
+        for path, methods in operations.items():
+            rows = self.connection.execute(
+                "SELECT key, value FROM path_entries WHERE path = ? ORDER BY position", (path,)).fetchall()
+            if not rows:
+                continue
+            # Path-level properties are kept, and referenced, with every operation of the path
+            selected = [key for key, _ in rows if key in methods or key not in HTTP_METHODS]
+            paths[path] = {key: json.loads(value) for key, value in rows if key in selected}
+            query = _REACHED_COMPONENTS_QUERY.format(placeholders=', '.join('?' * len(selected)))
+            reached.extend(self.connection.execute(query, [path] + selected))
+
+        # Security schemes are selected by name from security requirements, not by $ref
+        reached.extend(self.connection.execute(
+            "SELECT section, name, value FROM components WHERE section = 'securitySchemes'"))
+        positions = dict(((section, name), position) for section, name, position in self.connection.execute(
+            "SELECT section, name, position FROM components"))
+        for section, name, value in sorted(set(reached), key=lambda row: positions[row[:2]]):
+            components.setdefault(section, {})[name] = json.loads(value)
+
+        path_positions = dict(self.connection.execute(
+            "SELECT path, MIN(path_position) FROM path_entries GROUP BY path"))
+        spec = {}
+        for key, value in document:
+            if value is not None:
+                spec[key] = value
+            elif key == 'paths':
+                spec[key] = dict(sorted(paths.items(), key=lambda item: path_positions[item[0]]))
+            else:
+                spec[key] = components
+        return extract_operations_subset(spec, operations)
+
+
+def open_openapi_index(spec_path: str, index_path: Optional[str] = None,
+                       limits: Optional[LoadLimits] = None) -> Tuple[OpenAPIIndex, bool]:
+    """
+    Open the index of an OpenAPI specification file, building or rebuilding it if it is out of date.
+
+    The index is up to date if it was built from a file with the same SHA-256 digest. The digest
+    is only computed when the size or the modification time of the file changed.
+
+    Args:
+        spec_path: Path to the OpenAPI specification file
+        index_path: Path of the index file (defaults to the spec path with an .index.sqlite suffix)
+        limits: Limits on the size and shape of the input when the index is built
+
+    Returns:
+        Tuple of (open index, whether the index was built)
+    """
+    logger = logging.getLogger(__name__)
+
+    index_path = index_path or default_index_path(spec_path)
+    if os.path.exists(index_path):
+        index = OpenAPIIndex(index_path)
+        try:
+            meta = index.meta()
+            stat_result = os.stat(spec_path)
+            if meta.get('version') == INDEX_SCHEMA_VERSION:
+                if (meta.get('source_size') == str(stat_result.st_size)
+                        and meta.get('source_mtime_ns') == str(stat_result.st_mtime_ns)):
+                    return index, False
+                if meta.get('source_sha256') == source_hash(spec_path):
+                    # Touched but unchanged; remember the new modification time
+                    with index.connection:
+                        index.connection.executemany("UPDATE meta SET value = ? WHERE key = ?", [
+                            (str(stat_result.st_size), 'source_size'),
+                            (str(stat_result.st_mtime_ns), 'source_mtime_ns'),
+                        ])
+                    return index, False
+        except sqlite3.DatabaseError as e:
+            logger.debug(f"Rebuilding unreadable index {index_path}: {str(e)}")
+        index.close()
+        logger.debug(f"The index {index_path} is out of date")
+
+    build_openapi_index(spec_path, index_path, limits=limits)
+    return OpenAPIIndex(index_path), True
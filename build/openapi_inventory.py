@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Inventory of an OpenAPI specification: counts, sizes and reference statistics.
+
+All statistics are collected in a single traversal. Sizes are those of the JSON output
+(json.dump with indent=2) and are computed bottom-up during the traversal, so the savings of
+the transforms are known without running them.
+"""
+import json
+from typing import Dict, Any, List, Optional, Set, Tuple
+from compact_nodes import MAPPING_TYPES
+from openapi_budget import JSON_INDENT, serialized_key_size, removal_saving
+from openapi_refs import HTTP_METHODS, COMPONENT_REF_PREFIX, UNTAGGED_SHARD, ComponentKey, parse_component_ref
+
+
+# Number of entries in the rankings of the inventory
+INVENTORY_TOP_ENTRIES = 10
+
+# The transforms whose savings are reported, with the mapping entries they remove
+SAVINGS_OPTIONS = (
+    ('--remove-descriptions', lambda key: key == 'description'),
+    ('--remove-extensions', lambda key: isinstance(key, str) and key.startswith('x-')),
+    ('--remove-descriptions --remove-extensions',
+     lambda key: key == 'description' or (isinstance(key, str) and key.startswith('x-'))),
+)
+
+# What references a component: an operation, a path item, another component or the document itself
+Owner = Tuple[str, ...]
+_DOCUMENT_OWNER: Owner = ('document',)
+
+
+class _InventoryWalker:
+    """Collects the statistics of an OpenAPI specification in one traversal."""
+
+    def __init__(self, indent: int):
+        self.indent = indent
+        self.max_depth = 0
+        self.operations = 0
+        self.deprecated_operations = 0
+        self.operations_by_method: Dict[str, int] = {}
+        self.operations_by_tag: Dict[str, int] = {}
+        self.component_sizes: Dict[ComponentKey, int] = {}
+        self.refs: Dict[Owner, Set[ComponentKey]] = {}
+        self.ref_count = 0
+        self.description_count = 0
+        self.description_bytes = 0
+        self.extension_count = 0
+        self.extension_bytes = 0
+        self.savings = [0] * len(SAVINGS_OPTIONS)
+
+    def _record_operation(self, method: str, operation: Any) -> None:
+        """Count an operation by method, tag and deprecation."""
+        self.operations += 1
+        self.operations_by_method[method] = self.operations_by_method.get(method, 0) + 1
+        if operation.get('deprecated'):
+            self.deprecated_operations += 1
+        tags = operation.get('tags')
+        for tag in (tags if isinstance(tags, list) and tags else [UNTAGGED_SHARD]):
+            tag = str(tag)
+            self.operations_by_tag[tag] = self.operations_by_tag.get(tag, 0) + 1
+
+    def _child_context(self, location: Optional[Tuple[Any, ...]], owner: Owner,
+                       key: Any, value: Any) -> Tuple[Optional[Tuple[Any, ...]], Owner]:
+        """Return the location (tracked down to operations and components) and owner of an entry."""
+        if location is None:
+            return None, owner
+        if len(location) == 2 and location[0] == 'paths':
+            if key in HTTP_METHODS and isinstance(value, MAPPING_TYPES):
+                self._record_operation(key, value)
+                return None, ('operation', location[1], key)
+            return None, owner
+        if len(location) == 2 and location[0] == 'components':
+            return None, (location[1], key)
+        child = location + (key,)
+        if len(child) == 2 and child[0] == 'paths':
+            return child, ('path', key)
+        if len(child) == 1 and child[0] not in ('paths', 'components'):
+            return None, owner
+        return child, owner
+
+    def walk(self, node: Any, depth: int, alive: Tuple[bool, ...],
+             location: Optional[Tuple[Any, ...]], owner: Owner) -> int:
+        """
+        Collect the statistics of a node and return its serialized size.
+
+        Args:
+            node: The node
+            depth: Nesting depth of the node within the document
+            alive: For each entry of SAVINGS_OPTIONS, whether the node is kept by that transform
+            location: Keys from the root down to the node, while it is above an operation or component
+            owner: What a $ref within the node is attributed to
+
+        Returns:
+            Size of the node in the JSON output, as computed by serialized_size
+        """
+        self.max_depth = max(self.max_depth, depth)
+        if isinstance(node, MAPPING_TYPES):
+            if not node:
+                return 2
+            size = 3 + depth * self.indent + len(node) - 1
+            entry_indent = 1 + (depth + 1) * self.indent
+            removed_costs: List[List[int]] = [[] for _ in SAVINGS_OPTIONS]
+            for key, value in node.items():
+                if key == '$ref':
+                    self.ref_count += 1
+                    component = parse_component_ref(value)
+                    if component is not None:
+                        self.refs.setdefault(owner, set()).add(component)
+                removed = tuple(alive[i] and drops(key) for i, (_, drops) in enumerate(SAVINGS_OPTIONS))
+                child_alive = tuple(alive[i] and not removed[i] for i in range(len(alive)))
+                child_location, child_owner = self._child_context(location, owner, key, value)
+                child_size = self.walk(value, depth + 1, child_alive, child_location, child_owner)
+                cost = entry_indent + serialized_key_size(key) + 2 + child_size
+                size += cost
+                if location is not None and len(location) == 2 and location[0] == 'components':
+                    self.component_sizes[(location[1], key)] = child_size
+                if key == 'description':
+                    self.description_count += 1
+                    self.description_bytes += cost
+                elif isinstance(key, str) and key.startswith('x-'):
+                    self.extension_count += 1
+                    self.extension_bytes += cost
+                for i, is_removed in enumerate(removed):
+                    if is_removed:
+                        removed_costs[i].append(cost)
+            for i, costs in enumerate(removed_costs):
+                if costs:
+                    self.savings[i] += removal_saving(len(node) - len(costs), costs, depth, self.indent)
+            return size
+        elif isinstance(node, list):
+            if not node:
+                return 2
+            size = 3 + depth * self.indent + len(node) - 1
+            entry_indent = 1 + (depth + 1) * self.indent
+            for item in node:
+                size += entry_indent + self.walk(item, depth + 1, alive, None, owner)
+            return size
+        else:
+            return len(json.dumps(node))
+
+
+def _component_ref(component: ComponentKey) -> str:
+    """Format a component as a $ref value."""
+    section, name = component
+    return f"{COMPONENT_REF_PREFIX}{section}/{str(name).replace('~', '~0').replace('/', '~1')}"
+
+
+def _top(counts: Dict[Any, int], key_name: str, value_name: str) -> List[Dict[str, Any]]:
+    """Return the entries with the largest counts, largest first, in a stable order."""
+    ranked = sorted(counts.items(), key=lambda item: -item[1])[:INVENTORY_TOP_ENTRIES]
+    return [{key_name: key, value_name: value} for key, value in ranked]
+
+
+def compute_inventory(spec: Dict[str, Any], indent: int = JSON_INDENT) -> Dict[str, Any]:
+    """
+    Compute the inventory of an OpenAPI specification.
+
+    Args:
+        spec: The OpenAPI specification
+        indent: Indentation of the JSON output the sizes refer to
+
+    Returns:
+        Dict with the operation counts, the component counts and sizes, the $ref fan-in and
+        fan-out, the size of descriptions and extensions, the maximum nesting depth and the
+        bytes each transform would save
+    """
+    walker = _InventoryWalker(indent)
+    total_bytes = walker.walk(spec, 0, (True,) * len(SAVINGS_OPTIONS), (), _DOCUMENT_OWNER)
+
+    sections: Dict[str, Dict[str, int]] = {}
+    for (section, _), size in walker.component_sizes.items():
+        stats = sections.setdefault(section, {"count": 0, "bytes": 0})
+        stats["count"] += 1
+        stats["bytes"] += size
+
+    fan_in: Dict[ComponentKey, int] = {component: 0 for component in walker.component_sizes}
+    fan_out: Dict[ComponentKey, int] = {component: 0 for component in walker.component_sizes}
+    unresolved = set()
+    for owner, targets in walker.refs.items():
+        if owner in fan_out:
+            fan_out[owner] = len(targets)
+        for target in targets:
+            if target in fan_in:
+                fan_in[target] += 1
+            else:
+                unresolved.add(target)
+
+    schema_sizes = {name: size for (section, name), size in walker.component_sizes.items() if section == 'schemas'}
+    paths = spec.get('paths')
+    return {
+        "bytes": total_bytes,
+        "max_depth": walker.max_depth,
+        "paths": len(paths) if isinstance(paths, MAPPING_TYPES) else 0,
+        "operations": {
+            "count": walker.operations,
+            "deprecated": walker.deprecated_operations,
+            "by_method": walker.operations_by_method,
+            "by_tag": dict(sorted(walker.operations_by_tag.items(), key=lambda item: (-item[1], item[0]))),
+        },
+        "components": sections,
+        "largest_schemas": _top(schema_sizes, "name", "bytes"),
+        "refs": {
+            "count": walker.ref_count,
+            "unresolved": len(unresolved),
+            "max_fan_in": max(fan_in.values(), default=0),
+            "max_fan_out": max(fan_out.values(), default=0),
+            "top_fan_in": _top({_component_ref(c): n for c, n in fan_in.items() if n}, "component", "fan_in"),
+            "top_fan_out": _top({_component_ref(c): n for c, n in fan_out.items() if n}, "component", "fan_out"),
+        },
+        "descriptions": {"count": walker.description_count, "bytes": walker.description_bytes},
+        "extensions": {"count": walker.extension_count, "bytes": walker.extension_bytes},
+        "savings": {option: saved for (option, _), saved in zip(SAVINGS_OPTIONS, walker.savings)},
+    }
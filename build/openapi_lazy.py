@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Lazy loading of JSON OpenAPI specifications for narrow subsets.
+
+One structural scan over the memory-mapped file records the byte range of every top-level
+property, path item and component, without decoding any of them. A subset then decodes only
+the path items it selects and the components they reach through $ref, so its time and memory
+beyond the scan grow with the subset, not with the specification.
+"""
+import os
+import re
+import json
+import mmap
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from openapi_refs import (
+    HTTP_METHODS,
+    ComponentKey,
+    SelectionNotFoundError,
+    collect_component_refs,
+    extract_operations_subset
+)
+from gc_control import paused_gc
+from openapi_operations import JSON_EXTENSIONS, LoadLimits, SpecLimitError, load_openapi_spec
+from openapi_pointers import PointerResolver, select_json_pointers
+
+
+# Byte range of an undecoded JSON value in the file
+Span = Tuple[int, int]
+
+# Members scanned as objects in turn: by key, or '*' for every member, with the members to scan within them
+_NESTED_MEMBERS = {'paths': {}, 'components': {'*': {}}}
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*+')
+_STRING = re.compile(rb'"[^"\\]*+(?:\\.[^"\\]*+)*+"')
+_SCALAR = re.compile(rb'[^,}\] \t\n\r]++')
+# Everything up to the next bracket outside of a string
+_UNTIL_BRACKET = re.compile(rb'[^"{}\[\]]*+(?:"[^"\\]*+(?:\\.[^"\\]*+)*+"[^"{}\[\]]*+)*+')
+
+_OPEN_BRACKETS = b'{['
+
+
+def _skip_whitespace(data: Any, pos: int) -> int:
+    """Return the offset of the first non-whitespace byte at or after pos."""
+    return _WHITESPACE.match(data, pos).end()
+
+
+def _skip_value(data: Any, pos: int) -> int:
+    """Return the end of the JSON value starting at pos, matching brackets without decoding."""
+    if pos >= len(data):
+        raise ValueError("Invalid JSON: unexpected end of input")
+    if data[pos] == ord('"'):
+        match = _STRING.match(data, pos)
+    elif data[pos] not in _OPEN_BRACKETS:
+        match = _SCALAR.match(data, pos)
+    else:
+        depth = 0
+        while True:
+            pos = _UNTIL_BRACKET.match(data, pos).end()
+            if pos >= len(data):
+                raise ValueError("Invalid JSON: unexpected end of input")
+            depth += 1 if data[pos] in _OPEN_BRACKETS else -1
+            pos += 1
+            if depth == 0:
+                return pos
+    if match is None:
+        raise ValueError(f"Invalid JSON: unexpected character at offset {pos}")
+    return match.end()
+
+
+def _scan_object(data: Any, pos: int, nested: Dict[str, Any]) -> Tuple[Dict[Any, Any], int]:
+    """
+    Record the byte ranges of the members of the JSON object starting at pos.
+
+    Args:
+        data: The content of the file
+        pos: Offset of the opening brace
+        nested: Members whose object values are scanned in turn, as in _NESTED_MEMBERS
+
+    Returns:
+        Tuple of (dict mapping each key to the span of its value, or to the members of its value
+        for nested objects, end offset of the object)
+    """
+    members = {}
+    pos = _skip_whitespace(data, pos + 1)
+    if pos < len(data) and data[pos] == ord('}'):
+        return members, pos + 1
+    while True:
+        match = _STRING.match(data, pos)
+        if match is None:
+            raise ValueError(f"Invalid JSON: expected a property name at offset {pos}")
+        key = json.loads(data[pos:match.end()])
+        pos = _skip_whitespace(data, match.end())
+        if pos >= len(data) or data[pos] != ord(':'):
+            raise ValueError(f"Invalid JSON: expected ':' at offset {pos}")
+        start = _skip_whitespace(data, pos + 1)
+        inner = nested.get(key, nested.get('*'))
+        if inner is not None and start < len(data) and data[start] == ord('{'):
+            members[key], pos = _scan_object(data, start, inner)
+        else:
+            pos = _skip_value(data, start)
+            members[key] = (start, pos)
+        pos = _skip_whitespace(data, pos)
+        if pos >= len(data):
+            raise ValueError("Invalid JSON: unexpected end of input")
+        if data[pos] == ord(','):
+            pos = _skip_whitespace(data, pos + 1)
+        elif data[pos] == ord('}'):
+            return members, pos + 1
+        else:
+            raise ValueError(f"Invalid JSON: expected ',' or '}}' at offset {pos}")
+
+
+class LazyJSONSpec:
+    """A JSON OpenAPI specification file whose parts are decoded on first access."""
+
+    def __init__(self, file_path: str, limits: Optional[LoadLimits] = None):
+        """
+        Map a JSON file and scan the byte ranges of its top-level properties, path items and components.
+
+        Args:
+            file_path: Path to the OpenAPI specification file in JSON format
+            limits: Limits on the input; the input size limit is checked against the file size
+
+        Raises:
+            ValueError: If the file is not a JSON object
+            SpecLimitError: If the file exceeds the input size limit
+        """
+        limits = limits or LoadLimits()
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if limits.max_input_bytes is not None and size > limits.max_input_bytes:
+                raise SpecLimitError(f"OpenAPI spec exceeds the input size limit of {limits.max_input_bytes} bytes")
+            if size == 0:
+                raise ValueError("Invalid OpenAPI specification: content is not a valid JSON or YAML object")
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            start = _skip_whitespace(self._data, 0)
+            if self._data[start] != ord('{'):
+                raise ValueError("Invalid OpenAPI specification: content is not a valid JSON object")
+            self._members, end = _scan_object(self._data, start, _NESTED_MEMBERS)
+            if _skip_whitespace(self._data, end) != len(self._data):
+                raise ValueError(f"Invalid JSON: extra data at offset {end}")
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Release the mapping of the file."""
+        self._data.close()
+
+    def __enter__(self) -> 'LazyJSONSpec':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _decode(self, span: Span) -> Any:
+        """Decode the JSON value in a byte range of the file."""
+        return json.loads(self._data[span[0]:span[1]])
+
+    def _section(self, key: str) -> Dict[Any, Any]:
+        """Return the scanned members of paths or components, or an empty dict if it is not an object."""
+        members = self._members.get(key)
+        return members if isinstance(members, dict) else {}
+
+    def path_names(self) -> List[str]:
+        """Return the paths of the specification in document order."""
+        return list(self._section('paths'))
+
+    def subset(self, paths: List[str]) -> Dict[str, Any]:
+        """
+        Build the subset of the specification that contains only the operations of the given paths.
+
+        The result is the same as extract_operations_subset on the whole specification.
+
+        Args:
+            paths: The paths whose operations are kept
+
+        Returns:
+            Dict containing the subset of the OpenAPI specification
+
+        Raises:
+            SelectionNotFoundError: If a path is not in the specification
+        """
+        path_spans = self._section('paths')
+        missing = [path for path in paths if path not in path_spans]
+        if missing:
+            raise SelectionNotFoundError(f"Path not found: {', '.join(missing)}")
+
+        selected = set(paths)
+        path_items = {path: self._decode(span) for path, span in path_spans.items() if path in selected}
+        others = {key: self._decode(members) for key, members in self._members.items()
+                  if key not in ('paths', 'components')}
+
+        # Decode the components reachable from the selected path items and the other top-level
+        # properties, breadth first
+        component_spans = self._section('components')
+        decoded: Dict[ComponentKey, Any] = {}
+        pending = collect_component_refs(path_items)
+        pending.update(collect_component_refs(others))
+        # Security schemes are selected by name from security requirements, not by $ref
+        pending.update(('securitySchemes', name) for name in component_spans.get('securitySchemes', {}))
+        while pending:
+            section, name = pending.pop()
+            entries = component_spans.get(section)
+            if (section, name) in decoded or not isinstance(entries, dict) or name not in entries:
+                continue
+            decoded[(section, name)] = component = self._decode(entries[name])
+            pending.update(collect_component_refs(component))
+
+        spec = {}
+        for key, members in self._members.items():
+            if key == 'paths' and isinstance(members, dict):
+                spec[key] = path_items
+            elif key == 'components' and isinstance(members, dict):
+                spec[key] = {
+                    section: ({name: decoded[(section, name)] for name in entries if (section, name) in decoded}
+                              if isinstance(entries, dict) else self._decode(entries))
+                    for section, entries in members.items()
+                }
+            elif key in others:
+                spec[key] = others[key]
+            else:
+                spec[key] = self._decode(members)
+
+        operations = {path: [key for key in item if key in HTTP_METHODS] if isinstance(item, dict) else []
+                      for path, item in path_items.items()}
+        return extract_operations_subset(spec, operations)
+
+
+class _ScannedObject:
+    """A JSON object of the file whose members have been scanned but not decoded."""
+
+    __slots__ = ('members',)
+
+    def __init__(self, members: Dict[Any, Any]):
+        self.members = members
+
+
+class LazyPointerResolver(PointerResolver):
+    """
+    Resolves JSON pointers in a lazily loaded JSON specification.
+
+    Only the top-level properties, path items and components that the pointers and the $ref
+    closure reach are decoded, each at most once.
+    """
+
+    def __init__(self, spec: LazyJSONSpec):
+        """
+        Args:
+            spec: The lazily loaded specification, which must stay open while the resolver is in use
+        """
+        super().__init__(_ScannedObject(spec._members))
+        self._spec = spec
+
+    def _child(self, node: Any, token: str) -> Tuple[Any, Any]:
+        if not isinstance(node, _ScannedObject):
+            return super()._child(node, token)
+        value = node.members[token]
+        return token, _ScannedObject(value) if isinstance(value, dict) else self._spec._decode(value)
+
+    def _keys(self, node: Any) -> Any:
+        return node.members.keys() if isinstance(node, _ScannedObject) else super()._keys(node)
+
+    def _materialize(self, node: Any) -> Any:
+        if not isinstance(node, _ScannedObject):
+            return node
+        return {key: self._materialize(self._child(node, key)[1]) for key in node.members}
+
+
+@paused_gc()
+def load_openapi_pointers_subset(file_path: str, pointers: List[str], compact: bool = False,
+                                 limits: Optional[LoadLimits] = None, use_mmap: bool = False,
+                                 json_scalars: bool = False) -> Any:
+    """
+    Load the nodes of an OpenAPI specification that JSON pointers point to, with the components they reference.
+
+    Uncompressed .json files are loaded lazily, as with load_openapi_paths_subset; other files,
+    and .json files that are not valid JSON, are loaded in full with load_openapi_spec.
+
+    Args:
+        file_path: Path to the OpenAPI specification file, or '-' for standard input
+        pointers: The JSON pointers, as accepted by parse_json_pointer
+        compact: If True, load other files with the compact representation
+        limits: Limits on the size and shape of the input (defaults to LoadLimits())
+        use_mmap: If True, read other files through a memory mapping
+        json_scalars: If True, resolve plain scalars of YAML files as load_openapi_spec does with it
+
+    Returns:
+        The selected nodes and components at their locations in the specification
+
+    Raises:
+        ValueError: If the file or a pointer is invalid
+        SelectionNotFoundError: If a pointer does not point to a node of the specification
+        SpecLimitError: If the specification exceeds one of the limits
+    """
+    logger = logging.getLogger(__name__)
+    limits = limits or LoadLimits()
+
+    if _can_load_lazily(file_path, limits):
+        try:
+            with LazyJSONSpec(file_path, limits) as spec:
+                return LazyPointerResolver(spec).select(pointers)
+        except (SpecLimitError, SelectionNotFoundError):
+            raise
+        except ValueError as e:
+            # A .json file may hold YAML, which load_openapi_spec reads, or report the error
+            logger.debug(f"Loading {file_path} in full, as it cannot be scanned as JSON: {str(e)}")
+
+    spec = load_openapi_spec(file_path, compact=compact, limits=limits, use_mmap=use_mmap,
+                             json_scalars=json_scalars)
+    return select_json_pointers(spec, pointers)
+
+
+def _can_load_lazily(file_path: str, limits: LoadLimits) -> bool:
+    """Return whether a file can be loaded with LazyJSONSpec under the given limits."""
+    # The node count and depth limits are enforced while a whole document is decoded
+    return (os.path.splitext(file_path)[1].lower() in JSON_EXTENSIONS and os.path.isfile(file_path)
+            and limits.max_nodes is None and limits.max_depth is None)
+
+
+@paused_gc()
+def load_openapi_paths_subset(file_path: str, paths: List[str], compact: bool = False,
+                              limits: Optional[LoadLimits] = None, use_mmap: bool = False,
+                              json_scalars: bool = False) -> Dict[str, Any]:
+    """
+    Load the subset of an OpenAPI specification that contains only the operations of the given paths.
+
+    Uncompressed .json files are loaded lazily, decoding only the parts that the subset needs.
+    Other files, .json files that are not valid JSON (such as YAML), and specifications loaded
+    with node count or depth limits, are loaded in full with load_openapi_spec.
+
+    Args:
+        file_path: Path to the OpenAPI specification file, or '-' for standard input
+        paths: The paths whose operations are kept
+        compact: If True, load other files with the compact representation
+        limits: Limits on the size and shape of the input (defaults to LoadLimits())
+        use_mmap: If True, read other files through a memory mapping
+        json_scalars: If True, resolve plain scalars of YAML files as load_openapi_spec does with it
+
+    Returns:
+        Dict containing the subset of the OpenAPI specification
+
+    Raises:
+        ValueError: If the file is invalid
+        SelectionNotFoundError: If a path is not in the specification
+        SpecLimitError: If the specification exceeds one of the limits
+    """
+    logger = logging.getLogger(__name__)
+    limits = limits or LoadLimits()
+
+    if _can_load_lazily(file_path, limits):
+        try:
+            with LazyJSONSpec(file_path, limits) as spec:
+                return spec.subset(paths)
+        except (SpecLimitError, SelectionNotFoundError):
+            raise
+        except ValueError as e:
+            # A .json file may hold YAML, which load_openapi_spec reads, or report the error
+            logger.debug(f"Loading {file_path} in full, as it cannot be scanned as JSON: {str(e)}")
+
+    spec = load_openapi_spec(file_path, compact=compact, limits=limits, use_mmap=use_mmap,
+                             json_scalars=json_scalars)
+    return extract_paths_subset(spec, paths)
+
+
+def extract_paths_subset(spec: Dict[str, Any], paths: List[str]) -> Dict[str, Any]:
+    """
+    Extract the subset that contains only the operations of the given paths from a loaded specification.
+
+    Args:
+        spec: The OpenAPI specification, which is not modified
+        paths: The paths whose operations are kept
+
+    Returns:
+        Dict containing the subset of the OpenAPI specification
+
+    Raises:
+        SelectionNotFoundError: If a path is not in the specification
+    """
+    spec_paths = spec.get('paths') or {}
+    missing = [path for path in paths if path not in spec_paths]
+    if missing:
+        raise SelectionNotFoundError(f"Path not found: {', '.join(missing)}")
+    selected = set(paths)
+    return extract_operations_subset(spec, {path: list(HTTP_METHODS) for path in spec_paths if path in selected})
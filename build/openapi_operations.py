@@ -2,66 +2,596 @@
 """
 Operations for manipulating OpenAPI specifications.
 """
+import io
 import os
+import re
 import sys
+import mmap
 import json
 import yaml
-from typing import Dict, Any
+import stat
+import hashlib
+import secrets
+import functools
+import multiprocessing
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import logging
+from openapi_refs import (
+    HTTP_METHODS,
+    build_reference_graph,
+    collect_component_refs,
+    iter_operations,
+    resolve_component_closure,
+    shard_file_names
+)
+from compact_nodes import MAPPING_TYPES, CompactMapping, Interner, to_builtin
+from openapi_fragments import FragmentCache
+from gc_control import paused_gc
+from compression import (
+    detect_compression,
+    compression_from_extension,
+    compression_from_magic,
+    open_compressing_writer,
+    open_decompressing_reader,
+    strip_compression_extension
+)
 
+# Event parser of libyaml, if PyYAML is built with it
+try:
+    from yaml.cyaml import CParser as _LibYAMLParser
+except ImportError:
+    _LibYAMLParser = None
 
-def load_openapi_spec(file_path: str) -> Dict[str, Any]:
+JSON_EXTENSIONS = ('.json',)
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+# File path that stands for standard input
+STDIN_PATH = '-'
+
+# Buffer size for writing output files
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Shards being written by a worker process, inherited from the parent on fork
+_shard_writer_state: Dict[str, Any] = {}
+
+
+class SpecLimitError(ValueError):
+    """Raised when an OpenAPI specification exceeds one of the configured loading limits."""
+
+
+@dataclass(frozen=True)
+class LoadLimits:
+    """
+    Limits enforced while an OpenAPI specification is loaded. None disables a limit.
+
+    Attributes:
+        max_input_bytes: Maximum size of the input
+        max_nodes: Maximum number of nodes (keys, values and items), counting every
+            expansion of a YAML alias
+        max_depth: Maximum nesting depth, following YAML aliases
+        max_alias_expansions: Maximum number of nodes reached through YAML aliases
+    """
+    max_input_bytes: Optional[int] = None
+    max_nodes: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_alias_expansions: Optional[int] = 1_000_000
+
+
+@dataclass(frozen=True)
+class Projection:
+    """
+    Mapping entries left out while an OpenAPI specification is loaded, so that they are never constructed.
+
+    Loading with a projection gives the same specification as loading it in full and then
+    applying remove_descriptions and remove_extensions.
+
+    Attributes:
+        remove_descriptions: Leave out description fields
+        remove_extensions: Leave out OpenAPI Extensions (properties starting with x-)
+    """
+    remove_descriptions: bool = False
+    remove_extensions: bool = False
+
+    def drops(self, key: Any) -> bool:
+        """Return whether the mapping entry with the given key is left out."""
+        if self.remove_descriptions and key == 'description':
+            return True
+        return self.remove_extensions and isinstance(key, str) and key.startswith('x-')
+
+    def json_object_pairs_hook(self, build: Callable[[Any], Any] = dict) -> Callable[[Any], Any]:
+        """
+        Return an object hook for json.loads that leaves out the dropped entries.
+
+        Args:
+            build: Builds a mapping from the remaining key-value pairs
+
+        Returns:
+            The object_pairs_hook
+        """
+        drops = self.drops
+        return lambda pairs: build([(key, value) for key, value in pairs if not drops(key)])
+
+
+# Tag of YAML string scalars, including plain scalars resolved as strings
+_YAML_STR_TAG = 'tag:yaml.org,2002:str'
+
+
+class OpenAPILoader(yaml.SafeLoader):
+    """
+    YAML loader for OpenAPI specifications.
+
+    Behaves like yaml.SafeLoader, but shares a single instance of every repeated key and short
+    string value, optionally builds compact mappings instead of dicts, and optionally leaves out
+    the entries dropped by a projection without composing their values.
+
+    The loading limits are enforced while the document is composed, before any Python object
+    is constructed. Aliases are accounted for with the full size and depth of the node they
+    expand to, so an alias bomb is rejected as soon as its expansion exceeds a limit.
+    """
+
+    def __init__(self, stream: Any, compact: bool = False, limits: Optional[LoadLimits] = None,
+                 projection: Optional[Projection] = None):
+        super().__init__(stream)
+        self.compact = compact
+        self.projection = projection
+        self.interner = Interner()
+        self.limits = limits or LoadLimits()
+        self.node_count = 0
+        self.alias_expansions = 0
+        self.depth = 0
+        self.deepest = 0
+        # Expanded size and height of every anchored node, by anchor
+        self.anchor_extents: Dict[str, Any] = {}
+
+    def _check_limits(self, mark: Any) -> None:
+        """Raise SpecLimitError if the nodes composed so far exceed a limit."""
+        limits = self.limits
+        mark = f"(line {mark.line + 1}, column {mark.column + 1})"
+        if limits.max_nodes is not None and self.node_count > limits.max_nodes:
+            raise SpecLimitError(f"OpenAPI spec exceeds the limit of {limits.max_nodes} nodes {mark}")
+        if limits.max_depth is not None and self.deepest > limits.max_depth:
+            raise SpecLimitError(f"OpenAPI spec exceeds the nesting depth limit of {limits.max_depth} {mark}")
+        if limits.max_alias_expansions is not None and self.alias_expansions > limits.max_alias_expansions:
+            raise SpecLimitError(f"OpenAPI spec exceeds the limit of {limits.max_alias_expansions} "
+                                 f"nodes expanded from aliases {mark}")
+
+    def compose_node(self, parent: Any, index: Any) -> yaml.Node:
+        """Compose a node, keeping track of the expanded size and depth of the document."""
+        event = self.peek_event()
+        if isinstance(event, yaml.AliasEvent):
+            extent = self.anchor_extents.get(event.anchor)
+            if extent is None and event.anchor in self.anchors:
+                raise SpecLimitError(f"OpenAPI spec contains a recursive alias "
+                                     f"(line {event.start_mark.line + 1}, column {event.start_mark.column + 1})")
+            node = super().compose_node(parent, index)
+            size, height = extent
+            self.node_count += size
+            self.alias_expansions += size
+            self.deepest = max(self.deepest, self.depth + height)
+            self._check_limits(event.start_mark)
+            return node
+
+        self.depth += 1
+        self.node_count += 1
+        outer_deepest = self.deepest
+        self.deepest = self.depth
+        self._check_limits(event.start_mark)
+        start_count = self.node_count
+        node = super().compose_node(parent, index)
+        if event.anchor is not None:
+            self.anchor_extents[event.anchor] = (self.node_count - start_count + 1, self.deepest - self.depth + 1)
+        self.deepest = max(outer_deepest, self.deepest)
+        self.depth -= 1
+        return node
+
+    def compose_mapping_node(self, anchor: Optional[str]) -> yaml.MappingNode:
+        """Compose a mapping, skipping the entries dropped by the projection without composing their values."""
+        if self.projection is None:
+            return super().compose_mapping_node(anchor)
+        start_event = self.get_event()
+        tag = start_event.tag
+        if tag is None or tag == '!':
+            tag = self.resolve(yaml.MappingNode, None, start_event.implicit)
+        node = yaml.MappingNode(tag, [], start_event.start_mark, None, flow_style=start_event.flow_style)
+        if anchor is not None:
+            self.anchors[anchor] = node
+        drops = self.projection.drops
+        while not self.check_event(yaml.MappingEndEvent):
+            item_key = self.compose_node(node, None)
+            if item_key.tag == _YAML_STR_TAG and drops(item_key.value):
+                self._skip_node()
+            else:
+                node.value.append((item_key, self.compose_node(node, item_key)))
+        node.end_mark = self.get_event().end_mark
+        return node
+
+    def _skip_node(self) -> None:
+        """Consume the events of a node without composing it, except for the anchored nodes within it."""
+        depth = 0
+        while True:
+            event = self.peek_event()
+            if isinstance(event, yaml.AliasEvent) or getattr(event, 'anchor', None) is not None:
+                # Anchored nodes are composed, as aliases elsewhere in the document may refer to them
+                self.compose_node(None, None)
+            else:
+                self.get_event()
+                if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                    depth += 1
+                elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                    depth -= 1
+            if depth == 0:
+                return
+
+    def construct_interned_str(self, node: yaml.Node) -> str:
+        """Construct a string scalar, sharing repeated values."""
+        return self.interner.string(self.construct_scalar(node))
+
+    def construct_openapi_map(self, node: yaml.Node) -> Any:
+        """Construct a mapping, compact if requested."""
+        if not self.compact:
+            return self.construct_yaml_map(node)
+        return self.interner.mapping(list(self.construct_mapping(node).items()))
+
+
+OpenAPILoader.add_constructor('tag:yaml.org,2002:str', OpenAPILoader.construct_interned_str)
+OpenAPILoader.add_constructor('tag:yaml.org,2002:map', OpenAPILoader.construct_openapi_map)
+
+
+class JSONScalarLoader(OpenAPILoader):
+    """
+    OpenAPILoader with a minimal resolver for plain scalars.
+
+    Only null, booleans, integers and floats are recognized, in the spellings of the YAML 1.2
+    core schema without octal, hexadecimal, infinite and NaN numbers. Everything else stays a
+    string, including dates, yes/no/on/off and sexagesimal numbers, which yaml.SafeLoader turns
+    into values that json.dump cannot serialize or that differ from the text of the document.
+
+    When PyYAML is built with libyaml, the document is scanned and parsed into events by libyaml.
+    The events are composed and constructed in Python as usual, so the loading limits and the
+    projection apply unchanged.
+    """
+
+    def __init__(self, stream: Any, compact: bool = False, limits: Optional[LoadLimits] = None,
+                 projection: Optional[Projection] = None):
+        self.event_parser = _LibYAMLParser(stream) if _LibYAMLParser is not None else None
+        super().__init__('' if self.event_parser is not None else stream, compact=compact, limits=limits,
+                         projection=projection)
+
+    def check_event(self, *choices: Any) -> bool:
+        if self.event_parser is None:
+            return super().check_event(*choices)
+        return self.event_parser.check_event(*choices)
+
+    def peek_event(self) -> Any:
+        if self.event_parser is None:
+            return super().peek_event()
+        return self.event_parser.peek_event()
+
+    def get_event(self) -> Any:
+        if self.event_parser is None:
+            return super().get_event()
+        return self.event_parser.get_event()
+
+    def dispose(self) -> None:
+        super().dispose()
+        if self.event_parser is not None:
+            self.event_parser.dispose()
+
+    def construct_json_int(self, node: yaml.Node) -> int:
+        """Construct a decimal integer; leading zeros do not make it octal."""
+        return int(self.construct_scalar(node))
+
+    def construct_json_float(self, node: yaml.Node) -> float:
+        """Construct a float."""
+        return float(self.construct_scalar(node))
+
+
+# Implicit resolvers by tag: pattern and possible first characters, '' standing for an empty scalar
+_JSON_SCALAR_RESOLVERS = (
+    ('tag:yaml.org,2002:null', r'^(?:~|null|Null|NULL|)$', ['~', 'n', 'N', '']),
+    ('tag:yaml.org,2002:bool', r'^(?:true|True|TRUE|false|False|FALSE)$', list('tTfF')),
+    ('tag:yaml.org,2002:int', r'^[-+]?[0-9]+$', list('-+0123456789')),
+    ('tag:yaml.org,2002:float', r'^[-+]?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)(?:[eE][-+]?[0-9]+)?$', list('-+.0123456789')),
+    # Merge keys are not a scalar type, and OpenAPI documents use them to share definitions
+    ('tag:yaml.org,2002:merge', r'^(?:<<)$', ['<']),
+)
+
+JSONScalarLoader.yaml_implicit_resolvers = {}
+for _tag, _pattern, _first in _JSON_SCALAR_RESOLVERS:
+    JSONScalarLoader.add_implicit_resolver(_tag, re.compile(_pattern), _first)
+JSONScalarLoader.add_constructor('tag:yaml.org,2002:int', JSONScalarLoader.construct_json_int)
+JSONScalarLoader.add_constructor('tag:yaml.org,2002:float', JSONScalarLoader.construct_json_float)
+
+
+def _check_tree_limits(data: Any, limits: LoadLimits) -> None:
+    """Raise SpecLimitError if a parsed JSON document exceeds the node count or depth limits."""
+    if limits.max_nodes is None and limits.max_depth is None:
+        return
+    node_count = 0
+    stack = [(data, 1)]
+    while stack:
+        node, depth = stack.pop()
+        node_count += 1
+        if limits.max_depth is not None and depth > limits.max_depth:
+            raise SpecLimitError(f"OpenAPI spec exceeds the nesting depth limit of {limits.max_depth}")
+        if isinstance(node, MAPPING_TYPES):
+            node_count += len(node)
+            stack.extend((value, depth + 1) for value in node.values())
+        elif isinstance(node, list):
+            stack.extend((item, depth + 1) for item in node)
+        if limits.max_nodes is not None and node_count > limits.max_nodes:
+            raise SpecLimitError(f"OpenAPI spec exceeds the limit of {limits.max_nodes} nodes")
+
+
+class _LimitedReader:
+    """Binary stream wrapper that fails as soon as more than a given number of bytes is read."""
+
+    def __init__(self, stream: Any, max_bytes: Optional[int]):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self.max_bytes is None:
+            return self.stream.read(size)
+        # Never read more than one byte past the limit
+        remaining = self.max_bytes - self.bytes_read + 1
+        data = self.stream.read(remaining if size is None or size < 0 else min(size, remaining))
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise SpecLimitError(f"OpenAPI spec exceeds the input size limit of {self.max_bytes} bytes")
+        return data
+
+
+def _load_yaml(content: Any, compact: bool, limits: Optional[LoadLimits] = None,
+               projection: Optional[Projection] = None, json_scalars: bool = False) -> Any:
+    """Parse YAML content, or a binary stream of YAML, with the OpenAPI loader."""
+    loader_class = JSONScalarLoader if json_scalars else OpenAPILoader
+    loader = loader_class(content, compact=compact, limits=limits, projection=projection)
+    try:
+        return loader.get_single_data()
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML format: {str(e)}")
+    except RecursionError:
+        raise SpecLimitError("OpenAPI spec is nested too deeply to be parsed")
+    finally:
+        loader.dispose()
+
+
+def _check_spec_object(result: Any) -> Dict[str, Any]:
+    """Check that parsed content is an OpenAPI spec and return it with a dict at the top level."""
+    # The top level is always a dict, so that it can be modified by the callers
+    if isinstance(result, CompactMapping):
+        result = dict(result.items())
+
+    # Check if the result is a valid OpenAPI spec (should be a dict)
+    if not isinstance(result, dict):
+        raise ValueError("Invalid OpenAPI specification: content is not a valid JSON or YAML object")
+    return result
+
+
+@paused_gc()
+def parse_openapi_spec(content: Any, compact: bool = False, limits: Optional[LoadLimits] = None,
+                       projection: Optional[Projection] = None, json_scalars: bool = False) -> Dict[str, Any]:
+    """
+    Parse an OpenAPI specification from JSON or YAML content.
+
+    Args:
+        content: The content of the specification, as bytes or str
+        compact: If True, represent small mappings below the top level as CompactMapping objects
+        limits: Limits on the size and shape of the input (defaults to LoadLimits()); for JSON,
+            the node count and depth limits apply to the projected specification
+        projection: Mapping entries to leave out while the specification is built
+        json_scalars: If True, resolve plain YAML scalars with JSONScalarLoader, which only
+            recognizes null, booleans, integers and floats
+
+    Returns:
+        Dict containing the OpenAPI specification
+
+    Raises:
+        ValueError: If the content is not a valid JSON or YAML object
+        SpecLimitError: If the specification exceeds one of the limits
+    """
+    limits = limits or LoadLimits()
+    if limits.max_input_bytes is not None and len(content) > limits.max_input_bytes:
+        raise SpecLimitError(f"OpenAPI spec exceeds the input size limit of {limits.max_input_bytes} bytes")
+
+    result = None
+    # Try to parse as JSON first
+    try:
+        if projection is not None:
+            build = Interner().json_object_pairs_hook if compact else dict
+            result = json.loads(content, object_pairs_hook=projection.json_object_pairs_hook(build))
+        elif compact:
+            result = json.loads(content, object_pairs_hook=Interner().json_object_pairs_hook)
+        else:
+            result = json.loads(content)
+        # JSON has no aliases, so its size is bounded by the input size; check the shape once
+        _check_tree_limits(result, limits)
+    except json.JSONDecodeError:
+        # If JSON parsing fails, try YAML
+        result = _load_yaml(content, compact, limits, projection, json_scalars)
+    except RecursionError:
+        raise SpecLimitError("OpenAPI spec is nested too deeply to be parsed")
+
+    return _check_spec_object(result)
+
+
+def _read_openapi_spec_from_stdin(compact: bool, limits: LoadLimits, projection: Optional[Projection],
+                                  json_scalars: bool) -> Dict[str, Any]:
+    """Read an OpenAPI specification from standard input into a single buffer and parse it."""
+    content = _LimitedReader(sys.stdin.buffer, limits.max_input_bytes).read()
+    compression = compression_from_magic(content[:6])
+    if compression is not None:
+        with open_decompressing_reader(io.BytesIO(content), compression) as stream:
+            content = _LimitedReader(stream, limits.max_input_bytes).read()
+    return parse_openapi_spec(content, compact=compact, limits=limits, projection=projection,
+                              json_scalars=json_scalars)
+
+
+def _load_mapped_openapi_spec(f: Any, file_path: str, compact: bool, limits: LoadLimits,
+                              projection: Optional[Projection], json_scalars: bool) -> Dict[str, Any]:
+    """
+    Parse an uncompressed, non-empty file through a read-only memory mapping.
+
+    YAML is parsed straight from the mapping. Other content is decoded from the mapping into
+    a str, and the mapping is released before that str is parsed, so the file content is held
+    in memory only once.
+    """
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if limits.max_input_bytes is not None and len(mapped) > limits.max_input_bytes:
+            raise SpecLimitError(f"OpenAPI spec exceeds the input size limit of {limits.max_input_bytes} bytes")
+        if os.path.splitext(file_path)[1].lower() in YAML_EXTENSIONS:
+            return _check_spec_object(_load_yaml(mapped, compact, limits, projection, json_scalars))
+        try:
+            content = str(mapped, 'utf-8')
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Invalid OpenAPI specification: content is not valid UTF-8: {str(e)}")
+    return parse_openapi_spec(content, compact=compact, limits=limits, projection=projection,
+                              json_scalars=json_scalars)
+
+
+@paused_gc()
+def load_openapi_spec(file_path: str, compact: bool = False, limits: Optional[LoadLimits] = None,
+                      use_mmap: bool = False, projection: Optional[Projection] = None,
+                      json_scalars: bool = False) -> Dict[str, Any]:
     """
     Load an OpenAPI specification from a file.
+
+    Files compressed with gzip, bz2 or xz are recognized by their extension or their magic
+    number and decompressed while they are read. Compressed YAML files (such as spec.yaml.gz)
+    are decompressed straight into the YAML parser without buffering the whole document.
     
     Args:
-        file_path: Path to the OpenAPI specification file (JSON or YAML format)
+        file_path: Path to the OpenAPI specification file (JSON or YAML format), or '-' to
+            read it from standard input
+        compact: If True, represent small mappings below the top level as CompactMapping
+            objects, which take a fraction of the memory of dicts
+        limits: Limits on the size and shape of the input (defaults to LoadLimits()); the
+            input size limit applies to the decompressed content
+        use_mmap: If True, read an uncompressed file through a memory mapping instead of
+            copying it into memory, which lowers the peak memory use for large files
+        projection: Mapping entries to leave out while the specification is built, which saves
+            the time and memory of constructing them and of removing them afterwards
+        json_scalars: If True, resolve plain YAML scalars with JSONScalarLoader, which only
+            recognizes null, booleans, integers and floats; dates, for instance, stay strings
         
     Returns:
         Dict containing the OpenAPI specification
         
     Raises:
         ValueError: If the file format is not supported or the file is invalid
+        SpecLimitError: If the specification exceeds one of the limits
     """
     logger = logging.getLogger(__name__)
+    limits = limits or LoadLimits()
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        result = None
-        # Try to parse as JSON first
-        try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
-            # If JSON parsing fails, try YAML
-            try:
-                result = yaml.safe_load(content)
-            except yaml.YAMLError as e:
-                raise ValueError(f"Invalid YAML format: {str(e)}")
-        
-        # Check if the result is a valid OpenAPI spec (should be a dict)
-        if not isinstance(result, dict):
-            raise ValueError("Invalid OpenAPI specification: content is not a valid JSON or YAML object")
-        
-        # Return the loaded spec
-        return result
+        if file_path == STDIN_PATH:
+            return _read_openapi_spec_from_stdin(compact, limits, projection, json_scalars)
+
+        with open(file_path, 'rb') as f:
+            compression = detect_compression(file_path, f)
+            if compression is None:
+                # An empty file cannot be mapped; it is read, and rejected, as usual
+                if use_mmap and os.fstat(f.fileno()).st_size > 0:
+                    return _load_mapped_openapi_spec(f, file_path, compact, limits, projection, json_scalars)
+                content = _LimitedReader(f, limits.max_input_bytes).read()
+                return parse_openapi_spec(content, compact=compact, limits=limits, projection=projection,
+                                          json_scalars=json_scalars)
+
+            with open_decompressing_reader(f, compression) as stream:
+                reader = _LimitedReader(stream, limits.max_input_bytes)
+                if os.path.splitext(strip_compression_extension(file_path))[1].lower() in YAML_EXTENSIONS:
+                    return _check_spec_object(_load_yaml(reader, compact, limits, projection, json_scalars))
+                return parse_openapi_spec(reader.read(), compact=compact, limits=limits, projection=projection,
+                                          json_scalars=json_scalars)
     except Exception as e:
         logger.error(f"Error loading OpenAPI spec from {file_path}: {str(e)}")
         raise
 
 
-def remove_descriptions(data: Any) -> Any:
+def _remove_keys_in_place(data: Any, strip: Callable[[Dict[Any, Any]], None], memo: Dict[int, Any],
+                          replaced: List[Any]) -> Any:
+    """
+    Remove mapping entries from a tree in place.
+
+    Args:
+        data: The tree, or a part of it
+        strip: Function that removes the unwanted entries from a dict
+        memo: Results for the nodes transformed so far, by node id
+        replaced: The compact mappings replaced so far, which are kept alive until the whole tree
+            is transformed so that their ids in memo are not reused by new nodes
+
+    Returns:
+        The transformed node: data itself, or a new dict if data is an (immutable) compact mapping
+    """
+    if isinstance(data, (dict, list) + MAPPING_TYPES):
+        if id(data) in memo:
+            return memo[id(data)]
+        if isinstance(data, (dict, list)):
+            result = data
+        else:
+            result = dict(data.items())
+            replaced.append(data)
+        memo[id(data)] = result
+        if isinstance(result, dict):
+            strip(result)
+            entries = result.items()
+        else:
+            entries = enumerate(result)
+        for key, value in entries:
+            if isinstance(value, (dict, list) + MAPPING_TYPES):
+                transformed = _remove_keys_in_place(value, strip, memo, replaced)
+                if transformed is not value:
+                    # Replacing the value of an existing key does not disturb the iteration
+                    result[key] = transformed
+        return result
+    return data
+
+
+def _strip_descriptions(mapping: Dict[Any, Any]) -> None:
+    """Remove the description of a mapping in place."""
+    mapping.pop('description', None)
+    # Special case for the test data structure, as in remove_descriptions
+    responses = mapping.get('responses')
+    if isinstance(responses, MAPPING_TYPES) and 'x-response-type' in responses and '200' in responses:
+        reordered = {'x-response-type': responses['x-response-type']}
+        reordered.update((key, value) for key, value in responses.items() if key != 'x-response-type')
+        mapping['responses'] = reordered
+
+
+def _strip_extensions(mapping: Dict[Any, Any]) -> None:
+    """Remove the OpenAPI Extensions of a mapping in place."""
+    for key in [key for key in mapping if isinstance(key, str) and key.startswith('x-')]:
+        del mapping[key]
+
+
+def remove_descriptions(data: Any, memo: Optional[Dict[int, Any]] = None, in_place: bool = False) -> Any:
     """
     Recursively remove description fields from an OpenAPI specification.
     
     Args:
         data: The OpenAPI specification or a part of it
+        memo: Results for the nodes transformed so far, by node id. A node that occurs several
+            times (such as a YAML anchor) is transformed once and stays shared in the result.
+        in_place: If True, remove the fields from the containers of data instead of building a
+            new tree, so that the original and the result do not take memory side by side. Only
+            compact mappings, which are immutable, are replaced. data must not be used afterwards,
+            except through the result.
         
     Returns:
         The OpenAPI specification with description fields removed
     """
-    if isinstance(data, dict):
+    if memo is None:
+        memo = {}
+    if in_place:
+        return _remove_keys_in_place(data, _strip_descriptions, memo, [])
+    if isinstance(data, MAPPING_TYPES):
+        if id(data) in memo:
+            return memo[id(data)]
         # Special case for the test data structure
         if 'responses' in data and 'x-response-type' in data['responses'] and '200' in data['responses']:
             # Create a copy to avoid modifying the original
@@ -73,96 +603,373 @@ def remove_descriptions(data: Any) -> Any:
                         responses = {'x-response-type': value['x-response-type']}
                         for resp_key, resp_value in value.items():
                             if resp_key != 'x-response-type':
-                                responses[resp_key] = remove_descriptions(resp_value)
+                                responses[resp_key] = remove_descriptions(resp_value, memo)
                         result[key] = responses
                     else:
-                        result[key] = remove_descriptions(value)
-            return result
+                        result[key] = remove_descriptions(value, memo)
         else:
             # Standard case - remove description fields
-            return {k: remove_descriptions(v) for k, v in data.items() if k != 'description'}
+            result = {k: remove_descriptions(v, memo) for k, v in data.items() if k != 'description'}
+        memo[id(data)] = result
+        return result
     elif isinstance(data, list):
+        if id(data) in memo:
+            return memo[id(data)]
         # Process each item in the list
-        return [remove_descriptions(item) for item in data]
+        result = [remove_descriptions(item, memo) for item in data]
+        memo[id(data)] = result
+        return result
     else:
         # Return primitive values as is
         return data
 
 
-def remove_extensions(data: Any) -> Any:
+def remove_extensions(data: Any, memo: Optional[Dict[int, Any]] = None, in_place: bool = False) -> Any:
     """
     Recursively remove OpenAPI Extensions (properties starting with x-) from an OpenAPI specification.
     
     Args:
         data: The OpenAPI specification or a part of it
+        memo: Results for the nodes transformed so far, by node id. A node that occurs several
+            times (such as a YAML anchor) is transformed once and stays shared in the result.
+        in_place: If True, remove the fields from the containers of data instead of building a
+            new tree, as remove_descriptions does with it
         
     Returns:
         The OpenAPI specification with extension fields removed
     """
-    if isinstance(data, dict):
+    if memo is None:
+        memo = {}
+    if in_place:
+        return _remove_keys_in_place(data, _strip_extensions, memo, [])
+    if isinstance(data, MAPPING_TYPES):
+        if id(data) in memo:
+            return memo[id(data)]
         # Create a new dict without keys starting with 'x-'
         result = {}
         for key, value in data.items():
-            if not key.startswith('x-'):
-                result[key] = remove_extensions(value)
+            if not (isinstance(key, str) and key.startswith('x-')):
+                result[key] = remove_extensions(value, memo)
+        memo[id(data)] = result
         return result
     elif isinstance(data, list):
-        return [remove_extensions(item) for item in data]
+        if id(data) in memo:
+            return memo[id(data)]
+        result = [remove_extensions(item, memo) for item in data]
+        memo[id(data)] = result
+        return result
     else:
         return data
 
 
-def save_openapi_spec(spec: Dict[str, Any], file_path: str) -> None:
+def _infer_yaml_format(file_path: str, use_yaml: Optional[bool]) -> bool:
+    """Decide whether a file is written as YAML from its extension, the caller or its current content."""
+    file_extension = os.path.splitext(strip_compression_extension(file_path))[1].lower()
+    if file_extension in JSON_EXTENSIONS:
+        return False
+    if file_extension in YAML_EXTENSIONS:
+        return True
+    if use_yaml is not None:
+        return use_yaml
+    # Sniff the existing file before it is replaced; JSON starts with {
+    try:
+        with open(file_path, 'r', encoding='utf-8') as original:
+            return original.read(1) != '{'
+    except FileNotFoundError:
+        return False
+
+
+def _file_digest(file_path: str) -> bytes:
+    """Return the SHA-256 digest of a file, read in large chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(OUTPUT_BUFFER_SIZE), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _create_temp_file(directory: str, name: str) -> Tuple[int, str]:
     """
-    Save an OpenAPI specification to a file in the same format as the original.
-    
+    Create a new temporary file next to an output file, with the permissions a regular file gets from the umask.
+
+    Args:
+        directory: The directory of the output file
+        name: The name of the output file
+
+    Returns:
+        The open file descriptor and the path of the temporary file
+    """
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def _same_content(first_path: str, second_path: str) -> bool:
+    """Return True if both files exist and have the same content."""
+    try:
+        if os.path.getsize(first_path) != os.path.getsize(second_path):
+            return False
+    except FileNotFoundError:
+        return False
+    return _file_digest(first_path) == _file_digest(second_path)
+
+
+def save_openapi_spec(spec: Dict[str, Any], file_path: str, use_yaml: Optional[bool] = None,
+                      yaml_aliases: bool = True, compression: Optional[str] = None,
+                      writer: Optional[Callable[[Any], None]] = None,
+                      fragments: Optional[FragmentCache] = None) -> bool:
+    """
+    Save an OpenAPI specification to a file, atomically.
+
+    The format is inferred from the file extension (.json, .yaml or .yml), ignoring a trailing
+    compression extension. For other extensions use_yaml decides, and if it is not given, the
+    format of the existing file is kept. The compression format is inferred from the extension
+    (.gz, .bz2, .xz) unless it is given.
+
+    The specification is written through a large buffer to a temporary file next to the
+    destination, which then replaces the destination in a single rename. If the destination
+    already has exactly the new content, it is left untouched so that its mtime stays stable.
+
     Args:
         spec: The OpenAPI specification to save
-        file_path: Path to the original OpenAPI specification file
-        
-    Raises:
-        ValueError: If the file format is not supported
+        file_path: Path of the file to write
+        use_yaml: Format to use when the extension does not determine it
+        yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+        compression: One of 'gzip', 'bz2' or 'xz' to compress the file
+        writer: Function that writes the content to a text stream, in place of write_openapi_spec
+        fragments: Cache of serialized operations and components to write JSON from
+
+    Returns:
+        True if the file was written, False if it was already up to date
     """
     logger = logging.getLogger(__name__)
-    
-    # Determine the output format based on the file extension
-    file_extension = os.path.splitext(file_path)[1].lower()
-    
+
+    temp_path = None
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            if file_extension in ['.json']:
-                json.dump(spec, f, indent=2)
-            elif file_extension in ['.yaml', '.yml']:
-                yaml.dump(spec, f, sort_keys=False)
-            else:
-                # If the extension is not recognized, try to determine the format from the content
-                with open(file_path, 'r', encoding='utf-8') as original:
-                    if original.read(1) == '{':  # JSON starts with {
-                        json.dump(spec, f, indent=2)
-                    else:
-                        yaml.dump(spec, f, sort_keys=False)
+        use_yaml = _infer_yaml_format(file_path, use_yaml)
+        compression = compression or compression_from_extension(file_path)
+        if writer is None:
+            writer = functools.partial(write_openapi_spec, spec, use_yaml=use_yaml, yaml_aliases=yaml_aliases,
+                                       fragments=fragments)
+        # A symbolic link is kept, and the file it points to is replaced
+        target_path = os.path.realpath(file_path)
+        directory = os.path.dirname(target_path)
+        fd, temp_path = _create_temp_file(directory, os.path.basename(target_path))
+        if compression:
+            with open(fd, 'wb', buffering=OUTPUT_BUFFER_SIZE) as raw, open_compressing_writer(raw, compression) as f:
+                writer(f)
+        else:
+            with open(fd, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+                writer(f)
+
+        if _same_content(temp_path, target_path):
+            os.unlink(temp_path)
+            logger.debug(f"OpenAPI spec in {file_path} is unchanged, leaving it untouched")
+            return False
+
+        # A new file keeps the permissions that the umask gave the temporary one
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(target_path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, target_path)
+        return True
     except Exception as e:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.unlink(temp_path)
         logger.error(f"Error saving OpenAPI spec to {file_path}: {str(e)}")
         raise
 
 
-def output_openapi_spec_to_stdout(spec: Dict[str, Any], use_yaml: bool = False) -> None:
+class NoAliasDumper(yaml.Dumper):
+    """YAML dumper that writes every occurrence of a shared node in full instead of using an alias."""
+
+    def ignore_aliases(self, data: Any) -> bool:
+        return True
+
+
+def output_openapi_spec_to_stdout(spec: Dict[str, Any], use_yaml: bool = False, yaml_aliases: bool = True) -> None:
     """
     Output an OpenAPI specification to standard output in JSON or YAML format.
     
     Args:
         spec: The OpenAPI specification to output
         use_yaml: If True, output in YAML format; otherwise, output in JSON format
+        yaml_aliases: If True, nodes shared within the specification are output once as a YAML
+            anchor and referenced by aliases; otherwise every occurrence is written in full
     """
     logger = logging.getLogger(__name__)
     
     try:
-        if use_yaml:
+        if use_yaml and not yaml_aliases:
+            yaml.dump(spec, sys.stdout, sort_keys=False, default_flow_style=False, Dumper=NoAliasDumper)
+        elif use_yaml:
             # Output in YAML format with keys not quoted
             yaml.dump(spec, sys.stdout, sort_keys=False, default_flow_style=False)
         else:
             # Output in JSON format
-            json.dump(spec, sys.stdout, indent=2)
+            json.dump(spec, sys.stdout, indent=2, default=to_builtin)
     except Exception as e:
         logger.error(f"Error outputting OpenAPI spec to stdout: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def output_compressed_openapi_spec_to_stdout(spec: Dict[str, Any], compression: str, use_yaml: bool = False,
+                                            yaml_aliases: bool = True,
+                                            writer: Optional[Callable[[Any], None]] = None) -> None:
+    """
+    Output an OpenAPI specification to standard output, compressed.
+
+    Args:
+        spec: The OpenAPI specification to output
+        compression: One of 'gzip', 'bz2' or 'xz'
+        use_yaml: If True, output in YAML format; otherwise, output in JSON format
+        yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+        writer: Function that writes the content to a text stream, in place of write_openapi_spec
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        sys.stdout.flush()
+        with open_compressing_writer(sys.stdout.buffer, compression) as f:
+            if writer is None:
+                write_openapi_spec(spec, f, use_yaml=use_yaml, yaml_aliases=yaml_aliases)
+            else:
+                writer(f)
+        sys.stdout.buffer.flush()
+    except Exception as e:
+        logger.error(f"Error outputting compressed OpenAPI spec to stdout: {str(e)}")
+        raise
+
+
+def output_openapi_spec_as_ndjson(spec: Dict[str, Any], stream: Any = None) -> int:
+    """
+    Output the operations of an OpenAPI specification as newline-delimited JSON.
+
+    Each line is a JSON object with the path, the method, the operation object and the
+    names of all components the operation references, grouped by component section.
+    Every line is flushed as soon as it is written so that consumers can start processing
+    operations before the whole specification has been emitted.
+
+    Args:
+        spec: The OpenAPI specification to output
+        stream: Writable text stream (defaults to standard output)
+
+    Returns:
+        Number of operations written
+    """
+    logger = logging.getLogger(__name__)
+    if stream is None:
+        stream = sys.stdout
+
+    try:
+        graph = build_reference_graph(spec)
+        path_level_refs = {}
+        count = 0
+        for path, method, operation in iter_operations(spec):
+            if path not in path_level_refs:
+                path_item = spec['paths'][path]
+                path_level_refs[path] = collect_component_refs(
+                    {key: value for key, value in path_item.items() if key not in HTTP_METHODS})
+            reached = resolve_component_closure(graph, collect_component_refs(operation) | path_level_refs[path])
+            components = {}
+            for section, name in sorted(reached):
+                components.setdefault(section, []).append(name)
+            line = {"path": path, "method": method, "operation": operation, "components": components}
+            stream.write(json.dumps(line, default=to_builtin) + '\n')
+            stream.flush()
+            count += 1
+        return count
+    except Exception as e:
+        logger.error(f"Error outputting OpenAPI spec as NDJSON: {str(e)}")
+        raise
+
+
+def write_openapi_spec(spec: Dict[str, Any], stream: Any, use_yaml: bool = False, yaml_aliases: bool = True,
+                       fragments: Optional[FragmentCache] = None) -> None:
+    """
+    Write an OpenAPI specification to a text stream in JSON or YAML format.
+
+    Args:
+        spec: The OpenAPI specification to write
+        stream: Writable text stream
+        use_yaml: If True, write in YAML format; otherwise, write in JSON format
+        yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+        fragments: Cache of serialized operations and components to write JSON from, for
+            specifications that share nodes with others written before
+    """
+    if use_yaml:
+        yaml.dump(spec, stream, sort_keys=False, default_flow_style=False,
+                  Dumper=yaml.Dumper if yaml_aliases else NoAliasDumper)
+    elif fragments is not None:
+        fragments.write(spec, stream)
+    else:
+        json.dump(spec, stream, indent=2, default=to_builtin)
+
+
+def _init_shard_writer(shards: Dict[str, Dict[str, Any]], write_options: Dict[str, Any]) -> None:
+    """Initialize a shard writer process with the shards inherited from the parent."""
+    _shard_writer_state['shards'] = shards
+    _shard_writer_state['write_options'] = write_options
+    # Shards share components, which each writer serializes once
+    _shard_writer_state['fragments'] = FragmentCache()
+
+
+def _write_shard(shard_name: str, file_path: str) -> str:
+    """Write a single shard to its file and return the file path."""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        write_openapi_spec(_shard_writer_state['shards'][shard_name], f, fragments=_shard_writer_state['fragments'],
+                           **_shard_writer_state['write_options'])
+    return file_path
+
+
+def write_openapi_spec_shards(shards: Dict[str, Dict[str, Any]], output_dir: str,
+                              use_yaml: bool = False, max_workers: Optional[int] = None,
+                              yaml_aliases: bool = True) -> Dict[str, str]:
+    """
+    Write each shard of an OpenAPI specification to its own file, concurrently.
+
+    Serialization is CPU bound, so the shards are written by a pool of forked worker
+    processes that inherit the shards from the parent instead of receiving pickled copies.
+    On platforms without fork a thread pool is used instead.
+
+    Args:
+        shards: Dict mapping shard names to their subsets, as returned by split_openapi_spec
+        output_dir: Directory to write the shard files to; created if it does not exist
+        use_yaml: If True, write the shards in YAML format; otherwise, in JSON format
+        max_workers: Maximum number of concurrent writers (defaults to the CPU count)
+        yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+
+    Returns:
+        Dict mapping each shard name to the path of the written file
+    """
+    logger = logging.getLogger(__name__)
+
+    os.makedirs(output_dir, exist_ok=True)
+    file_names = shard_file_names(list(shards), '.yaml' if use_yaml else '.json')
+    file_paths = {name: os.path.join(output_dir, file_name) for name, file_name in file_names.items()}
+    if not shards:
+        return file_paths
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(shards))
+    write_options = {'use_yaml': use_yaml, 'yaml_aliases': yaml_aliases}
+    try:
+        if max_workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            executor = ProcessPoolExecutor(max_workers=max_workers,
+                                           mp_context=multiprocessing.get_context('fork'),
+                                           initializer=_init_shard_writer,
+                                           initargs=(shards, write_options))
+        else:
+            _init_shard_writer(shards, write_options)
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        with executor:
+            futures = [executor.submit(_write_shard, name, path) for name, path in file_paths.items()]
+            for future in futures:
+                logger.debug(f"Wrote shard {future.result()}")
+    except Exception as e:
+        logger.error(f"Error writing OpenAPI spec shards to {output_dir}: {str(e)}")
+        raise
+    return file_paths
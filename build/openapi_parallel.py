@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Parallel transformation and JSON serialization of large OpenAPI specifications.
+
+The entries of the paths object and of every components section are partitioned into chunks
+in document order. Worker processes transform and serialize the chunks, and the parent writes
+the fragments back in the same order, so the output is byte-identical to transforming the
+whole specification and writing it with json.dump(indent=2).
+"""
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator, Tuple
+from compact_nodes import MAPPING_TYPES
+from openapi_fragments import JSON_INDENT, encode_json_key, serialize_fragment
+from openapi_operations import remove_descriptions, remove_extensions
+
+
+# Specifications loaded from smaller inputs are transformed in-process; the pool would cost more than it saves
+PARALLEL_MIN_INPUT_BYTES = 8 << 20
+
+# Number of entries transformed and serialized by a worker per task
+CHUNK_ENTRIES = 128
+
+# Location of a partitioned container in the specification, e.g. ('components', 'schemas')
+ContainerPath = Tuple[str, ...]
+
+# The specification and transform options, set in the parent and inherited by forked workers
+_parallel_state: Dict[str, Any] = {}
+
+
+def _keeps_key(key: Any, options: Dict[str, bool]) -> bool:
+    """Return whether the transforms keep a mapping entry, as decided by its key."""
+    if options['remove_descriptions'] and key == 'description':
+        return False
+    if options['remove_extensions'] and isinstance(key, str) and key.startswith('x-'):
+        return False
+    return True
+
+
+def _transform(value: Any, options: Dict[str, bool]) -> Any:
+    """Apply the requested transforms to a part of the specification."""
+    if options['remove_descriptions']:
+        value = remove_descriptions(value)
+    if options['remove_extensions']:
+        value = remove_extensions(value)
+    return value
+
+
+def _lookup(spec: Dict[str, Any], path: ContainerPath) -> Any:
+    """Return the container at a location of the specification."""
+    for key in path:
+        spec = spec[key]
+    return spec
+
+
+def _serialize_chunk(path: ContainerPath, keys: List[Any]) -> str:
+    """Transform and serialize a chunk of entries of a container, in a worker."""
+    spec = _parallel_state['spec']
+    options = _parallel_state['options']
+    container = _lookup(spec, path)
+    # The container is at depth len(path), its entries one level deeper
+    depth = len(path) + 1
+    entry_indent = '\n' + ' ' * (depth * JSON_INDENT)
+    return ','.join(f"{entry_indent}{encode_json_key(key)}: {serialize_fragment(_transform(container[key], options), depth)}"
+                    for key in keys)
+
+
+def _partitioned_containers(spec: Dict[str, Any], options: Dict[str, bool]) -> Iterator[ContainerPath]:
+    """Yield the locations of the containers whose entries are processed by the workers, in document order."""
+    for key, value in spec.items():
+        if not _keeps_key(key, options) or not isinstance(value, MAPPING_TYPES):
+            continue
+        if key == 'paths':
+            yield (key,)
+        elif key == 'components':
+            for section, entries in value.items():
+                if _keeps_key(section, options) and isinstance(entries, MAPPING_TYPES):
+                    yield (key, section)
+
+
+class _ParallelWriter:
+    """Writes the skeleton of the specification, pulling the serialized chunks in document order."""
+
+    def __init__(self, spec: Dict[str, Any], stream: Any, options: Dict[str, bool],
+                 chunk_keys: Dict[ContainerPath, List[List[Any]]], chunks: Iterator[str]):
+        self.spec = spec
+        self.stream = stream
+        self.options = options
+        self.chunk_keys = chunk_keys
+        self.chunks = chunks
+
+    def write_mapping(self, mapping: Any, path: ContainerPath) -> None:
+        """Write a mapping at a location, delegating partitioned containers and entries to the workers."""
+        depth = len(path)
+        if path in self.chunk_keys:
+            chunk_count = len(self.chunk_keys[path])
+            if chunk_count == 0:
+                self.stream.write('{}')
+                return
+            self.stream.write('{')
+            for index in range(chunk_count):
+                if index:
+                    self.stream.write(',')
+                self.stream.write(next(self.chunks))
+        else:
+            entries = [(key, value) for key, value in mapping.items() if _keeps_key(key, self.options)]
+            if not entries:
+                self.stream.write('{}')
+                return
+            self.stream.write('{')
+            entry_indent = '\n' + ' ' * ((depth + 1) * JSON_INDENT)
+            for index, (key, value) in enumerate(entries):
+                self.stream.write(f"{',' if index else ''}{entry_indent}{encode_json_key(key)}: ")
+                if (path + (key,)) in self.chunk_keys or (not path and key == 'components'
+                                                         and isinstance(value, MAPPING_TYPES)):
+                    self.write_mapping(value, path + (key,))
+                else:
+                    self.stream.write(serialize_fragment(_transform(value, self.options), depth + 1))
+        self.stream.write('\n' + ' ' * (depth * JSON_INDENT) + '}')
+
+
+def write_openapi_spec_parallel(spec: Dict[str, Any], stream: Any, jobs: int,
+                                remove_descriptions: bool = False, remove_extensions: bool = False,
+                                chunk_entries: int = CHUNK_ENTRIES) -> None:
+    """
+    Transform an OpenAPI specification and write it to a text stream as JSON, using worker processes.
+
+    The output is the same as removing the requested fields with remove_descriptions and
+    remove_extensions and writing the result with write_openapi_spec. The specification is
+    inherited by forked workers instead of being pickled; on platforms without fork, a thread
+    pool is used instead.
+
+    Args:
+        spec: The OpenAPI specification, untransformed
+        stream: Writable text stream
+        jobs: Number of worker processes
+        remove_descriptions: If True, remove description fields
+        remove_extensions: If True, remove extension fields (x-...)
+        chunk_entries: Number of entries per task
+    """
+    logger = logging.getLogger(__name__)
+
+    options = {'remove_descriptions': remove_descriptions, 'remove_extensions': remove_extensions}
+    chunk_keys = {}
+    tasks = []
+    for path in _partitioned_containers(spec, options):
+        keys = [key for key in _lookup(spec, path) if _keeps_key(key, options)]
+        chunk_keys[path] = [keys[start:start + chunk_entries] for start in range(0, len(keys), chunk_entries)]
+        tasks.extend((path, chunk) for chunk in chunk_keys[path])
+    logger.debug(f"Transforming the OpenAPI spec in {len(tasks)} chunks with {jobs} workers")
+
+    _parallel_state['spec'] = spec
+    _parallel_state['options'] = options
+    try:
+        if jobs > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('fork'))
+        else:
+            executor = ThreadPoolExecutor(max_workers=max(jobs, 1))
+        with executor:
+            # map() yields the fragments in task order, while later tasks are still running
+            chunks = executor.map(_serialize_chunk, *zip(*tasks)) if tasks else iter(())
+            _ParallelWriter(spec, stream, options, chunk_keys, chunks).write_mapping(spec, ())
+    finally:
+        _parallel_state.clear()
+
+
+def input_size(file_path: str) -> int:
+    """Return the size of an input file in bytes, or 0 if it is not a regular file (such as stdin)."""
+    try:
+        return os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+    except OSError:
+        return 0
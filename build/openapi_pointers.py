@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Selection of parts of OpenAPI specifications by JSON pointer (RFC 6901).
+
+A selection contains the nodes that the pointers point to, at their locations in the
+specification, together with the components that they reference through $ref, transitively,
+and the openapi and info members, so that it is an OpenAPI document.
+Pointers and references are resolved on demand, and every resolved node is cached by its
+location, so a selection walks only the parts of the specification it needs, and many pointers
+into one specification share their lookups.
+"""
+import re
+from urllib.parse import unquote
+from typing import Dict, Any, Iterable, List, Set, Tuple
+from compact_nodes import MAPPING_TYPES
+from openapi_refs import ComponentKey, SelectionNotFoundError, collect_component_refs, unescape_json_pointer_token
+
+# Members of the specification that every selection contains, so that it is an OpenAPI document
+DOCUMENT_MEMBERS = ('openapi', 'info')
+
+# Array indexes in JSON pointers have no sign and no leading zeros
+_ARRAY_INDEX = re.compile(r'0|[1-9][0-9]*')
+
+# Reference tokens of a JSON pointer, unescaped, e.g. ('paths', '/tasks', 'get')
+Tokens = Tuple[str, ...]
+
+# Keys and indexes of a node in the specification, e.g. ('paths', '/tasks', 'responses', 200)
+Location = Tuple[Any, ...]
+
+
+def parse_json_pointer(pointer: str) -> Tokens:
+    """
+    Parse a JSON pointer, or a URI fragment with a JSON pointer such as those of $ref values.
+
+    Args:
+        pointer: The JSON pointer, e.g. '/paths/~1tasks' or '#/components/schemas/Task';
+            the empty pointer ('' or '#') points to the whole document
+
+    Returns:
+        The unescaped reference tokens
+
+    Raises:
+        ValueError: If the pointer is not empty and does not start with '/'
+    """
+    if pointer.startswith('#'):
+        # Characters of URI fragments are percent-encoded
+        pointer = unquote(pointer[1:])
+    if not pointer:
+        return ()
+    if not pointer.startswith('/'):
+        raise ValueError(f"Invalid JSON pointer '{pointer}': it must be empty or start with '/'")
+    return tuple(unescape_json_pointer_token(token) for token in pointer[1:].split('/'))
+
+
+class PointerResolver:
+    """
+    Resolves JSON pointers and $ref closures in an OpenAPI specification, caching every lookup.
+
+    The specification must not be modified while the resolver is in use.
+    """
+
+    def __init__(self, spec: Any):
+        """
+        Args:
+            spec: The OpenAPI specification
+        """
+        # Resolved nodes by their tokens, with their locations
+        self._nodes: Dict[Tokens, Tuple[Location, Any]] = {(): ((), spec)}
+        # Resolved nodes by their locations
+        self._located: Dict[Location, Any] = {(): spec}
+        # Components directly referenced from the resolved nodes, by their locations
+        self._refs: Dict[Location, Set[ComponentKey]] = {}
+
+    def _child(self, node: Any, token: str) -> Tuple[Any, Any]:
+        """
+        Return the key and the value of the member of a node that a reference token points to.
+
+        Raises:
+            KeyError: If the node has no such member
+        """
+        if isinstance(node, MAPPING_TYPES):
+            if token in node:
+                return token, node[token]
+            # Keys such as response codes are numbers in YAML documents
+            if _ARRAY_INDEX.fullmatch(token) and int(token) in node:
+                return int(token), node[int(token)]
+        elif isinstance(node, list):
+            if _ARRAY_INDEX.fullmatch(token) and int(token) < len(node):
+                return int(token), node[int(token)]
+        raise KeyError(token)
+
+    def _keys(self, node: Any) -> Iterable[Any]:
+        """Return the keys of a mapping or the indexes of a list, in document order."""
+        return node.keys() if isinstance(node, MAPPING_TYPES) else range(len(node))
+
+    def _materialize(self, node: Any) -> Any:
+        """Return a resolved node as it appears in selections."""
+        return node
+
+    def resolve_tokens(self, tokens: Tokens) -> Tuple[Location, Any]:
+        """
+        Resolve the reference tokens of a JSON pointer, from the longest prefix resolved before.
+
+        Args:
+            tokens: The unescaped reference tokens
+
+        Returns:
+            Tuple of (location, node)
+
+        Raises:
+            SelectionNotFoundError: If the pointer does not point to a node of the specification
+        """
+        resolved = self._nodes.get(tokens)
+        if resolved is not None:
+            return resolved
+        prefix = len(tokens) - 1
+        while tokens[:prefix] not in self._nodes:
+            prefix -= 1
+        location, node = self._nodes[tokens[:prefix]]
+        for index in range(prefix, len(tokens)):
+            try:
+                key, node = self._child(node, tokens[index])
+            except KeyError:
+                pointer = ''.join('/' + token.replace('~', '~0').replace('/', '~1') for token in tokens)
+                raise SelectionNotFoundError(f"JSON pointer not found: {pointer}") from None
+            location = location + (key,)
+            self._nodes[tokens[:index + 1]] = (location, node)
+            self._located[location] = node
+        return location, node
+
+    def resolve(self, pointer: str) -> Any:
+        """
+        Resolve a JSON pointer.
+
+        Args:
+            pointer: The JSON pointer
+
+        Returns:
+            The node it points to
+
+        Raises:
+            ValueError: If the pointer is invalid
+            SelectionNotFoundError: If the pointer does not point to a node of the specification
+        """
+        return self._materialize(self.resolve_tokens(parse_json_pointer(pointer))[1])
+
+    def _references(self, location: Location) -> Set[ComponentKey]:
+        """Return the components directly referenced from a resolved node."""
+        refs = self._refs.get(location)
+        if refs is None:
+            refs = self._refs[location] = collect_component_refs(self._materialize(self._located[location]))
+        return refs
+
+    def component_closure(self, locations: Iterable[Location]) -> Dict[ComponentKey, Location]:
+        """
+        Resolve the components that resolved nodes reference, transitively.
+
+        References to components that do not exist are ignored.
+
+        Args:
+            locations: Locations of resolved nodes
+
+        Returns:
+            Dict mapping each reached component to its location
+        """
+        reached: Dict[ComponentKey, Location] = {}
+        pending: Set[ComponentKey] = set()
+        for location in locations:
+            pending.update(self._references(location))
+        while pending:
+            component = pending.pop()
+            if component in reached:
+                continue
+            try:
+                location, _ = self.resolve_tokens(('components',) + component)
+            except SelectionNotFoundError:
+                continue
+            reached[component] = location
+            pending.update(self._references(location))
+        return reached
+
+    def _build(self, tree: Dict[Any, Any], location: Location) -> Any:
+        """Build the selection below a location from the tree of selected keys."""
+        node = self._located[location]
+        keys = list(tree)
+        if len(keys) > 1:
+            keys = [key for key in self._keys(node) if key in tree]
+        children = [self._materialize(self._located[location + (key,)]) if tree[key] is None
+                    else self._build(tree[key], location + (key,)) for key in keys]
+        if isinstance(node, list):
+            return children
+        return dict(zip(keys, children))
+
+    def select(self, pointers: List[str]) -> Any:
+        """
+        Select the nodes that JSON pointers point to, with the components they reference.
+
+        Args:
+            pointers: The JSON pointers
+
+        Returns:
+            The selected nodes and components, and the members of DOCUMENT_MEMBERS that the
+            specification has, at their locations, in document order; nodes are shared with the
+            specification, not copied
+
+        Raises:
+            ValueError: If a pointer is invalid
+            SelectionNotFoundError: If a pointer does not point to a node of the specification
+        """
+        selected = [self.resolve_tokens(parse_json_pointer(pointer))[0] for pointer in pointers]
+        selected.extend(self.component_closure(selected).values())
+        for member in DOCUMENT_MEMBERS:
+            try:
+                selected.append(self.resolve_tokens((member,))[0])
+            except SelectionNotFoundError:
+                pass
+
+        # Tree of the selected keys, in which None marks a selected node; nodes below it are part of it
+        tree: Dict[Any, Any] = {}
+        for location in sorted(set(selected), key=len):
+            if not location:
+                return self._materialize(self._located[()])
+            parent = tree
+            for key in location[:-1]:
+                parent = parent.setdefault(key, {})
+                if parent is None:
+                    break
+            else:
+                parent[location[-1]] = None
+        return self._build(tree, ())
+
+
+def select_json_pointers(spec: Dict[str, Any], pointers: List[str]) -> Any:
+    """
+    Select the nodes that JSON pointers point to in a loaded specification, with the components they reference.
+
+    Args:
+        spec: The OpenAPI specification, which is not modified
+        pointers: The JSON pointers
+
+    Returns:
+        The selected nodes and components, with the openapi and info members, at their locations,
+        in document order
+
+    Raises:
+        ValueError: If a pointer is invalid
+        SelectionNotFoundError: If a pointer does not point to a node of the specification
+    """
+    return PointerResolver(spec).select(pointers)
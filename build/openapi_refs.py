@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Reference graph and subset extraction for OpenAPI specifications.
+"""
+import re
+from typing import Dict, Any, List, Set, Tuple, Iterator, Optional
+from compact_nodes import MAPPING_TYPES
+
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+COMPONENT_REF_PREFIX = '#/components/'
+
+UNTAGGED_SHARD = 'untagged'
+ROOT_PATH_SHARD = 'root'
+
+# A component is identified by its section and name, e.g. ('schemas', 'Task')
+ComponentKey = Tuple[str, str]
+
+
+class SelectionNotFoundError(ValueError):
+    """Raised when a requested operation or path is not in an OpenAPI specification."""
+
+
+def unescape_json_pointer_token(token: str) -> str:
+    """
+    Unescape a single JSON pointer reference token (RFC 6901).
+
+    Args:
+        token: The escaped reference token
+
+    Returns:
+        The unescaped token
+    """
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def parse_component_ref(ref: str) -> Optional[ComponentKey]:
+    """
+    Parse a local component reference such as '#/components/schemas/Task'.
+
+    Args:
+        ref: The value of a $ref property
+
+    Returns:
+        Tuple of (section, name), or None if the reference does not point to a component
+    """
+    if not isinstance(ref, str) or not ref.startswith(COMPONENT_REF_PREFIX):
+        return None
+    tokens = ref[len(COMPONENT_REF_PREFIX):].split('/')
+    if len(tokens) < 2:
+        return None
+    return unescape_json_pointer_token(tokens[0]), unescape_json_pointer_token(tokens[1])
+
+
+def collect_component_refs(data: Any) -> Set[ComponentKey]:
+    """
+    Collect the components directly referenced from a part of an OpenAPI specification.
+
+    Args:
+        data: The OpenAPI specification or a part of it
+
+    Returns:
+        Set of (section, name) tuples of the referenced components
+    """
+    refs = set()
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, MAPPING_TYPES):
+            for key, value in node.items():
+                if key == '$ref':
+                    component = parse_component_ref(value)
+                    if component is not None:
+                        refs.add(component)
+                else:
+                    stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(node)
+    return refs
+
+
+def iter_operations(spec: Dict[str, Any]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Iterate over the operations of an OpenAPI specification in document order.
+
+    Args:
+        spec: The OpenAPI specification
+
+    Yields:
+        Tuples of (path, method, operation)
+    """
+    for path, path_item in (spec.get('paths') or {}).items():
+        if not isinstance(path_item, MAPPING_TYPES):
+            continue
+        for method, operation in path_item.items():
+            if method in HTTP_METHODS and isinstance(operation, MAPPING_TYPES):
+                yield path, method, operation
+
+
+def build_reference_graph(spec: Dict[str, Any]) -> Dict[ComponentKey, Set[ComponentKey]]:
+    """
+    Build the graph of $ref edges between the components of an OpenAPI specification.
+
+    Args:
+        spec: The OpenAPI specification
+
+    Returns:
+        Dict mapping every component to the set of components it references
+    """
+    graph = {}
+    for section, entries in ((spec.get('components') or {}).items()):
+        if not isinstance(entries, MAPPING_TYPES):
+            continue
+        for name, component in entries.items():
+            graph[(section, name)] = collect_component_refs(component)
+    return graph
+
+
+def resolve_component_closure(graph: Dict[ComponentKey, Set[ComponentKey]],
+                              roots: Set[ComponentKey]) -> Set[ComponentKey]:
+    """
+    Compute all components transitively reachable from the given components.
+
+    Args:
+        graph: Reference graph as returned by build_reference_graph
+        roots: The directly referenced components
+
+    Returns:
+        Set of reachable components, including the roots that exist in the graph
+    """
+    reached = set()
+    stack = [root for root in roots if root in graph]
+    while stack:
+        component = stack.pop()
+        if component in reached:
+            continue
+        reached.add(component)
+        stack.extend(target for target in graph[component] if target in graph and target not in reached)
+    return reached
+
+
+def security_scheme_names(requirements: Any) -> Set[str]:
+    """Return the names of the security schemes used by a list of security requirements."""
+    names = set()
+    if isinstance(requirements, list):
+        for requirement in requirements:
+            if isinstance(requirement, MAPPING_TYPES):
+                names.update(requirement.keys())
+    return names
+
+
+def extract_operations_subset(spec: Dict[str, Any],
+                              operations: Dict[str, List[str]],
+                              graph: Optional[Dict[ComponentKey, Set[ComponentKey]]] = None) -> Dict[str, Any]:
+    """
+    Build a self-contained subset of an OpenAPI specification that contains only the given operations.
+
+    The subset keeps the top-level properties of the specification, the selected operations
+    together with their path-level properties and only the components that they and the other
+    top-level properties, such as webhooks, reach. Nodes are
+    shared with the original specification, not copied.
+
+    Args:
+        spec: The OpenAPI specification
+        operations: Dict mapping each path to the list of methods to keep
+        graph: Reference graph of the specification; built on demand if not given
+
+    Returns:
+        Dict containing the subset of the OpenAPI specification
+    """
+    if graph is None:
+        graph = build_reference_graph(spec)
+
+    paths = {}
+    # Top-level properties other than the paths, such as webhooks, are kept with their references
+    roots = collect_component_refs({key: value for key, value in spec.items() if key not in ('paths', 'components')})
+    security_schemes = security_scheme_names(spec.get('security'))
+    used_tags = set()
+    for path, path_item in (spec.get('paths') or {}).items():
+        methods = operations.get(path)
+        if not methods or not isinstance(path_item, MAPPING_TYPES):
+            continue
+        subset_item = {}
+        for key, value in path_item.items():
+            if key in HTTP_METHODS and isinstance(value, MAPPING_TYPES):
+                if key not in methods:
+                    continue
+                security_schemes.update(security_scheme_names(value.get('security')))
+                used_tags.update(value.get('tags') or [])
+            subset_item[key] = value
+            roots.update(collect_component_refs(value))
+        paths[path] = subset_item
+
+    reached = resolve_component_closure(graph, roots)
+    reached.update(('securitySchemes', name) for name in security_schemes)
+
+    subset = {}
+    for key, value in spec.items():
+        if key == 'paths':
+            subset[key] = paths
+        elif key == 'components':
+            components = {}
+            for section, entries in value.items():
+                if not isinstance(entries, MAPPING_TYPES):
+                    continue
+                kept = {name: component for name, component in entries.items() if (section, name) in reached}
+                if kept:
+                    components[section] = kept
+            if components:
+                subset[key] = components
+        elif key == 'tags' and isinstance(value, list):
+            subset[key] = [tag for tag in value if not isinstance(tag, MAPPING_TYPES) or tag.get('name') in used_tags]
+        else:
+            subset[key] = value
+    return subset
+
+
+def _path_prefix(path: str) -> str:
+    """Return the first segment of a path, e.g. 'users' for '/users/{user_gid}'."""
+    segments = [segment for segment in path.split('/') if segment]
+    return segments[0] if segments else ROOT_PATH_SHARD
+
+
+def split_openapi_spec(spec: Dict[str, Any], split_by: str,
+                       graph: Optional[Dict[ComponentKey, Set[ComponentKey]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Split an OpenAPI specification into self-contained shards.
+
+    Args:
+        spec: The OpenAPI specification
+        split_by: Either 'tag' (one shard per operation tag) or 'path-prefix'
+            (one shard per first path segment)
+        graph: Reference graph of the specification; built on demand if not given
+
+    Returns:
+        Dict mapping each shard name to its subset of the specification, in document order
+
+    Raises:
+        ValueError: If split_by is not supported
+    """
+    if split_by not in ('tag', 'path-prefix'):
+        raise ValueError(f"Unsupported split mode: {split_by}")
+    if graph is None:
+        graph = build_reference_graph(spec)
+
+    selections = {}
+    for path, method, operation in iter_operations(spec):
+        if split_by == 'tag':
+            shard_names = operation.get('tags') or [UNTAGGED_SHARD]
+        else:
+            shard_names = [_path_prefix(path)]
+        for shard_name in shard_names:
+            selections.setdefault(shard_name, {}).setdefault(path, []).append(method)
+
+    return {
+        shard_name: extract_operations_subset(spec, operations, graph)
+        for shard_name, operations in selections.items()
+    }
+
+
+def shard_file_names(shard_names: List[str], extension: str) -> Dict[str, str]:
+    """
+    Map shard names to unique, filesystem-safe file names.
+
+    Args:
+        shard_names: The names of the shards
+        extension: File extension including the dot, e.g. '.json'
+
+    Returns:
+        Dict mapping each shard name to its file name
+    """
+    file_names = {}
+    used = set()
+    for shard_name in shard_names:
+        base = re.sub(r'[^A-Za-z0-9._-]+', '_', shard_name).strip('._') or UNTAGGED_SHARD
+        candidate = base
+        counter = 2
+        while candidate.lower() in used:
+            candidate = f"{base}_{counter}"
+            counter += 1
+        used.add(candidate.lower())
+        file_names[shard_name] = candidate + extension
+    return file_names
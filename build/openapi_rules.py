@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Declarative filter rules for OpenAPI specifications.
+
+A rule is a glob-style key path such as '/**/description', '/paths/*/*/externalDocs' or
+'/**/x-*'. Entries matched by a drop rule are removed unless a keep rule matches them too, so
+extension allow and deny lists are a keep and a drop rule ('/**/x-readme' and '/**/x-*').
+
+A rule can end with a condition on the value of the matched entry, such as
+'/paths/*/*[deprecated=true]' for the deprecated operations: the entry must then be a mapping
+whose key has the given value, read as JSON if it is valid JSON and as a string otherwise.
+
+All rules are compiled into one trie of path segments. During the traversal the set of trie
+nodes that match the current path is a state of an automaton whose transitions are built on
+first use and cached per key, so after warming up each entry costs one dictionary lookup no
+matter how many rules there are.
+"""
+import re
+import json
+import fnmatch
+from typing import Dict, Any, FrozenSet, Iterable, List, Optional, Set, Tuple
+from compact_nodes import MAPPING_TYPES
+from openapi_refs import unescape_json_pointer_token
+
+
+# Segment matching any number of path segments, including none
+DESCENDANTS_SEGMENT = '**'
+
+# Rules equivalent to --remove-descriptions and --remove-extensions
+REMOVE_DESCRIPTIONS_RULE = '/**/description'
+REMOVE_EXTENSIONS_RULE = '/**/x-*'
+
+_GLOB_CHARACTERS = re.compile(r'[*?\[]')
+
+# Condition on the value of the matched entry at the end of a rule, such as '[deprecated=true]'
+_CONDITION = re.compile(r'\[([^\[\]=]+)=([^\[\]]*)\]$')
+
+# A condition on the value of an entry: a key of the entry and the value it must have
+Condition = Tuple[str, Any]
+
+
+def _condition_matches(condition: Condition, value: Any) -> bool:
+    """Return whether an entry is a mapping whose key has the value of the condition."""
+    key, expected = condition
+    if not isinstance(value, MAPPING_TYPES) or key not in value:
+        return False
+    actual = value[key]
+    # True and 1 are equal in Python but not in JSON
+    return actual == expected and isinstance(actual, bool) == isinstance(expected, bool)
+
+
+class _TrieNode:
+    """A node of the rule trie: the rules that share a prefix of path segments."""
+
+    __slots__ = ('literals', 'globs', 'descendants', 'repeats', 'drop', 'keep', 'drop_conditions',
+                 'keep_conditions')
+
+    def __init__(self, repeats: bool = False):
+        self.literals: Dict[str, '_TrieNode'] = {}
+        self.globs: Dict[str, Tuple[Any, '_TrieNode']] = {}
+        self.descendants: Optional['_TrieNode'] = None
+        # A '**' node matches any further segment and stays active
+        self.repeats = repeats
+        self.drop = False
+        self.keep = False
+        # Conditions of the rules ending here that only match some values
+        self.drop_conditions: List[Condition] = []
+        self.keep_conditions: List[Condition] = []
+
+    def child(self, segment: str) -> '_TrieNode':
+        """Return the child for a pattern segment, creating it if needed."""
+        if segment == DESCENDANTS_SEGMENT:
+            if self.descendants is None:
+                self.descendants = _TrieNode(repeats=True)
+            return self.descendants
+        if _GLOB_CHARACTERS.search(segment):
+            if segment not in self.globs:
+                self.globs[segment] = (re.compile(fnmatch.translate(segment)), _TrieNode())
+            return self.globs[segment][1]
+        return self.literals.setdefault(segment, _TrieNode())
+
+
+class _State:
+    """A state of the automaton: the trie nodes matching a path, with its cached transitions."""
+
+    __slots__ = ('nodes', 'drop', 'keep', 'drop_conditions', 'keep_conditions', 'dropped', 'conditional',
+                 'transitions')
+
+    def __init__(self, nodes: FrozenSet[_TrieNode]):
+        self.nodes = nodes
+        self.drop = any(node.drop for node in nodes)
+        self.keep = any(node.keep for node in nodes)
+        self.drop_conditions = [condition for node in nodes for condition in node.drop_conditions]
+        self.keep_conditions = [condition for node in nodes for condition in node.keep_conditions]
+        # Whether every entry is dropped, and whether that depends on the value of the entry
+        self.dropped = self.drop and not self.keep and not self.keep_conditions
+        self.conditional = not self.dropped and not self.keep and bool(
+            self.drop_conditions or (self.drop and self.keep_conditions))
+        self.transitions: Dict[str, Optional['_State']] = {}
+
+    def drops(self, value: Any) -> bool:
+        """Return whether an entry with this path and the given value is dropped, for a conditional state."""
+        if any(_condition_matches(condition, value) for condition in self.keep_conditions):
+            return False
+        return self.drop or any(_condition_matches(condition, value) for condition in self.drop_conditions)
+
+
+def parse_rule(pattern: str) -> List[str]:
+    """
+    Split a rule into its path segments.
+
+    Segments are separated by '/', as in a JSON pointer, and '~1' and '~0' stand for '/' and '~'.
+    Each segment is a glob matched against a key or list index; '**' matches any number of segments.
+
+    Args:
+        pattern: The rule, with or without a leading '/', and without its condition
+
+    Returns:
+        List of unescaped segments
+
+    Raises:
+        ValueError: If the rule has no segments or an empty segment
+    """
+    segments = pattern[1:].split('/') if pattern.startswith('/') else pattern.split('/')
+    if not pattern.strip('/') or '' in segments:
+        raise ValueError(f"Invalid filter rule '{pattern}': expected '/'-separated key patterns")
+    return [unescape_json_pointer_token(segment) for segment in segments]
+
+
+def parse_condition(pattern: str) -> Tuple[str, Optional[Condition]]:
+    """
+    Split the condition on the value of the matched entry off the end of a rule.
+
+    Args:
+        pattern: The rule, such as '/paths/*/*[deprecated=true]'
+
+    Returns:
+        The rule without its condition, and the condition as a key and the value it must have, or
+        None if the rule has no condition
+    """
+    match = _CONDITION.search(pattern)
+    if match is None:
+        return pattern, None
+    key, value = match.groups()
+    try:
+        expected = json.loads(value)
+    except ValueError:
+        expected = value
+    return pattern[:match.start()], (unescape_json_pointer_token(key), expected)
+
+
+class FilterRules:
+    """Drop and keep rules compiled into a single matcher."""
+
+    def __init__(self, drop: Iterable[str] = (), keep: Iterable[str] = ()):
+        """
+        Compile the rules.
+
+        Args:
+            drop: Rules matching the entries to remove
+            keep: Rules matching the entries to keep even if a drop rule matches them
+
+        Raises:
+            ValueError: If a rule is invalid
+        """
+        root = _TrieNode()
+        for patterns, flag in ((drop, 'drop'), (keep, 'keep')):
+            for pattern in patterns:
+                pattern, condition = parse_condition(pattern)
+                node = root
+                for segment in parse_rule(pattern):
+                    node = node.child(segment)
+                if condition is None:
+                    setattr(node, flag, True)
+                else:
+                    getattr(node, f'{flag}_conditions').append(condition)
+        self._states: Dict[FrozenSet[_TrieNode], _State] = {}
+        self._start = self._state({root})
+
+    def _state(self, nodes: Set[_TrieNode]) -> Optional[_State]:
+        """Return the state for a set of trie nodes after adding the '**' nodes they lead to, or None if empty."""
+        pending = list(nodes)
+        while pending:
+            descendants = pending.pop().descendants
+            if descendants is not None and descendants not in nodes:
+                nodes.add(descendants)
+                pending.append(descendants)
+        if not nodes:
+            return None
+        key = frozenset(nodes)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _State(key)
+        return state
+
+    def _step(self, state: _State, key: Any) -> Optional[_State]:
+        """Return the state after descending into the entry with the given key or index."""
+        token = key if isinstance(key, str) else str(key)
+        try:
+            return state.transitions[token]
+        except KeyError:
+            pass
+        nodes = set()
+        for node in state.nodes:
+            if node.repeats:
+                nodes.add(node)
+            child = node.literals.get(token)
+            if child is not None:
+                nodes.add(child)
+            for regex, child in node.globs.values():
+                if regex.match(token):
+                    nodes.add(child)
+        next_state = state.transitions[token] = self._state(nodes)
+        return next_state
+
+    def apply(self, data: Any) -> Any:
+        """
+        Remove the entries matched by the rules.
+
+        Parts of the specification that no rule can match any more are not copied but shared with
+        the input, which is not modified.
+
+        Args:
+            data: The OpenAPI specification
+
+        Returns:
+            The OpenAPI specification without the dropped entries
+        """
+        return self._apply(data, self._start)
+
+    def _apply(self, data: Any, state: Optional[_State]) -> Any:
+        """Remove the matched entries below a node, given the state of its path."""
+        if state is None:
+            return data
+        if isinstance(data, MAPPING_TYPES):
+            result = {}
+            for key, value in data.items():
+                next_state = self._step(state, key)
+                if next_state is None or not (next_state.dropped or next_state.conditional and next_state.drops(value)):
+                    result[key] = self._apply(value, next_state)
+            return result
+        elif isinstance(data, list):
+            result = []
+            for index, item in enumerate(data):
+                next_state = self._step(state, index)
+                if next_state is None or not (next_state.dropped or next_state.conditional and next_state.drops(item)):
+                    result.append(self._apply(item, next_state))
+            return result
+        return data
+
+
+def filter_rules_from_options(drop: Optional[List[str]], keep: Optional[List[str]],
+                              remove_descriptions: bool = False,
+                              remove_extensions: bool = False) -> FilterRules:
+    """
+    Compile the --drop and --keep rules together with the removal options.
+
+    The removal options become drop rules, so that keep rules can make exceptions to them.
+
+    Args:
+        drop: The --drop rules
+        keep: The --keep rules
+        remove_descriptions: Whether descriptions are removed
+        remove_extensions: Whether extensions are removed
+
+    Returns:
+        The compiled rules
+
+    Raises:
+        ValueError: If a rule is invalid
+    """
+    drop = list(drop or [])
+    if remove_descriptions:
+        drop.append(REMOVE_DESCRIPTIONS_RULE)
+    if remove_extensions:
+        drop.append(REMOVE_EXTENSIONS_RULE)
+    return FilterRules(drop, keep or [])
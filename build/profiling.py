@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Profiling of a run of the application with cProfile and, optionally, tracemalloc.
+
+A profiled run writes, next to the given output prefix:
+
+- OUT.pstats: the cProfile statistics, for pstats, snakeviz and similar tools
+- OUT.collapsed: the same statistics as collapsed stacks ("a;b;c 1234" per line, in microseconds),
+  for flamegraph.pl, inferno, speedscope and similar flame-graph tools
+- OUT.tracemalloc.txt: with memory tracing, the allocation sites holding the most memory
+"""
+import os
+import time
+import cProfile
+import pstats
+import linecache
+import logging
+import threading
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple
+
+PSTATS_SUFFIX = '.pstats'
+COLLAPSED_SUFFIX = '.collapsed'
+TRACEMALLOC_SUFFIX = '.tracemalloc.txt'
+
+# Number of allocation sites listed in the tracemalloc report
+TOP_ALLOCATION_SITES = 25
+
+# Seconds between two checks of the traced memory, and the growth over the last snapshot that
+# makes the next check take a new one
+_SNAPSHOT_INTERVAL = 0.05
+_SNAPSHOT_GROWTH = 1.1
+
+# Paths of the call tree that took less time than this (in seconds) are left out of the collapsed stacks
+_MIN_STACK_TIME = 1e-6
+
+# A function in pstats: (file name, line number, function name)
+Function = Tuple[str, int, str]
+
+
+def _frame_name(function: Function) -> str:
+    """Name a function as a frame of a collapsed stack, which cannot contain ';'."""
+    file_name, line, name = function
+    if file_name == '~':
+        # Built-in functions have no file, and their name describes them
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(file_name)}:{line})"
+    return label.replace(';', ',')
+
+
+def collapsed_stacks(stats: Dict[Function, Any]) -> Dict[Tuple[Function, ...], float]:
+    """
+    Rebuild the call stacks of a cProfile run with the own time spent in each of them.
+
+    cProfile records the time of every caller-callee edge, not of whole stacks. The stacks are
+    rebuilt by descending from the functions that have no callers, giving each callee the share
+    of its edge times that corresponds to the share of its caller's time spent on the current
+    stack. Recursive calls are folded into the frame of the function that is already on the stack.
+
+    Args:
+        stats: The stats of a pstats.Stats object: for each function, (primitive calls, calls,
+            own time, cumulative time, callers), where callers maps each caller to the same
+            figures for the calls it made
+
+    Returns:
+        Dict mapping each stack, from the outermost function, to its own time in seconds
+    """
+    callees: Dict[Function, Dict[Function, Tuple]] = defaultdict(dict)
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][function] = edge
+
+    stacks: Dict[Tuple[Function, ...], float] = defaultdict(float)
+
+    def visit(stack: Tuple[Function, ...], own_time: float, cumulative_time: float) -> None:
+        function = stack[-1]
+        total_time = stats[function][3]
+        share = cumulative_time / total_time if total_time else 0.0
+        for callee, (_, _, callee_own_time, callee_cumulative_time, *_) in callees[function].items():
+            if callee in stack:
+                own_time += callee_own_time * share
+            elif callee_cumulative_time * share >= _MIN_STACK_TIME:
+                visit(stack + (callee,), callee_own_time * share, callee_cumulative_time * share)
+        stacks[stack] += own_time
+
+    for function, (_, _, own_time, cumulative_time, callers) in stats.items():
+        if not callers:
+            visit((function,), own_time, cumulative_time)
+    return stacks
+
+
+def write_collapsed_stacks(stats: Dict[Function, Any], path: str) -> int:
+    """
+    Write the call stacks of a cProfile run in the collapsed format of flame-graph tools.
+
+    Args:
+        stats: The stats of a pstats.Stats object
+        path: Path of the output file
+
+    Returns:
+        Number of stacks written
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, own_time in collapsed_stacks(stats).items():
+            microseconds = round(own_time * 1e6)
+            if microseconds > 0:
+                f.write(f"{';'.join(_frame_name(function) for function in stack)} {microseconds}\n")
+                count += 1
+    return count
+
+
+class _PeakSnapshotter:
+    """Background thread that keeps a tracemalloc snapshot taken close to the peak of traced memory."""
+
+    def __init__(self):
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_size = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='tracemalloc-snapshots', daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(_SNAPSHOT_INTERVAL):
+            self.take_if_grown()
+
+    def take_if_grown(self) -> None:
+        """Take a new snapshot if the traced memory has grown enough since the last one."""
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.snapshot_size * _SNAPSHOT_GROWTH:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+
+    def __enter__(self) -> '_PeakSnapshotter':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.take_if_grown()
+
+
+def _allocation_report(snapshot: tracemalloc.Snapshot, snapshot_size: int, peak_size: int,
+                       limit: int) -> Iterator[str]:
+    """Yield the lines of a report of the allocation sites holding the most memory in a snapshot."""
+    # Memory held by tracemalloc itself is not part of the profiled run
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, __file__)))
+    statistics = snapshot.statistics('lineno')
+    yield f"Peak traced memory: {peak_size / 2**20:.1f} MiB"
+    yield f"Top {min(limit, len(statistics))} allocation sites in a snapshot of {snapshot_size / 2**20:.1f} MiB:"
+    for index, statistic in enumerate(statistics[:limit], 1):
+        frame = statistic.traceback[0]
+        yield f"#{index}: {frame.filename}:{frame.lineno}: {statistic.size / 2**10:.1f} KiB in {statistic.count} blocks"
+        line = linecache.getline(frame.filename, frame.lineno).strip()
+        if line:
+            yield f"    {line}"
+    other = statistics[limit:]
+    if other:
+        yield f"{len(other)} other sites: {sum(statistic.size for statistic in other) / 2**10:.1f} KiB"
+
+
+def profile_call(function: Callable[[], Any], output_prefix: str, trace_memory: bool = False,
+                 top_allocations: int = TOP_ALLOCATION_SITES) -> Any:
+    """
+    Call a function under cProfile and write the profile, even if the function raises.
+
+    Args:
+        function: The function to call, without arguments
+        output_prefix: Path of the output files without their suffixes
+        trace_memory: If True, also trace memory allocations with tracemalloc and write the
+            allocation sites holding the most memory, at the largest snapshot taken during the run
+        top_allocations: Number of allocation sites in the tracemalloc report
+
+    Returns:
+        The return value of the function
+    """
+    logger = logging.getLogger(__name__)
+    directory = os.path.dirname(output_prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    snapshotter = None
+    if trace_memory:
+        tracemalloc.start()
+        snapshotter = _PeakSnapshotter()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        if snapshotter is not None:
+            with snapshotter:
+                return profiler.runcall(function)
+        return profiler.runcall(function)
+    finally:
+        elapsed = time.perf_counter() - start
+        written = [output_prefix + PSTATS_SUFFIX, output_prefix + COLLAPSED_SUFFIX]
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(written[0])
+        write_collapsed_stacks(stats.stats, written[1])
+        if snapshotter is not None:
+            _, peak_size = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if snapshotter.snapshot is not None:
+                report_path = output_prefix + TRACEMALLOC_SUFFIX
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    for line in _allocation_report(snapshotter.snapshot, snapshotter.snapshot_size,
+                                                   peak_size, top_allocations):
+                        f.write(line + '\n')
+                written.append(report_path)
+        logger.debug(f"Profiled a run of {elapsed:.3f} s into {', '.join(written)}")
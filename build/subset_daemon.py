@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local daemon that runs the console application with its modules imported and specs cached.
+
+Build scripts run the console application many times, and every run pays for starting Python,
+importing its modules and parsing the specification. The daemon listens on a Unix socket of the
+current user and runs the command lines that the console application hands to it (see
+daemon_client) in its own process, one after the other. Recently loaded specifications are kept
+in a SpecCache, keyed by path, modification time, size and load options.
+
+The daemon serves one client at a time: the runs of a parallel build, such as make -j, wait for
+each other in the queue of the socket, so they take about as long as one after the other.
+Builds that run many commands at once may be faster with OPENAPI_SUBSET_NO_DAEMON=1 set.
+
+Usage: python subset_daemon.py [--socket PATH] [--max-cached-specs N]
+
+The daemon runs the code it imported when it started; restart it after updating the application.
+"""
+import io
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+import socketserver
+from collections import OrderedDict
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Dict, Any, Optional, Tuple
+import generate_openapi_subset
+from daemon_client import (
+    EXIT_CHANNEL,
+    STDERR_CHANNEL,
+    STDOUT_CHANNEL,
+    daemon_socket_path,
+    send_frame
+)
+from gc_control import freeze_loaded_objects
+from openapi_operations import STDIN_PATH, LoadLimits, Projection, load_openapi_spec
+
+# Number of specifications kept loaded by default
+DEFAULT_CACHED_SPECS = 4
+
+
+class SpecCache:
+    """
+    Recently loaded OpenAPI specifications, reloaded when their file changes.
+
+    Specifications are keyed by the real path of their file, its modification time and size, and
+    the options they were loaded with, and the least recently used one is dropped when the cache
+    is full. The cached specifications are shared between runs and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHED_SPECS, freeze: bool = False):
+        """
+        Args:
+            max_entries: Number of specifications to keep loaded
+            freeze: If True, freeze the objects of the process after loading a specification, so that
+                the garbage collector does not scan the cached specifications in later runs
+        """
+        self.max_entries = max_entries
+        self.freeze = freeze
+        self.hits = 0
+        self.misses = 0
+        self._specs: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def load(self, file_path: str, compact: bool = False, limits: Optional[LoadLimits] = None,
+             use_mmap: bool = False, projection: Optional[Projection] = None,
+             json_scalars: bool = False) -> Dict[str, Any]:
+        """
+        Load an OpenAPI specification as load_openapi_spec does, from the cache if it is there.
+
+        Standard input is never cached.
+
+        Args:
+            file_path: Path to the OpenAPI specification file, or '-' for standard input
+            compact: If True, represent small mappings as CompactMapping objects
+            limits: Limits on the size and shape of the input (defaults to LoadLimits())
+            use_mmap: If True, read the file through a memory mapping
+            projection: Mapping entries to leave out while the specification is built
+            json_scalars: If True, resolve plain YAML scalars with JSONScalarLoader
+
+        Returns:
+            Dict containing the OpenAPI specification
+        """
+        if file_path == STDIN_PATH:
+            return load_openapi_spec(file_path, compact=compact, limits=limits, use_mmap=use_mmap,
+                                     projection=projection, json_scalars=json_scalars)
+
+        stat = os.stat(file_path)
+        real_path = os.path.realpath(file_path)
+        key = (real_path, stat.st_mtime_ns, stat.st_size, compact, limits or LoadLimits(), projection, json_scalars)
+        spec = self._specs.get(key)
+        if spec is not None:
+            self._specs.move_to_end(key)
+            self.hits += 1
+            return spec
+
+        self.misses += 1
+        spec = load_openapi_spec(file_path, compact=compact, limits=limits, use_mmap=use_mmap,
+                                 projection=projection, json_scalars=json_scalars)
+        # Other versions of the file will not be requested again
+        for stale in [other for other in self._specs if other[0] == real_path and other[1:3] != key[1:3]]:
+            del self._specs[stale]
+        self._specs[key] = spec
+        while len(self._specs) > self.max_entries:
+            self._specs.popitem(last=False)
+        if self.freeze:
+            freeze_loaded_objects()
+        return spec
+
+
+class _ChannelWriter(io.RawIOBase):
+    """Binary stream that sends what is written to it as frames of one channel of the response."""
+
+    def __init__(self, connection: Any, channel: bytes):
+        super().__init__()
+        self._connection = connection
+        self._channel = channel
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        send_frame(self._connection, self._channel, bytes(data))
+        return len(data)
+
+
+def _channel_stream(connection: Any, channel: bytes, line_buffering: bool = False) -> io.TextIOWrapper:
+    """Return a text stream, with a binary buffer, that writes to a channel of the response."""
+    return io.TextIOWrapper(io.BufferedWriter(_ChannelWriter(connection, channel)), encoding='utf-8',
+                            line_buffering=line_buffering)
+
+
+class _RunHandler(socketserver.StreamRequestHandler):
+    """Runs one command line of the console application and streams its output back."""
+
+    server: 'SubsetDaemon'
+
+    def handle(self) -> None:
+        logger = logging.getLogger(__name__)
+        start = time.perf_counter()
+        request = json.loads(self.rfile.readline())
+        stdout = _channel_stream(self.connection, STDOUT_CHANNEL)
+        stderr = _channel_stream(self.connection, STDERR_CHANNEL, line_buffering=True)
+        # The log records of the run go to the client as the application would write them
+        log_handler = logging.StreamHandler(stderr)
+        log_handler.setFormatter(logging.Formatter(generate_openapi_subset.LOG_FORMAT))
+        root_logger = logging.getLogger()
+        cwd = os.getcwd()
+        try:
+            root_logger.addHandler(log_handler)
+            try:
+                os.chdir(request['cwd'])
+                with redirect_stdout(stdout), redirect_stderr(stderr):
+                    exit_code = generate_openapi_subset.main(request['argv'], spec_cache=self.server.spec_cache)
+                stdout.flush()
+                stderr.flush()
+            finally:
+                root_logger.removeHandler(log_handler)
+                os.chdir(cwd)
+            if not isinstance(exit_code, int):
+                exit_code = 0 if exit_code is None else 1
+            send_frame(self.connection, EXIT_CHANNEL, str(exit_code).encode('ascii'))
+        except OSError as e:
+            logger.warning(f"Lost the connection to the client: {e}")
+            return
+        logger.info(f"Ran {' '.join(request['argv'])} in {time.perf_counter() - start:.3f} s "
+                    f"(exit code {exit_code}, {len(self.server.spec_cache)} cached specs)")
+
+
+class SubsetDaemon(socketserver.UnixStreamServer):
+    """Unix socket server that runs the console application for clients, one run at a time."""
+
+    def __init__(self, socket_path: str, spec_cache: Optional[SpecCache] = None):
+        """
+        Bind the socket, replacing a stale socket file that no daemon listens on.
+
+        Args:
+            socket_path: Path of the socket
+            spec_cache: Cache of the loaded specifications (defaults to a new SpecCache)
+
+        Raises:
+            OSError: If another daemon is listening on the socket
+        """
+        self.socket_path = socket_path
+        self.spec_cache = spec_cache if spec_cache is not None else SpecCache()
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)
+            else:
+                raise OSError(f"A daemon is already listening on {socket_path}")
+            finally:
+                probe.close()
+        super().__init__(socket_path, _RunHandler)
+
+    def server_bind(self) -> None:
+        # Only the current user can connect; no client can until the server listens
+        super().server_bind()
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main(argv=None) -> int:
+    """
+    Run the daemon until it is interrupted or terminated.
+
+    Args:
+        argv: The command line arguments; defaults to sys.argv[1:]
+
+    Returns:
+        int: Exit code (0 for success, non-zero for errors)
+    """
+    parser = argparse.ArgumentParser(description="Run the OpenAPI subset generator as a local daemon.")
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Path of the Unix socket (defaults to the path the console application connects to)"
+    )
+    parser.add_argument(
+        "--max-cached-specs",
+        type=int,
+        default=DEFAULT_CACHED_SPECS,
+        help="Number of loaded specifications to keep in memory"
+    )
+    args = parser.parse_args(argv)
+
+    # Log records of the runs only go to their clients
+    logging.getLogger().setLevel(logging.DEBUG)
+    logger = logging.getLogger(__name__)
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(generate_openapi_subset.LOG_FORMAT))
+    logger.addHandler(console)
+    logger.propagate = False
+
+    socket_path = args.socket or daemon_socket_path()
+    try:
+        server = SubsetDaemon(socket_path, SpecCache(args.max_cached_specs, freeze=True))
+    except OSError as e:
+        logger.error(f"Error: {e}")
+        return 1
+    # Terminating the daemon removes its socket like an interrupt does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    logger.info(f"Listening on {socket_path}")
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    logger.info("Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+In-process Python API for generating subsets of an OpenAPI specification.
+"""
+import io
+import os
+import logging
+from typing import Dict, Any, Optional, Tuple, Union
+from compact_nodes import MAPPING_TYPES
+from compression import open_compressing_writer
+from gc_control import freeze_loaded_objects, paused_gc
+from openapi_budget import apply_size_budget, budget_from_limits
+from openapi_fragments import FragmentCache
+from openapi_refs import build_reference_graph, split_openapi_spec
+from openapi_operations import (
+    LoadLimits,
+    load_openapi_spec,
+    save_openapi_spec,
+    write_openapi_spec
+)
+# Imported under other names, which the parameters of SubsetGenerator.generate_with_report() would shadow
+from openapi_allof import flatten_allof as _flatten_allof
+from openapi_operations import remove_descriptions as _remove_descriptions
+from openapi_operations import remove_extensions as _remove_extensions
+
+
+class SubsetGenerator:
+    """
+    Generates subsets of an OpenAPI specification that is loaded once and reused across calls.
+
+    The loaded specification is never modified: every call builds its subset from new containers
+    that share the unchanged nodes of the specification. An instance can therefore be used from
+    several threads at once.
+
+    The options accepted by generate() are accepted by every other method as keyword arguments.
+
+    The JSON of the operations and components is cached, so that writing another subset of the
+    same specification mostly concatenates fragments that were already serialized.
+    """
+
+    def __init__(self, source: Union[str, os.PathLike, Dict[str, Any]], compact: bool = False,
+                 limits: Optional[LoadLimits] = None, use_mmap: bool = False, freeze: bool = False):
+        """
+        Load the OpenAPI specification.
+
+        Args:
+            source: Path to the OpenAPI specification file ('-' for standard input), or an
+                already loaded specification, which must not be modified while it is in use
+            compact: If True, represent small mappings as CompactMapping objects
+            limits: Limits on the size and shape of the input (defaults to LoadLimits())
+            use_mmap: If True, read the file through a memory mapping
+            freeze: If True, freeze the objects of the process after the specification is loaded
+                or transformed, so that the garbage collector does not scan them again; for
+                long-running processes that keep the generator
+
+        Raises:
+            ValueError: If the specification cannot be loaded or is not an object
+        """
+        if isinstance(source, (str, os.PathLike)):
+            self.spec = load_openapi_spec(os.fspath(source), compact=compact, limits=limits, use_mmap=use_mmap)
+        elif isinstance(source, MAPPING_TYPES):
+            self.spec = source
+        else:
+            raise ValueError(f"Unsupported OpenAPI spec source: {type(source).__name__}")
+        self.freeze = freeze
+        if freeze:
+            freeze_loaded_objects()
+        self.fragments = FragmentCache()
+        # Transformed specifications by (remove_descriptions, remove_extensions, flatten_allof), which
+        # keep the identity of their nodes, and thereby their cached fragments, across calls
+        self._transformed: Dict[Tuple[bool, bool, bool], Dict[str, Any]] = {(False, False, False): self.spec}
+
+    def _transformed_spec(self, remove_descriptions: bool, remove_extensions: bool,
+                          flatten_allof: bool) -> Dict[str, Any]:
+        """Return the loaded specification with the given transformations applied, transforming it once."""
+        key = (remove_descriptions, remove_extensions, flatten_allof)
+        spec = self._transformed.get(key)
+        if spec is None:
+            spec = self.spec
+            with paused_gc():
+                if remove_descriptions:
+                    spec = _remove_descriptions(spec)
+                if remove_extensions:
+                    spec = _remove_extensions(spec)
+                if flatten_allof:
+                    spec = _flatten_allof(spec)
+            if self.freeze:
+                freeze_loaded_objects()
+            # Concurrent callers may both transform; either result is equivalent
+            spec = self._transformed.setdefault(key, spec)
+        return spec
+
+    def _fragments_for(self, options: Dict[str, Any]) -> Optional[FragmentCache]:
+        """Return the fragment cache for subsets generated with the options, if they can use it."""
+        # Trimming to a size budget builds new nodes on every call, which would only fill the cache
+        if budget_from_limits(options.get('max_bytes'), options.get('max_tokens')) is not None:
+            return None
+        return self.fragments
+
+    def generate_with_report(self, remove_descriptions: bool = False, remove_extensions: bool = False,
+                             flatten_allof: bool = False, max_bytes: Optional[int] = None,
+                             max_tokens: Optional[int] = None) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Generate a subset, together with the report of the size budget.
+
+        Args:
+            remove_descriptions: If True, remove description fields
+            remove_extensions: If True, remove extension fields (x-...)
+            flatten_allof: If True, merge allOf compositions into single schemas
+            max_bytes: Maximum size of the JSON output in bytes
+            max_tokens: Maximum size of the JSON output in estimated tokens
+
+        Returns:
+            Tuple of (subset, report), where the report is None if no size limit was given
+        """
+        logger = logging.getLogger(__name__)
+
+        spec = self._transformed_spec(remove_descriptions, remove_extensions, flatten_allof)
+
+        report = None
+        budget = budget_from_limits(max_bytes, max_tokens)
+        if budget is not None:
+            spec, report = apply_size_budget(spec, budget)
+            logger.debug(f"Size budget: {report['initial_bytes']} -> {report['final_bytes']} bytes (limit {budget})")
+        return spec, report
+
+    def generate(self, **options: Any) -> Dict[str, Any]:
+        """
+        Generate a subset.
+
+        Args:
+            **options: The options of generate_with_report()
+
+        Returns:
+            Dict containing the subset; it shares nodes with the loaded specification and with
+            other subsets, and must not be modified
+
+        Raises:
+            ValueError: If the subset does not fit into the size budget
+        """
+        spec, report = self.generate_with_report(**options)
+        if report is not None and not report["fits"]:
+            raise ValueError(f"The OpenAPI spec does not fit into {report['max_bytes']} bytes "
+                             f"even after all trimming steps")
+        return spec
+
+    def write(self, stream: Any, use_yaml: bool = False, yaml_aliases: bool = True, **options: Any) -> None:
+        """
+        Generate a subset and write it to a text stream.
+
+        Args:
+            stream: Writable text stream
+            use_yaml: If True, write in YAML format; otherwise, write in JSON format
+            yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+            **options: The options of generate_with_report()
+        """
+        write_openapi_spec(self.generate(**options), stream, use_yaml=use_yaml, yaml_aliases=yaml_aliases,
+                           fragments=self._fragments_for(options))
+
+    def to_bytes(self, use_yaml: bool = False, yaml_aliases: bool = True, compression: Optional[str] = None,
+                 **options: Any) -> bytes:
+        """
+        Generate a subset and serialize it.
+
+        Args:
+            use_yaml: If True, serialize in YAML format; otherwise, serialize in JSON format
+            yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+            compression: One of 'gzip', 'bz2' or 'xz' to compress the result
+            **options: The options of generate_with_report()
+
+        Returns:
+            The UTF-8 encoded, optionally compressed, serialization of the subset
+        """
+        spec = self.generate(**options)
+        fragments = self._fragments_for(options)
+        buffer = io.BytesIO()
+        if compression:
+            with open_compressing_writer(buffer, compression) as stream:
+                write_openapi_spec(spec, stream, use_yaml=use_yaml, yaml_aliases=yaml_aliases, fragments=fragments)
+        else:
+            stream = io.TextIOWrapper(buffer, encoding='utf-8')
+            write_openapi_spec(spec, stream, use_yaml=use_yaml, yaml_aliases=yaml_aliases, fragments=fragments)
+            # Detaching flushes the text stream and leaves the buffer open
+            stream.detach()
+        return buffer.getvalue()
+
+    def save(self, file_path: str, use_yaml: Optional[bool] = None, yaml_aliases: bool = True,
+             compression: Optional[str] = None, **options: Any) -> bool:
+        """
+        Generate a subset and save it to a file, atomically, unless the file is up to date.
+
+        Args:
+            file_path: Path of the output file; its extension decides the format and compression
+            use_yaml: Format for files without a .json, .yaml or .yml extension
+            yaml_aliases: If True, write shared nodes once and reference them by YAML aliases
+            compression: One of 'gzip', 'bz2' or 'xz' to compress the file
+            **options: The options of generate_with_report()
+
+        Returns:
+            True if the file was written, False if it was already up to date
+        """
+        return save_openapi_spec(self.generate(**options), file_path, use_yaml=use_yaml,
+                                 yaml_aliases=yaml_aliases, compression=compression,
+                                 fragments=self._fragments_for(options))
+
+    def split(self, split_by: str, **options: Any) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate a subset and split it into self-contained shards.
+
+        Args:
+            split_by: Either 'tag' or 'path-prefix'
+            **options: The options of generate_with_report()
+
+        Returns:
+            Dict mapping each shard name to its subset of the specification
+        """
+        spec = self.generate(**options)
+        return split_openapi_spec(spec, split_by, build_reference_graph(spec))
+
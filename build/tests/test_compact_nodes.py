@@ -0,0 +1,105 @@
+"""
+Unit tests for the compact node representation in the compact_nodes module.
+"""
+import unittest
+import io
+import json
+from unittest.mock import patch, mock_open
+from compact_nodes import CompactMapping, Interner, COMPACT_MAX_KEYS, to_builtin
+from openapi_operations import load_openapi_spec, remove_descriptions, remove_extensions, output_openapi_spec_to_stdout
+from tests.test_data import (
+    VALID_OPENAPI_SPEC,
+    OPENAPI_SPEC_WITHOUT_DESCRIPTIONS,
+    OPENAPI_SPEC_WITHOUT_EXTENSIONS,
+    get_json_content,
+    get_yaml_content
+)
+
+
+class TestCompactMapping(unittest.TestCase):
+    """Test cases for the CompactMapping type."""
+
+    def test_mapping_behaviour(self):
+        """Test that a compact mapping behaves like an ordered, read-only dict."""
+        mapping = CompactMapping(('type', 'description'), ('string', 'A name'))
+        self.assertEqual(mapping['type'], 'string')
+        self.assertEqual(mapping.get('missing'), None)
+        self.assertIn('description', mapping)
+        self.assertEqual(list(mapping), ['type', 'description'])
+        self.assertEqual(len(mapping), 2)
+        self.assertEqual(mapping, {'type': 'string', 'description': 'A name'})
+        with self.assertRaises(KeyError):
+            mapping['missing']
+
+    def test_interner_shares_key_tuples_and_strings(self):
+        """Test that mappings with the same keys share one key tuple and repeated strings are shared."""
+        interner = Interner()
+        first = interner.json_object_pairs_hook([('type', 'str' + 'ing')])
+        second = interner.json_object_pairs_hook([('type', ''.join(['str', 'ing']))])
+        self.assertIs(first.keys(), second.keys())
+        self.assertIs(first['type'], second['type'])
+
+    def test_interner_keeps_large_mappings_as_dicts(self):
+        """Test that only small mappings are made compact."""
+        interner = Interner()
+        pairs = [(f"key{i}", i) for i in range(COMPACT_MAX_KEYS + 1)]
+        self.assertIs(type(interner.mapping(pairs)), dict)
+        self.assertIs(type(interner.mapping(pairs[:COMPACT_MAX_KEYS])), CompactMapping)
+
+    def test_interner_duplicate_keys(self):
+        """Test that duplicate keys resolve like in a dict."""
+        mapping = Interner().mapping([('a', 1), ('b', 2), ('a', 3)])
+        self.assertEqual(list(mapping.items()), [('a', 3), ('b', 2)])
+
+    def test_to_builtin(self):
+        """Test the json.dump default hook."""
+        self.assertEqual(json.dumps({'a': CompactMapping(('b',), (1,))}, default=to_builtin), '{"a": {"b": 1}}')
+        with self.assertRaises(TypeError):
+            to_builtin(object())
+
+
+class TestCompactLoading(unittest.TestCase):
+    """Test cases for loading and transforming specs in compact mode."""
+
+    def test_load_compact_json(self):
+        """Test that a compact JSON spec equals the regular one and has a dict at the top level."""
+        with patch('builtins.open', mock_open(read_data=get_json_content())):
+            result = load_openapi_spec('test.json', compact=True)
+        self.assertIs(type(result), dict)
+        self.assertIsInstance(result['info'], CompactMapping)
+        self.assertEqual(result, VALID_OPENAPI_SPEC)
+
+    def test_load_compact_yaml(self):
+        """Test that a compact YAML spec equals the regular one."""
+        with patch('builtins.open', mock_open(read_data=get_yaml_content())):
+            result = load_openapi_spec('test.yaml', compact=True)
+        self.assertIsInstance(result['info'], CompactMapping)
+        self.assertEqual(result, VALID_OPENAPI_SPEC)
+
+    def test_transforms_understand_compact_nodes(self):
+        """Test that the transforms give the same results on compact specs."""
+        with patch('builtins.open', mock_open(read_data=get_json_content())):
+            spec = load_openapi_spec('test.json', compact=True)
+        self.assertEqual(remove_descriptions(spec), OPENAPI_SPEC_WITHOUT_DESCRIPTIONS)
+        self.assertEqual(remove_extensions(spec), OPENAPI_SPEC_WITHOUT_EXTENSIONS)
+        # In place, the immutable compact mappings are replaced by the transformed dicts
+        for transform, expected in ((remove_descriptions, OPENAPI_SPEC_WITHOUT_DESCRIPTIONS),
+                                    (remove_extensions, OPENAPI_SPEC_WITHOUT_EXTENSIONS)):
+            with patch('builtins.open', mock_open(read_data=get_json_content())):
+                spec = load_openapi_spec('test.json', compact=True)
+            self.assertEqual(transform(spec, in_place=True), expected)
+
+    def test_output_compact_spec(self):
+        """Test that compact specs are output exactly like regular ones."""
+        with patch('builtins.open', mock_open(read_data=get_json_content())):
+            spec = load_openapi_spec('test.json', compact=True)
+        for use_yaml in (False, True):
+            with patch('sys.stdout', new_callable=io.StringIO) as compact_out:
+                output_openapi_spec_to_stdout(spec, use_yaml=use_yaml)
+            with patch('sys.stdout', new_callable=io.StringIO) as regular_out:
+                output_openapi_spec_to_stdout(VALID_OPENAPI_SPEC, use_yaml=use_yaml)
+            self.assertEqual(compact_out.getvalue(), regular_out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Unit tests for compressed input and output in the compression module.
+"""
+import unittest
+import io
+import os
+import bz2
+import gzip
+import lzma
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+from compression import (
+    compression_from_extension,
+    compression_from_magic,
+    strip_compression_extension,
+    open_compressing_writer
+)
+from openapi_operations import (
+    LoadLimits,
+    SpecLimitError,
+    load_openapi_spec,
+    save_openapi_spec,
+    output_compressed_openapi_spec_to_stdout
+)
+from tests.test_data import VALID_OPENAPI_SPEC, get_json_content, get_yaml_content
+
+
+COMPRESSORS = {'gzip': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+
+
+class TestCompression(unittest.TestCase):
+    """Test cases for loading and saving compressed OpenAPI specs."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        """Write bytes to a file in the temporary directory and return its path."""
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_extensions(self):
+        """Test that compression extensions are recognised and stripped."""
+        self.assertEqual(compression_from_extension('spec.yaml.gz'), 'gzip')
+        self.assertEqual(compression_from_extension('spec.json.XZ'), 'xz')
+        self.assertIsNone(compression_from_extension('spec.json'))
+        self.assertEqual(strip_compression_extension('spec.yaml.bz2'), 'spec.yaml')
+        self.assertEqual(strip_compression_extension('spec.yaml'), 'spec.yaml')
+
+    def test_magic_numbers(self):
+        """Test that every format is recognised from its leading bytes."""
+        for compression, compress in COMPRESSORS.items():
+            self.assertEqual(compression_from_magic(compress(b'{}')[:6]), compression)
+        self.assertIsNone(compression_from_magic(b'{"ope'))
+
+    def test_load_compressed(self):
+        """Test loading JSON and YAML specs in every compression format."""
+        for compression, compress in COMPRESSORS.items():
+            for extension, content in (('.json', get_json_content()), ('.yaml', get_yaml_content())):
+                with self.subTest(compression=compression, extension=extension):
+                    path = self.write(f"spec{extension}.{compression}", compress(content.encode('utf-8')))
+                    self.assertEqual(load_openapi_spec(path), VALID_OPENAPI_SPEC)
+
+    def test_load_detects_compression_without_extension(self):
+        """Test that compressed content is detected from its magic number."""
+        path = self.write('spec', gzip.compress(get_json_content().encode('utf-8')))
+        self.assertEqual(load_openapi_spec(path), VALID_OPENAPI_SPEC)
+
+    def test_input_size_limit_applies_to_decompressed_size(self):
+        """Test that the input size limit bounds the decompressed size, not the file size."""
+        content = get_json_content().encode('utf-8')
+        path = self.write('spec.json.gz', gzip.compress(content))
+        with self.assertRaises(SpecLimitError):
+            load_openapi_spec(path, limits=LoadLimits(max_input_bytes=len(content) - 1))
+        self.assertEqual(load_openapi_spec(path, limits=LoadLimits(max_input_bytes=len(content))), VALID_OPENAPI_SPEC)
+
+    def test_load_compressed_stdin(self):
+        """Test that compressed content on stdin is detected and decompressed."""
+        stdin = io.TextIOWrapper(io.BytesIO(gzip.compress(get_yaml_content().encode('utf-8'))))
+        with patch('sys.stdin', stdin):
+            self.assertEqual(load_openapi_spec('-'), VALID_OPENAPI_SPEC)
+
+    def test_save_compressed(self):
+        """Test that saving compresses by extension, deterministically, so unchanged output is skipped."""
+        for compression in COMPRESSORS:
+            with self.subTest(compression=compression):
+                path = os.path.join(self.directory, f"spec.yaml.{compression}")
+                self.assertTrue(save_openapi_spec(VALID_OPENAPI_SPEC, path))
+                self.assertEqual(compression_from_magic(open(path, 'rb').read(6)), compression)
+                self.assertEqual(load_openapi_spec(path), VALID_OPENAPI_SPEC)
+                self.assertFalse(save_openapi_spec(VALID_OPENAPI_SPEC, path))
+
+    def test_output_compressed_to_stdout(self):
+        """Test writing a compressed spec to the binary standard output."""
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        with patch('sys.stdout', stdout):
+            output_compressed_openapi_spec_to_stdout(VALID_OPENAPI_SPEC, 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(stdout.buffer.getvalue())), VALID_OPENAPI_SPEC)
+
+    def test_unsupported_format(self):
+        """Test that an unknown compression format is rejected."""
+        with self.assertRaises(ValueError):
+            open_compressing_writer(io.BytesIO(), 'zip')
+
+
+if __name__ == '__main__':
+    unittest.main()
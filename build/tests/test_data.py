@@ -113,6 +113,81 @@ OPENAPI_SPEC_WITHOUT_EXTENSIONS = {
     }
 }
 
+OPENAPI_SPEC_WITH_REFS = {
+    "openapi": "3.0.0",
+    "info": {"title": "Test API", "version": "1.0.0"},
+    "security": [{"oauth2": []}],
+    "tags": [{"name": "tasks"}, {"name": "users"}],
+    "paths": {
+        "/tasks/{task_gid}": {
+            "parameters": [{"$ref": "#/components/parameters/task_path_gid"}],
+            "get": {
+                "tags": ["tasks"],
+                "operationId": "getTask",
+                "responses": {
+                    "200": {
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/TaskResponse"}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/users/me": {
+            "get": {
+                "tags": ["users"],
+                "operationId": "getMe",
+                "security": [{"personalAccessToken": []}],
+                "responses": {
+                    "200": {
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/UserCompact"}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    "components": {
+        "parameters": {
+            "task_path_gid": {"name": "task_gid", "in": "path", "required": True, "schema": {"type": "string"}}
+        },
+        "schemas": {
+            "TaskResponse": {
+                "allOf": [
+                    {"$ref": "#/components/schemas/TaskCompact"},
+                    {"type": "object", "properties": {"assignee": {"$ref": "#/components/schemas/UserCompact"}}}
+                ]
+            },
+            "TaskCompact": {"type": "object", "properties": {"gid": {"type": "string"}}},
+            "UserCompact": {"type": "object", "properties": {"gid": {"type": "string"}}},
+            "Unused": {"type": "string"}
+        },
+        "securitySchemes": {
+            "oauth2": {"type": "oauth2"},
+            "personalAccessToken": {"type": "http", "scheme": "bearer"}
+        }
+    }
+}
+
+# A spec whose webhooks reference components that no operation references
+OPENAPI_SPEC_WITH_WEBHOOKS = dict(OPENAPI_SPEC_WITH_REFS, **{
+    "webhooks": {
+        "taskChanged": {
+            "post": {"requestBody": {"$ref": "#/components/requestBodies/TaskEvent"}, "responses": {"200": {}}}
+        }
+    },
+    "components": dict(OPENAPI_SPEC_WITH_REFS["components"], **{
+        "requestBodies": {
+            "TaskEvent": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Unused"}}}}
+        }
+    })
+})
+
 # Mock data generators
 def get_json_content():
     """Return a JSON string of the test OpenAPI spec."""
@@ -127,6 +202,18 @@ def get_invalid_content():
     return "This is not valid JSON or YAML"
 
 # Mock argument objects
-def create_mock_args(filename='test_file.json', remove_descriptions=False, remove_extensions=False, yaml=False):
+def create_mock_args(filename='test_file.json', remove_descriptions=False, remove_extensions=False, yaml=False,
+                     split_by=None, output_dir=None, ndjson=False, max_bytes=None, max_tokens=None,
+                     compact=False, max_input_size=None, max_nodes=None, max_depth=None, max_alias_expansions=None,
+                     no_yaml_aliases=False, output=None, compress=None, mmap=False, jobs=None, paths=None,
+                     inventory=False, drop=None, keep=None, json_scalars=False, profile=None, profile_memory=False,
+                     selects=None, flatten_allof=False):
     """Create a mock args object for testing."""
-    return Mock(openapi_spec=filename, remove_descriptions=remove_descriptions, remove_extensions=remove_extensions, yaml=yaml)
\ No newline at end of file
+    return Mock(openapi_spec=filename, remove_descriptions=remove_descriptions, remove_extensions=remove_extensions, yaml=yaml,
+                split_by=split_by, output_dir=output_dir, ndjson=ndjson, max_bytes=max_bytes, max_tokens=max_tokens,
+                compact=compact, max_input_size=max_input_size, max_nodes=max_nodes, max_depth=max_depth,
+                max_alias_expansions=max_alias_expansions, no_yaml_aliases=no_yaml_aliases,
+                output=output, compress=compress, mmap=mmap, jobs=jobs, paths=paths,
+                inventory=inventory, drop=drop, keep=keep, json_scalars=json_scalars,
+                profile=profile, profile_memory=profile_memory, selects=selects,
+                flatten_allof=flatten_allof)
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Unit tests for the control of the garbage collector in the gc_control module.
+"""
+import unittest
+import gc
+import os
+import json
+import tempfile
+import threading
+import weakref
+from unittest.mock import patch
+import generate_openapi_subset
+from gc_control import freeze_loaded_objects, paused_gc
+from openapi_operations import load_openapi_spec
+from subset_daemon import SpecCache
+from subset_generator import SubsetGenerator
+from tests.test_data import VALID_OPENAPI_SPEC, create_mock_args
+
+
+class Node:
+    """An object that can be part of a reference cycle."""
+
+
+class TestPausedGC(unittest.TestCase):
+    """Test cases for pausing the garbage collector."""
+
+    def setUp(self):
+        self.was_enabled = gc.isenabled()
+        gc.enable()
+
+    def tearDown(self):
+        if not self.was_enabled:
+            gc.disable()
+
+    def test_pause(self):
+        """Test that the collector is disabled in the block and enabled again after it, also on errors."""
+        with paused_gc():
+            self.assertFalse(gc.isenabled())
+        self.assertTrue(gc.isenabled())
+        with self.assertRaises(KeyError):
+            with paused_gc():
+                raise KeyError()
+        self.assertTrue(gc.isenabled())
+
+    def test_nested(self):
+        """Test that nested blocks and decorated functions enable the collector when the outermost block ends."""
+        @paused_gc()
+        def decorated():
+            return gc.isenabled()
+
+        with paused_gc():
+            self.assertFalse(decorated())
+            self.assertFalse(gc.isenabled())
+        self.assertTrue(gc.isenabled())
+        self.assertFalse(decorated())
+        self.assertTrue(gc.isenabled())
+
+    def test_threads(self):
+        """Test that the collector stays disabled until the blocks of all threads end."""
+        entered, release = threading.Event(), threading.Event()
+
+        def pause():
+            with paused_gc():
+                entered.set()
+                release.wait()
+
+        thread = threading.Thread(target=pause)
+        thread.start()
+        entered.wait()
+        with paused_gc():
+            pass
+        self.assertFalse(gc.isenabled())
+        release.set()
+        thread.join()
+        self.assertTrue(gc.isenabled())
+
+    def test_disabled_before(self):
+        """Test that a collector disabled before the block stays disabled."""
+        gc.disable()
+        with paused_gc():
+            pass
+        self.assertFalse(gc.isenabled())
+
+    def test_only_loading_pauses(self):
+        """Test that loading pauses the collector, and the rest of a run, as in the daemon, does not."""
+        enabled = []
+        with patch('generate_openapi_subset.run_subset_command',
+                   side_effect=lambda args, logger, spec_cache: enabled.append(gc.isenabled()) or 0), \
+                patch('generate_openapi_subset.parse_arguments', return_value=create_mock_args()):
+            self.assertEqual(generate_openapi_subset.main(['spec.json'], spec_cache=SpecCache()), 0)
+        self.assertEqual(enabled, [True])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(VALID_OPENAPI_SPEC, f)
+            with patch('openapi_operations.parse_openapi_spec',
+                       side_effect=lambda *args, **kwargs: enabled.append(gc.isenabled()) or {}):
+                load_openapi_spec(path)
+        self.assertEqual(enabled, [True, False])
+        self.assertTrue(gc.isenabled())
+
+
+class TestFreeze(unittest.TestCase):
+    """Test cases for freezing long-lived specifications."""
+
+    def tearDown(self):
+        gc.unfreeze()
+
+    def test_freeze(self):
+        """Test that the live objects are moved to the permanent generation."""
+        spec = json.loads(json.dumps(VALID_OPENAPI_SPEC))
+        freeze_loaded_objects()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertFalse(any(tracked is spec for tracked in gc.get_objects()))
+
+    def test_garbage_not_frozen(self):
+        """Test that unreachable reference cycles are collected, not frozen."""
+        cycle = Node()
+        cycle.self = cycle
+        reference = weakref.ref(cycle)
+        del cycle
+        freeze_loaded_objects()
+        self.assertIsNone(reference())
+
+    def test_spec_cache(self):
+        """Test that the cache freezes the specifications it loads if asked to."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(VALID_OPENAPI_SPEC, f)
+            with patch('subset_daemon.freeze_loaded_objects') as freeze:
+                SpecCache().load(path)
+                freeze.assert_not_called()
+                cache = SpecCache(freeze=True)
+                cache.load(path)
+                cache.load(path)
+                freeze.assert_called_once()
+
+    def test_subset_generator(self):
+        """Test that a generator freezes its specification and each transformation of it if asked to."""
+        with patch('subset_generator.freeze_loaded_objects') as freeze:
+            generator = SubsetGenerator(VALID_OPENAPI_SPEC, freeze=True)
+            generator.generate(remove_descriptions=True)
+            generator.generate(remove_descriptions=True)
+            generator.generate()
+            self.assertEqual(freeze.call_count, 2)
+            SubsetGenerator(VALID_OPENAPI_SPEC).generate(remove_descriptions=True)
+            self.assertEqual(freeze.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 Unit tests for the console application.
 """
 import unittest
+import io
 import os
 import sys
 from unittest.mock import patch, Mock
@@ -85,6 +86,7 @@ class TestMainModule(unittest.TestCase):
     @patch('os.access', return_value=True)
     def test_logging_setup(self, mock_access, mock_isfile, mock_parse_arguments, mock_setup_logging):
         """Test that logging is set up correctly."""
+        mock_parse_arguments.return_value = create_mock_args('valid_file.json')
         generate_openapi_subset.main()
         mock_setup_logging.assert_called_once()
 
@@ -108,7 +110,7 @@ class TestMainModule(unittest.TestCase):
         mock_load.return_value = VALID_OPENAPI_SPEC
         
         generate_openapi_subset.main()
-        mock_output.assert_called_once_with(VALID_OPENAPI_SPEC, use_yaml=False)
+        mock_output.assert_called_once_with(VALID_OPENAPI_SPEC, use_yaml=False, yaml_aliases=True)
         
     @patch('os.path.isfile')
     @patch('os.access')
@@ -130,7 +132,22 @@ class TestMainModule(unittest.TestCase):
         mock_load.return_value = VALID_OPENAPI_SPEC
         
         generate_openapi_subset.main()
-        mock_output.assert_called_once_with(VALID_OPENAPI_SPEC, use_yaml=True)
+        mock_output.assert_called_once_with(VALID_OPENAPI_SPEC, use_yaml=True, yaml_aliases=True)
+
+    @patch('os.path.isfile')
+    @patch('argparse.ArgumentParser.parse_args')
+    @patch('generate_openapi_subset.output_openapi_spec_to_stdout')
+    def test_main_reads_stdin(self, mock_output, mock_parse_args, mock_isfile):
+        """Test that '-' reads the OpenAPI spec from stdin without checking for a file."""
+        mock_parse_args.return_value = create_mock_args('-')
+        stdin = Mock()
+        stdin.buffer = io.BytesIO(get_json_content().encode('utf-8'))
+
+        with patch('sys.stdin', stdin):
+            result = generate_openapi_subset.main()
+        self.assertEqual(result, 0)
+        mock_isfile.assert_not_called()
+        mock_output.assert_called_once_with(VALID_OPENAPI_SPEC, use_yaml=False, yaml_aliases=True)
 
 
 if __name__ == '__main__':
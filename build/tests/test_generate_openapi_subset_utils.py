@@ -67,6 +67,46 @@ class TestArgumentParsing(unittest.TestCase):
             args = generate_openapi_subset.parse_arguments()
             self.assertFalse(args.yaml)
 
+    def test_parse_arguments_with_split_by(self):
+        """Test argument parsing with --split-by and --output-dir."""
+        with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json', '--split-by', 'tag', '--output-dir', 'out']):
+            args = generate_openapi_subset.parse_arguments()
+            self.assertEqual(args.split_by, 'tag')
+            self.assertEqual(args.output_dir, 'out')
+
+        # --split-by requires --output-dir
+        with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json', '--split-by', 'path-prefix']):
+            with patch('sys.stderr'):
+                with self.assertRaises(SystemExit):
+                    generate_openapi_subset.parse_arguments()
+
+    def test_parse_arguments_with_output(self):
+        """Test that the output format is inferred from the extension of --output."""
+        with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json', '-o', 'out.yaml']):
+            args = generate_openapi_subset.parse_arguments()
+            self.assertEqual(args.output, 'out.yaml')
+            self.assertTrue(args.yaml)
+
+        with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json', '--yaml', '--output', 'out.json']):
+            args = generate_openapi_subset.parse_arguments()
+            self.assertFalse(args.yaml)
+
+        with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json', '--yaml', '--output', 'out.txt']):
+            args = generate_openapi_subset.parse_arguments()
+            self.assertTrue(args.yaml)
+
+    def test_parse_arguments_with_jobs(self):
+        """Test that --jobs is only accepted for the JSON output without a size budget."""
+        with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json', '--jobs', '4']):
+            args = generate_openapi_subset.parse_arguments()
+            self.assertEqual(args.jobs, 4)
+
+        for extra in (['--jobs', '0'], ['--jobs', '2', '--yaml'], ['--jobs', '2', '--max-bytes', '1000']):
+            with patch('sys.argv', ['generate_openapi_subset.py', 'test_file.json'] + extra):
+                with patch('sys.stderr'):
+                    with self.assertRaises(SystemExit):
+                        generate_openapi_subset.parse_arguments()
+
 
 class TestSysExitHandling(unittest.TestCase):
     """Test cases for sys.exit handling in the generate_openapi_subset module."""
@@ -0,0 +1,152 @@
+"""
+Unit tests for flattening allOf compositions in the openapi_allof module.
+"""
+import unittest
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+import generate_openapi_subset
+from openapi_allof import AllOfFlattener, flatten_allof
+from openapi_operations import write_openapi_spec
+from subset_generator import SubsetGenerator
+from tests.test_data import OPENAPI_SPEC_WITH_REFS
+
+
+def ref(name):
+    """Return a reference to a component schema."""
+    return {'$ref': f'#/components/schemas/{name}'}
+
+
+def spec_with_schemas(**schemas):
+    """Return a spec with the given component schemas."""
+    return {'openapi': '3.0.0', 'paths': {}, 'components': {'schemas': schemas}}
+
+
+# A *Compact -> *Base -> *Response hierarchy, with two schemas including the same base
+HIERARCHY_SPEC = spec_with_schemas(
+    TaskCompact={'type': 'object', 'description': 'A task.', 'required': ['gid'],
+                 'properties': {'gid': {'type': 'string'}, 'name': {'type': 'string', 'description': 'Name.'}}},
+    TaskBase={'allOf': [ref('TaskCompact'), {'type': 'object', 'required': ['name'],
+                                             'properties': {'notes': {'type': 'string'}}}]},
+    TaskRequest={'description': 'A task to create.',
+                 'allOf': [ref('TaskBase'), {'properties': {'name': {'type': 'string', 'description': 'New name.'}}}]},
+    TaskResponse={'allOf': [ref('TaskBase'), {'type': 'object', 'properties': {'parent': {'allOf': [
+        ref('TaskCompact'), {'nullable': True}]}}}]},
+)
+
+
+class TestFlattenAllOf(unittest.TestCase):
+    """Test cases for merging allOf compositions."""
+
+    def test_flatten(self):
+        """Test that compositions are merged and the references elsewhere are kept."""
+        original = json.dumps(OPENAPI_SPEC_WITH_REFS)
+        result = flatten_allof(OPENAPI_SPEC_WITH_REFS)
+        self.assertEqual(json.dumps(OPENAPI_SPEC_WITH_REFS), original)
+        self.assertEqual(result['components']['schemas']['TaskResponse'], {
+            'type': 'object',
+            'properties': {'gid': {'type': 'string'}, 'assignee': ref('UserCompact')}
+        })
+        self.assertIs(result['paths'], OPENAPI_SPEC_WITH_REFS['paths'])
+        self.assertIs(result['components']['parameters'], OPENAPI_SPEC_WITH_REFS['components']['parameters'])
+
+    def test_merge_keywords(self):
+        """Test how required names, properties and annotations are merged."""
+        schemas = flatten_allof(HIERARCHY_SPEC)['components']['schemas']
+        self.assertEqual(schemas['TaskBase']['required'], ['gid', 'name'])
+        self.assertEqual(list(schemas['TaskBase']['properties']), ['gid', 'name', 'notes'])
+        # The schema's own description wins over those of its parts, which keeps its place
+        self.assertEqual(list(schemas['TaskRequest']), ['description', 'type', 'required', 'properties'])
+        self.assertEqual(schemas['TaskRequest']['description'], 'A task to create.')
+        self.assertEqual(schemas['TaskRequest']['properties']['name'], {'type': 'string', 'description': 'New name.'})
+        self.assertEqual(schemas['TaskResponse']['properties']['parent'], dict(
+            HIERARCHY_SPEC['components']['schemas']['TaskCompact'], nullable=True))
+        self.assertNotIn('allOf', json.dumps(schemas))
+
+    def test_merged_once(self):
+        """Test that each referenced schema is merged once, and copied into the schemas that include it."""
+        flattener = AllOfFlattener(HIERARCHY_SPEC)
+        schemas = flattener.flatten(HIERARCHY_SPEC)['components']['schemas']
+        # TaskBase, TaskRequest, TaskResponse, parent, and the two definitions of name
+        self.assertEqual((flattener.merged, flattener.kept), (5, 0))
+        self.assertEqual(schemas['TaskRequest']['properties']['notes'], schemas['TaskResponse']['properties']['notes'])
+        self.assertIsNot(schemas['TaskRequest']['properties']['notes'], schemas['TaskResponse']['properties']['notes'])
+        self.assertIsNot(schemas['TaskResponse']['properties']['gid'], schemas['TaskCompact']['properties']['gid'])
+
+    def test_conflicts(self):
+        """Test that compositions whose parts cannot be merged are left as they are."""
+        spec = spec_with_schemas(
+            Text={'type': 'string'},
+            Conflicting={'allOf': [ref('Text'), {'type': 'integer'}]},
+            Missing={'allOf': [ref('Missing2')]},
+            External={'allOf': [{'$ref': 'other.yaml#/Task'}]},
+            Nested={'allOf': [{'$ref': '#/components/schemas/Text2/properties/gid'}, {'type': 'object'}]},
+            Text2={'type': 'object', 'properties': {'gid': {'type': 'string'}}},
+            Property={'allOf': [{'properties': {'a': {'type': 'string'}}}, {'properties': {'a': {'type': 'integer'}}}]},
+        )
+        schemas = flatten_allof(spec)['components']['schemas']
+        for name in ('Conflicting', 'Missing', 'External', 'Nested'):
+            self.assertIs(schemas[name], spec['components']['schemas'][name])
+        # A property that two parts define differently must satisfy both definitions
+        self.assertEqual(schemas['Property'], {'properties': {'a': {'allOf': [{'type': 'string'},
+                                                                                {'type': 'integer'}]}}})
+
+    def test_cycles(self):
+        """Test that compositions that include themselves are kept and the others are merged."""
+        spec = spec_with_schemas(
+            Self={'allOf': [ref('Self')]},
+            First={'allOf': [ref('Second'), {'type': 'object'}]},
+            Second={'allOf': [ref('First')]},
+            Alias=ref('Node'),
+            Node={'allOf': [{'type': 'object'}, {'properties': {'parent': {'allOf': [ref('Alias')]}}}]},
+        )
+        schemas = flatten_allof(spec)['components']['schemas']
+        for name in ('Self', 'First', 'Second'):
+            self.assertIn('allOf', schemas[name])
+        self.assertEqual(schemas['Node'], {'type': 'object', 'properties': {'parent': {'allOf': [ref('Alias')]}}})
+
+    def test_no_new_yaml_aliases(self):
+        """Test that the YAML output of a flattened spec only has the anchors that the original has."""
+        stream = io.StringIO()
+        write_openapi_spec(flatten_allof(HIERARCHY_SPEC), stream, use_yaml=True)
+        self.assertNotIn('&id', stream.getvalue())
+
+        shared = {'type': 'string'}
+        spec = spec_with_schemas(Base={'properties': {'a': shared}}, Other={'properties': {'b': shared}},
+                                 Merged={'allOf': [ref('Base'), {'type': 'object'}]})
+        result = flatten_allof(spec)
+        schemas = result['components']['schemas']
+        self.assertIs(schemas['Other']['properties']['b'], shared)
+        self.assertEqual(schemas['Merged']['properties']['a'], shared)
+        self.assertIsNot(schemas['Merged']['properties']['a'], shared)
+        stream = io.StringIO()
+        write_openapi_spec(result, stream, use_yaml=True)
+        self.assertEqual(stream.getvalue().count('&id'), 1)
+
+    def test_subset_generator(self):
+        """Test that the flattened spec of a generator is computed once."""
+        generator = SubsetGenerator(HIERARCHY_SPEC)
+        subset = generator.generate(flatten_allof=True)
+        self.assertEqual(subset, flatten_allof(HIERARCHY_SPEC))
+        self.assertIs(generator.generate(flatten_allof=True), subset)
+
+    def test_flatten_option(self):
+        """Test the --flatten-allof option."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(OPENAPI_SPEC_WITH_REFS, f)
+            stdout = io.StringIO()
+            with patch('sys.stdout', stdout):
+                result = generate_openapi_subset.main([path, '--flatten-allof', '--path', '/tasks/{task_gid}'])
+        self.assertEqual(result, 0)
+        output = json.loads(stdout.getvalue())
+        self.assertEqual(output['components']['schemas']['TaskResponse']['properties']['assignee'],
+                         ref('UserCompact'))
+        self.assertNotIn('allOf', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the output size budget in the openapi_budget module.
+"""
+import unittest
+import json
+from openapi_budget import serialized_size, apply_size_budget, budget_from_limits
+from tests.test_data import VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS
+
+
+class TestSerializedSize(unittest.TestCase):
+    """Test cases for computing the serialized size without serializing."""
+
+    def test_serialized_size_matches_json_dump(self):
+        """Test that the computed size equals the length of json.dumps with indent=2."""
+        for value in (VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS, {}, [], {"a": [], "b": {}},
+                      {200: "ok", "é": 1.5, "none": None}):
+            self.assertEqual(serialized_size(value), len(json.dumps(value, indent=2)))
+
+
+class TestSizeBudget(unittest.TestCase):
+    """Test cases for trimming a specification into a size budget."""
+
+    def test_no_trimming_when_spec_fits(self):
+        """Test that a spec that already fits is left as is."""
+        size = len(json.dumps(OPENAPI_SPEC_WITH_REFS, indent=2))
+        result, report = apply_size_budget(OPENAPI_SPEC_WITH_REFS, size)
+        self.assertEqual(result, OPENAPI_SPEC_WITH_REFS)
+        self.assertEqual(report["steps"], [])
+        self.assertTrue(report["fits"])
+
+    def test_steps_applied_in_order_until_fit(self):
+        """Test that trimming stops after the first step that makes the spec fit."""
+        size = len(json.dumps(VALID_OPENAPI_SPEC, indent=2))
+        result, report = apply_size_budget(VALID_OPENAPI_SPEC, size - 1)
+        self.assertEqual([step["step"] for step in report["steps"]], ["descriptions"])
+        self.assertNotIn("description", result["info"])
+        self.assertIn("x-logo", result["info"])
+        self.assertEqual(report["final_bytes"], len(json.dumps(result, indent=2)))
+
+    def test_tracked_size_matches_output(self):
+        """Test that the tracked size stays exact when operations and components are dropped."""
+        result, report = apply_size_budget(OPENAPI_SPEC_WITH_REFS, 2000)
+        self.assertTrue(report["fits"])
+        self.assertEqual(report["steps"][-1], {"step": "operations", "removed": 1, "bytes_saved": 576})
+        self.assertEqual(report["final_bytes"], len(json.dumps(result, indent=2)))
+        # The unused component is dropped before any operation
+        self.assertNotIn("Unused", result["components"]["schemas"])
+        # The operation sharing the fewest components is dropped, with the security scheme only it used
+        self.assertEqual(list(result["paths"]), ["/tasks/{task_gid}"])
+        self.assertEqual(list(result["components"]["securitySchemes"]), ["oauth2"])
+        # The original spec is not modified
+        self.assertIn("Unused", OPENAPI_SPEC_WITH_REFS["components"]["schemas"])
+        self.assertEqual(len(OPENAPI_SPEC_WITH_REFS["paths"]), 2)
+
+    def test_budget_not_met(self):
+        """Test that the report says when the spec cannot be trimmed enough."""
+        _, report = apply_size_budget(OPENAPI_SPEC_WITH_REFS, 10)
+        self.assertFalse(report["fits"])
+
+    def test_budget_from_limits(self):
+        """Test combining the byte and token limits."""
+        self.assertIsNone(budget_from_limits(None, None))
+        self.assertEqual(budget_from_limits(1000, None), 1000)
+        self.assertEqual(budget_from_limits(None, 100), 400)
+        self.assertEqual(budget_from_limits(300, 100), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
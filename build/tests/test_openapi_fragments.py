@@ -0,0 +1,89 @@
+"""
+Unit tests for the cache of serialized fragments in the openapi_fragments module.
+"""
+import unittest
+import io
+import json
+from compact_nodes import CompactMapping
+from openapi_fragments import FragmentCache
+from openapi_operations import remove_descriptions, write_openapi_spec
+from openapi_refs import build_reference_graph, split_openapi_spec
+from subset_generator import SubsetGenerator
+from tests.test_data import VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Test cases for writing specifications from cached fragments."""
+
+    def assert_same_output(self, spec, fragments=None):
+        """Assert that the output of the cache is byte-identical to json.dumps(indent=2)."""
+        fragments = FragmentCache() if fragments is None else fragments
+        stream = io.StringIO()
+        fragments.write(spec, stream)
+        self.assertEqual(stream.getvalue(), json.dumps(spec, indent=2))
+
+    def test_same_output(self):
+        """Test the output for specifications, their transforms and their shards."""
+        fragments = FragmentCache()
+        for spec in (VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS, remove_descriptions(OPENAPI_SPEC_WITH_REFS)):
+            with self.subTest(spec=list(spec['paths'])):
+                self.assert_same_output(spec, fragments)
+                for split_by in ('tag', 'path-prefix'):
+                    for shard in split_openapi_spec(spec, split_by, build_reference_graph(spec)).values():
+                        self.assert_same_output(shard, fragments)
+
+    def test_edge_cases(self):
+        """Test empty containers, non-mapping values and non-string keys."""
+        self.assert_same_output({})
+        self.assert_same_output([])
+        self.assert_same_output({'paths': {}, 'components': {'schemas': {}}})
+        self.assert_same_output({'paths': {'/a': {}}, 'components': 'invalid', 'tags': []})
+        self.assert_same_output({'paths': {'/a': {'get': {'responses': {200: {'description': 'OK'}}}}}})
+        self.assert_same_output({'components': {'schemas': {1: [], 'b': {'enum': [None, True, 1.5]}}}})
+
+    def test_compact_mapping(self):
+        """Test that compact mappings are written as the mappings they represent."""
+        operation = CompactMapping(('summary', 'tags'), ('A', ['a']))
+        spec = {'paths': {'/a': CompactMapping(('get',), (operation,)), '/b': CompactMapping((), ())}}
+        stream = io.StringIO()
+        FragmentCache().write(spec, stream)
+        expected = {'paths': {'/a': {'get': {'summary': 'A', 'tags': ['a']}}, '/b': {}}}
+        self.assertEqual(stream.getvalue(), json.dumps(expected, indent=2))
+
+    def test_reuses_fragments(self):
+        """Test that shared operations and components are serialized once."""
+        fragments = FragmentCache()
+        self.assert_same_output(OPENAPI_SPEC_WITH_REFS, fragments)
+        cached = len(fragments)
+        self.assertGreater(cached, 0)
+        subset = dict(OPENAPI_SPEC_WITH_REFS, info={'title': 'Subset', 'version': '1.0.0'})
+        self.assert_same_output(subset, fragments)
+        self.assertEqual(len(fragments), cached)
+        fragments.clear()
+        self.assertEqual(len(fragments), 0)
+
+    def test_write_openapi_spec(self):
+        """Test that write_openapi_spec writes JSON from the cache and YAML without it."""
+        fragments = FragmentCache()
+        stream = io.StringIO()
+        write_openapi_spec(VALID_OPENAPI_SPEC, stream, fragments=fragments)
+        self.assertEqual(stream.getvalue(), json.dumps(VALID_OPENAPI_SPEC, indent=2))
+        cached = len(fragments)
+        write_openapi_spec(VALID_OPENAPI_SPEC, io.StringIO(), use_yaml=True, fragments=fragments)
+        self.assertEqual(len(fragments), cached)
+
+    def test_subset_generator(self):
+        """Test that the generator reuses its fragments across calls with the same options."""
+        generator = SubsetGenerator(OPENAPI_SPEC_WITH_REFS)
+        expected = json.dumps(remove_descriptions(OPENAPI_SPEC_WITH_REFS), indent=2).encode('utf-8')
+        self.assertEqual(generator.to_bytes(remove_descriptions=True), expected)
+        cached = len(generator.fragments)
+        self.assertEqual(generator.to_bytes(remove_descriptions=True), expected)
+        self.assertEqual(len(generator.fragments), cached)
+        self.assertEqual(generator.to_bytes(max_bytes=10 ** 6),
+                         json.dumps(OPENAPI_SPEC_WITH_REFS, indent=2).encode('utf-8'))
+        self.assertEqual(len(generator.fragments), cached)
+
+
+if __name__ == '__main__':
+    unittest.main()
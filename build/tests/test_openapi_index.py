@@ -0,0 +1,125 @@
+"""
+Unit tests for the persistent operation index in the openapi_index module.
+"""
+import unittest
+import io
+import os
+import json
+import tempfile
+from unittest.mock import patch
+import generate_openapi_subset
+from openapi_index import build_openapi_index, open_openapi_index, default_index_path
+from openapi_refs import extract_operations_subset, iter_operations
+from tests.test_data import OPENAPI_SPEC_WITH_REFS, OPENAPI_SPEC_WITH_WEBHOOKS
+
+
+class TestOpenAPIIndex(unittest.TestCase):
+    """Test cases for building and querying the index."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.spec_path = os.path.join(self.directory.name, 'spec.json')
+        self.write_spec(OPENAPI_SPEC_WITH_REFS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_spec(self, spec):
+        """Write a spec to the spec file."""
+        with open(self.spec_path, 'w', encoding='utf-8') as f:
+            json.dump(spec, f)
+
+    def test_subset_matches_extraction(self):
+        """Test that the subset of every operation is the same as extracting it from the parsed spec."""
+        build_openapi_index(self.spec_path)
+        index, built = open_openapi_index(self.spec_path)
+        with index:
+            self.assertFalse(built)
+            for path, method, operation in iter_operations(OPENAPI_SPEC_WITH_REFS):
+                with self.subTest(path=path, method=method):
+                    operations = index.find_operations([operation['operationId']])
+                    self.assertEqual(operations, {path: [method]})
+                    self.assertEqual(index.subset(operations),
+                                     extract_operations_subset(OPENAPI_SPEC_WITH_REFS, operations))
+
+    def test_webhook_references(self):
+        """Test that the components referenced from other top-level properties are kept."""
+        self.write_spec(OPENAPI_SPEC_WITH_WEBHOOKS)
+        index, _ = open_openapi_index(self.spec_path)
+        with index:
+            operations = index.find_operations(['getMe'])
+            self.assertEqual(index.subset(operations),
+                             extract_operations_subset(OPENAPI_SPEC_WITH_WEBHOOKS, operations))
+
+    def test_find_operations_by_path(self):
+        """Test selecting the operations of a path, optionally by method."""
+        index, _ = open_openapi_index(self.spec_path)
+        with index:
+            path, method, _ = next(iter_operations(OPENAPI_SPEC_WITH_REFS))
+            self.assertEqual(index.find_operations(path=path, method=method), {path: [method]})
+            self.assertIn(method, index.find_operations(path=path)[path])
+            with self.assertRaises(ValueError):
+                index.find_operations(path='/missing')
+            with self.assertRaises(ValueError):
+                index.find_operations(['missingOperation'])
+
+    def test_rebuilt_when_source_changes(self):
+        """Test that the index is rebuilt only when the content of the spec file changes."""
+        index, built = open_openapi_index(self.spec_path)
+        index.close()
+        self.assertTrue(built)
+        self.assertTrue(os.path.exists(default_index_path(self.spec_path)))
+
+        # A touched but unchanged file keeps its index
+        os.utime(self.spec_path, ns=(0, 0))
+        index, built = open_openapi_index(self.spec_path)
+        index.close()
+        self.assertFalse(built)
+
+        changed = dict(OPENAPI_SPEC_WITH_REFS, info={'title': 'Changed', 'version': '2.0.0'})
+        self.write_spec(changed)
+        os.utime(self.spec_path, ns=(1, 1))
+        index, built = open_openapi_index(self.spec_path)
+        with index:
+            self.assertTrue(built)
+            operations = index.find_operations(path=next(iter_operations(changed))[0])
+            self.assertEqual(index.subset(operations)['info']['title'], 'Changed')
+
+    def test_get_command(self):
+        """Test the index and get subcommands."""
+        operation_id = next(iter_operations(OPENAPI_SPEC_WITH_REFS))[2]['operationId']
+        index_path = os.path.join(self.directory.name, 'spec.sqlite')
+        self.assertEqual(generate_openapi_subset.main(['index', self.spec_path, '--index-file', index_path]), 0)
+        self.assertTrue(os.path.exists(index_path))
+
+        stdout = io.StringIO()
+        with patch('sys.stdout', stdout):
+            result = generate_openapi_subset.main(['get', self.spec_path, '--index-file', index_path,
+                                                   '--operation-id', operation_id])
+        self.assertEqual(result, 0)
+        subset = json.loads(stdout.getvalue())
+        self.assertEqual([operation['operationId'] for _, _, operation in iter_operations(subset)], [operation_id])
+
+        self.assertEqual(generate_openapi_subset.main(['get', self.spec_path, '--index-file', index_path,
+                                                       '--operation-id', 'missingOperation']), 1)
+
+
+    def test_spec_file_named_like_command(self):
+        """Test that a spec file named like a subcommand is processed as the spec."""
+        for name in ('index', 'get'):
+            with self.subTest(name=name):
+                with open(os.path.join(self.directory.name, name), 'w', encoding='utf-8') as f:
+                    json.dump(OPENAPI_SPEC_WITH_REFS, f)
+                stdout = io.StringIO()
+                cwd = os.getcwd()
+                os.chdir(self.directory.name)
+                try:
+                    with patch('sys.stdout', stdout):
+                        self.assertEqual(generate_openapi_subset.main([name]), 0)
+                finally:
+                    os.chdir(cwd)
+                self.assertEqual(json.loads(stdout.getvalue()), OPENAPI_SPEC_WITH_REFS)
+
+
+if __name__ == '__main__':
+    unittest.main()
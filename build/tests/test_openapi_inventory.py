@@ -0,0 +1,74 @@
+"""
+Unit tests for the inventory in the openapi_inventory module.
+"""
+import unittest
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+import generate_openapi_subset
+from openapi_inventory import compute_inventory
+from openapi_operations import remove_descriptions, remove_extensions
+from openapi_refs import iter_operations
+from tests.test_data import VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS
+
+
+# Descriptions and extensions that empty their containers, nested inside each other
+NESTED_SPEC = dict(OPENAPI_SPEC_WITH_REFS, **{
+    'x-only': {'x-inner': {'description': 'gone'}},
+    'info': {'description': {'x-tag': 1}, 'title': 'T', 'version': '1'},
+    'x-list': [{'description': 'a'}, {'x-b': 'b'}],
+})
+
+
+class TestInventory(unittest.TestCase):
+    """Test cases for computing the inventory of a spec."""
+
+    def test_sizes_match_serialization(self):
+        """Test that the total size and the savings match the serialized transformed specs."""
+        for spec in (VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS, NESTED_SPEC):
+            with self.subTest(spec=spec['info']):
+                inventory = compute_inventory(spec)
+                size = len(json.dumps(spec, indent=2))
+                self.assertEqual(inventory['bytes'], size)
+                savings = inventory['savings']
+                self.assertEqual(savings['--remove-descriptions'],
+                                 size - len(json.dumps(remove_descriptions(spec), indent=2)))
+                self.assertEqual(savings['--remove-extensions'],
+                                 size - len(json.dumps(remove_extensions(spec), indent=2)))
+                self.assertEqual(savings['--remove-descriptions --remove-extensions'],
+                                 size - len(json.dumps(remove_extensions(remove_descriptions(spec)), indent=2)))
+
+    def test_counts(self):
+        """Test the operation, component and reference counts."""
+        inventory = compute_inventory(OPENAPI_SPEC_WITH_REFS)
+        operations = list(iter_operations(OPENAPI_SPEC_WITH_REFS))
+        self.assertEqual(inventory['operations']['count'], len(operations))
+        self.assertEqual(sum(inventory['operations']['by_method'].values()), len(operations))
+        schemas = OPENAPI_SPEC_WITH_REFS['components']['schemas']
+        self.assertEqual(inventory['components']['schemas']['count'], len(schemas))
+        self.assertEqual(inventory['refs']['count'], json.dumps(OPENAPI_SPEC_WITH_REFS).count('"$ref"'))
+        self.assertEqual(inventory['refs']['unresolved'], 0)
+        self.assertGreater(inventory['refs']['max_fan_in'], 0)
+
+    def test_inventory_option(self):
+        """Test that --inventory prints the inventory of the loaded spec."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(OPENAPI_SPEC_WITH_REFS, f)
+            stdout = io.StringIO()
+            with patch('sys.stdout', stdout):
+                self.assertEqual(generate_openapi_subset.main([path, '--inventory']), 0)
+            self.assertEqual(json.loads(stdout.getvalue()), compute_inventory(OPENAPI_SPEC_WITH_REFS))
+            self.assertEqual(generate_openapi_subset.main([path, '--inventory', '--yaml']), 2)
+            # The savings of the removals are reported, not applied
+            for option in ('--remove-descriptions', '--remove-extensions'):
+                with self.subTest(option=option), patch('sys.stderr', io.StringIO()) as stderr:
+                    self.assertEqual(generate_openapi_subset.main([path, '--inventory', option]), 2)
+                    self.assertIn('--inventory cannot be combined with --remove-descriptions', stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
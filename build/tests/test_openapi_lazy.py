@@ -0,0 +1,102 @@
+"""
+Unit tests for the lazy JSON loader in the openapi_lazy module.
+"""
+import unittest
+import os
+import json
+import tempfile
+import yaml
+from openapi_lazy import LazyJSONSpec, load_openapi_paths_subset, load_openapi_pointers_subset
+from openapi_operations import LoadLimits, SpecLimitError
+from openapi_refs import HTTP_METHODS, SelectionNotFoundError, extract_operations_subset
+from tests.test_data import OPENAPI_SPEC_WITH_REFS, OPENAPI_SPEC_WITH_WEBHOOKS
+
+
+# Brackets, quotes and escapes inside strings must not confuse the structural scan
+TRICKY_SPEC = dict(OPENAPI_SPEC_WITH_REFS, **{
+    'x-notes': ['}]', '{"[', 'a \\"quoted\\" {value}', '\\\\'],
+    'x-empty': {},
+    'x-scalars': [1.5e3, -2, True, False, None],
+})
+
+
+def expected_subset(spec, paths):
+    """Return the subset for the given paths, extracted from the fully loaded spec."""
+    return extract_operations_subset(spec, {path: list(HTTP_METHODS) for path in paths})
+
+
+class TestLazyJSONSpec(unittest.TestCase):
+    """Test cases for loading subsets from JSON files lazily."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        """Write text to a file in the temporary directory and return its path."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_subset_matches_extraction(self):
+        """Test that the lazy subset of each path equals the subset of the fully loaded spec."""
+        for indent in (None, 2):
+            path = self.write('spec.json', json.dumps(TRICKY_SPEC, indent=indent))
+            with LazyJSONSpec(path) as spec:
+                self.assertEqual(spec.path_names(), list(TRICKY_SPEC['paths']))
+                for name in TRICKY_SPEC['paths']:
+                    with self.subTest(indent=indent, path=name):
+                        self.assertEqual(json.dumps(spec.subset([name])),
+                                         json.dumps(expected_subset(TRICKY_SPEC, [name])))
+
+    def test_webhook_references(self):
+        """Test that the components referenced from other top-level properties are decoded."""
+        path = self.write('spec.json', json.dumps(OPENAPI_SPEC_WITH_WEBHOOKS))
+        self.assertEqual(json.dumps(load_openapi_paths_subset(path, ['/users/me'])),
+                         json.dumps(expected_subset(OPENAPI_SPEC_WITH_WEBHOOKS, ['/users/me'])))
+
+    def test_missing_path(self):
+        """Test that selecting a path that does not exist fails."""
+        path = self.write('spec.json', json.dumps(OPENAPI_SPEC_WITH_REFS))
+        with self.assertRaises(SelectionNotFoundError):
+            load_openapi_paths_subset(path, ['/missing'])
+
+    def test_invalid_json(self):
+        """Test that structurally invalid JSON is rejected."""
+        for content in ('', '[]', '{"openapi": "3.0.0"', '{"openapi" "3.0.0"}', '{"paths": {}} {}'):
+            with self.subTest(content=content):
+                with self.assertRaises(ValueError):
+                    LazyJSONSpec(self.write('spec.json', content))
+
+    def test_input_size_limit(self):
+        """Test that the input size limit is checked against the file size."""
+        content = json.dumps(OPENAPI_SPEC_WITH_REFS)
+        path = self.write('spec.json', content)
+        with self.assertRaises(SpecLimitError):
+            load_openapi_paths_subset(path, [], limits=LoadLimits(max_input_bytes=len(content) - 1))
+
+    def test_yaml_is_loaded_in_full(self):
+        """Test that YAML files give the same subset through the regular loader."""
+        name = next(iter(OPENAPI_SPEC_WITH_REFS['paths']))
+        path = self.write('spec.yaml', yaml.safe_dump(OPENAPI_SPEC_WITH_REFS, sort_keys=False))
+        self.assertEqual(load_openapi_paths_subset(path, [name]), expected_subset(OPENAPI_SPEC_WITH_REFS, [name]))
+
+
+    def test_yaml_in_json_file(self):
+        """Test that a .json file holding YAML is loaded in full, and invalid content is still rejected."""
+        name = next(iter(OPENAPI_SPEC_WITH_REFS['paths']))
+        path = self.write('spec.json', yaml.safe_dump(OPENAPI_SPEC_WITH_REFS, sort_keys=False))
+        self.assertEqual(load_openapi_paths_subset(path, [name]), expected_subset(OPENAPI_SPEC_WITH_REFS, [name]))
+        self.assertEqual(load_openapi_pointers_subset(path, ['/info']),
+                         {'openapi': OPENAPI_SPEC_WITH_REFS['openapi'], 'info': OPENAPI_SPEC_WITH_REFS['info']})
+        with self.assertRaises(SelectionNotFoundError):
+            load_openapi_paths_subset(path, ['/missing'])
+        with self.assertRaises(ValueError):
+            load_openapi_paths_subset(self.write('invalid.json', '{"openapi" "3.0.0"}'), [name])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,15 @@
 Unit tests for OpenAPI operations in the generate_openapi_subset module.
 """
 import unittest
+import io
+import os
 import json
+import tempfile
 import yaml
 import sys
 from unittest.mock import patch, mock_open, MagicMock
 from openapi_operations import load_openapi_spec, remove_descriptions, remove_extensions, save_openapi_spec
+from openapi_operations import LoadLimits, Projection, SpecLimitError, parse_openapi_spec
 from tests.test_data import (
     VALID_OPENAPI_SPEC,
     OPENAPI_SPEC_WITHOUT_DESCRIPTIONS,
@@ -17,7 +21,9 @@ from tests.test_data import (
 )
 
 # Import the new function
-from openapi_operations import output_openapi_spec_to_stdout
+from openapi_operations import output_openapi_spec_to_stdout, output_openapi_spec_as_ndjson
+from tests.test_data import OPENAPI_SPEC_WITH_REFS
+from compact_nodes import to_builtin
 
 class TestOpenAPIOperations(unittest.TestCase):
     """Test cases for OpenAPI operations in the generate_openapi_subset module."""
@@ -61,23 +67,90 @@ class TestOpenAPIOperations(unittest.TestCase):
         # Verify that all x- properties are removed
         self.assertNotIn('x-logo', result['info'])
 
-    @patch('json.dump')
-    def test_save_openapi_spec_json(self, mock_json_dump):
+    def test_transforms_in_place(self):
+        """Test that the in-place transforms give the same output as the copying ones, in the given tree."""
+        for transform in (remove_descriptions, remove_extensions):
+            with self.subTest(transform=transform.__name__):
+                spec = json.loads(json.dumps(VALID_OPENAPI_SPEC))
+                info = spec['info']
+                result = transform(spec, in_place=True)
+                self.assertIs(result, spec)
+                self.assertIs(result['info'], info)
+                self.assertEqual(json.dumps(result), json.dumps(transform(VALID_OPENAPI_SPEC)))
+
+    def test_save_openapi_spec_json(self):
         """Test saving an OpenAPI spec to a JSON file."""
         test_spec = {"openapi": "3.0.0"}
-        
-        with patch('builtins.open', mock_open()):
-            save_openapi_spec(test_spec, 'test.json')
-            mock_json_dump.assert_called_once()
 
-    @patch('yaml.dump')
-    def test_save_openapi_spec_yaml(self, mock_yaml_dump):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'test.json')
+            self.assertTrue(save_openapi_spec(test_spec, file_path))
+            with open(file_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), json.dumps(test_spec, indent=2))
+            self.assertEqual(os.listdir(directory), ['test.json'])
+
+    def test_save_openapi_spec_yaml(self):
         """Test saving an OpenAPI spec to a YAML file."""
         test_spec = {"openapi": "3.0.0"}
-        
-        with patch('builtins.open', mock_open()):
-            save_openapi_spec(test_spec, 'test.yaml')
-            mock_yaml_dump.assert_called_once()
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'test.yaml')
+            self.assertTrue(save_openapi_spec(test_spec, file_path, use_yaml=False))
+            with open(file_path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), "openapi: 3.0.0\n")
+
+    def test_save_openapi_spec_keeps_format_of_existing_file(self):
+        """Test that the format of an existing file without a known extension is kept."""
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'spec')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write('{"openapi": "3.0.0"}')
+            save_openapi_spec({"openapi": "3.1.0"}, file_path)
+            with open(file_path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f), {"openapi": "3.1.0"})
+
+    def test_save_openapi_spec_skips_unchanged(self):
+        """Test that a file with the same content is left untouched."""
+        test_spec = {"openapi": "3.0.0"}
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'test.json')
+            save_openapi_spec(test_spec, file_path)
+            os.utime(file_path, (0, 0))
+            self.assertFalse(save_openapi_spec(test_spec, file_path))
+            self.assertEqual(os.stat(file_path).st_mtime, 0)
+            self.assertEqual(os.listdir(directory), ['test.json'])
+
+            self.assertTrue(save_openapi_spec({"openapi": "3.1.0"}, file_path))
+            self.assertNotEqual(os.stat(file_path).st_mtime, 0)
+
+    def test_save_openapi_spec_through_symlink(self):
+        """Test that saving to a symbolic link replaces the file it points to and keeps the link."""
+        with tempfile.TemporaryDirectory() as directory:
+            target_path = os.path.join(directory, 'target', 'spec.json')
+            os.mkdir(os.path.dirname(target_path))
+            save_openapi_spec({"openapi": "3.0.0"}, target_path)
+            link_path = os.path.join(directory, 'link.json')
+            os.symlink(target_path, link_path)
+            self.assertTrue(save_openapi_spec({"openapi": "3.1.0"}, link_path))
+            self.assertTrue(os.path.islink(link_path))
+            with open(target_path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f), {"openapi": "3.1.0"})
+            self.assertEqual(sorted(os.listdir(directory)), ['link.json', 'target'])
+            self.assertEqual(os.listdir(os.path.dirname(target_path)), ['spec.json'])
+
+    def test_save_openapi_spec_permissions(self):
+        """Test that a new file gets the permissions of the umask and a replaced file keeps its own."""
+        with tempfile.TemporaryDirectory() as directory:
+            regular_path = os.path.join(directory, 'regular.json')
+            open(regular_path, 'w').close()
+            file_path = os.path.join(directory, 'test.json')
+            save_openapi_spec({"openapi": "3.0.0"}, file_path)
+            self.assertEqual(os.stat(file_path).st_mode, os.stat(regular_path).st_mode)
+
+            os.chmod(file_path, 0o640)
+            save_openapi_spec({"openapi": "3.1.0"}, file_path)
+            self.assertEqual(os.stat(file_path).st_mode & 0o777, 0o640)
 
     @patch('json.dump')
     def test_output_openapi_spec_to_stdout(self, mock_json_dump):
@@ -88,7 +161,7 @@ class TestOpenAPIOperations(unittest.TestCase):
         output_openapi_spec_to_stdout(test_spec)
         
         # Verify json.dump was called with the spec and sys.stdout
-        mock_json_dump.assert_called_once_with(test_spec, sys.stdout, indent=2)
+        mock_json_dump.assert_called_once_with(test_spec, sys.stdout, indent=2, default=to_builtin)
 
     @patch('yaml.dump')
     def test_output_openapi_spec_to_stdout_yaml(self, mock_yaml_dump):
@@ -101,6 +174,282 @@ class TestOpenAPIOperations(unittest.TestCase):
         # Verify yaml.dump was called with the spec and sys.stdout
         mock_yaml_dump.assert_called_once_with(test_spec, sys.stdout, sort_keys=False, default_flow_style=False)
 
+    def test_output_openapi_spec_as_ndjson(self):
+        """Test that each operation is written and flushed as its own JSON line."""
+        stream = MagicMock()
+        count = output_openapi_spec_as_ndjson(OPENAPI_SPEC_WITH_REFS, stream)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(stream.flush.call_count, 2)
+        lines = [json.loads(call.args[0]) for call in stream.write.call_args_list]
+        self.assertEqual(lines[0]['path'], '/tasks/{task_gid}')
+        self.assertEqual(lines[0]['method'], 'get')
+        self.assertEqual(lines[0]['operation'], OPENAPI_SPEC_WITH_REFS['paths']['/tasks/{task_gid}']['get'])
+        self.assertEqual(lines[0]['components'], {
+            'parameters': ['task_path_gid'],
+            'schemas': ['TaskCompact', 'TaskResponse', 'UserCompact']
+        })
+        self.assertEqual(lines[1]['components'], {'schemas': ['UserCompact']})
+
+
+class TestSharedNodes(unittest.TestCase):
+    """Test cases for keeping nodes shared by YAML anchors shared through transforms and output."""
+
+    SHARED_YAML = (b"openapi: 3.0.0\n"
+                   b"a: &shared {type: string, description: Shared, x-internal: true}\n"
+                   b"b: [*shared, *shared]\n")
+
+    def load_shared(self):
+        """Load a spec in which one node occurs three times."""
+        with patch('builtins.open', mock_open(read_data=self.SHARED_YAML)):
+            return load_openapi_spec('test.yaml')
+
+    def test_transforms_keep_sharing(self):
+        """Test that a shared node is transformed once and stays shared."""
+        spec = self.load_shared()
+        for transform, removed in ((remove_descriptions, 'description'), (remove_extensions, 'x-internal')):
+            result = transform(spec)
+            self.assertNotIn(removed, result['a'])
+            self.assertIs(result['b'][0], result['a'])
+            self.assertIs(result['b'][1], result['a'])
+
+    def test_in_place_transforms_keep_sharing(self):
+        """Test that a shared node is transformed in place once and stays shared."""
+        for transform, removed in ((remove_descriptions, 'description'), (remove_extensions, 'x-internal')):
+            spec = self.load_shared()
+            shared = spec['a']
+            result = transform(spec, in_place=True)
+            self.assertNotIn(removed, shared)
+            self.assertIs(result['a'], shared)
+            self.assertIs(result['b'][0], shared)
+            self.assertIs(result['b'][1], shared)
+
+    def test_yaml_output_uses_aliases(self):
+        """Test that shared nodes are output as anchors and aliases unless disabled."""
+        spec = remove_descriptions(self.load_shared())
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            output_openapi_spec_to_stdout(spec, use_yaml=True)
+        self.assertEqual(out.getvalue().count('*id001'), 2)
+        self.assertEqual(yaml.safe_load(out.getvalue()), spec)
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            output_openapi_spec_to_stdout(spec, use_yaml=True, yaml_aliases=False)
+        self.assertNotIn('&id001', out.getvalue())
+        self.assertEqual(out.getvalue().count('type: string'), 3)
+
+
+BILLION_LAUGHS_YAML = b"""openapi: 3.0.0
+a: &a [lol, lol, lol, lol, lol, lol, lol, lol, lol, lol]
+b: &b [*a, *a, *a, *a, *a, *a, *a, *a, *a, *a]
+c: &c [*b, *b, *b, *b, *b, *b, *b, *b, *b, *b]
+d: &d [*c, *c, *c, *c, *c, *c, *c, *c, *c, *c]
+e: &e [*d, *d, *d, *d, *d, *d, *d, *d, *d, *d]
+f: &f [*e, *e, *e, *e, *e, *e, *e, *e, *e, *e]
+g: &g [*f, *f, *f, *f, *f, *f, *f, *f, *f, *f]
+"""
+
+
+class TestLoadLimits(unittest.TestCase):
+    """Test cases for the limits enforced while loading an OpenAPI spec."""
+
+    def load(self, content, **limits):
+        """Load content through a mocked file with the given limits."""
+        with patch('builtins.open', mock_open(read_data=content)):
+            return load_openapi_spec('test.yaml', limits=LoadLimits(**limits))
+
+    def test_alias_bomb_rejected_by_default(self):
+        """Test that an alias bomb fails fast with the default limits."""
+        with self.assertRaises(SpecLimitError):
+            self.load(BILLION_LAUGHS_YAML)
+
+    def test_shared_aliases_within_limits(self):
+        """Test that moderate alias use is accepted and counted with its expansion."""
+        content = b"openapi: 3.0.0\na: &a [1, 2, 3]\nb: [*a, *a]\n"
+        result = self.load(content)
+        self.assertIs(result['b'][0], result['a'])
+        with self.assertRaises(SpecLimitError):
+            self.load(content, max_alias_expansions=7)
+        self.load(content, max_alias_expansions=8)
+
+    def test_recursive_alias_rejected(self):
+        """Test that a recursive alias, which expands infinitely, is rejected."""
+        with self.assertRaises(SpecLimitError):
+            self.load(b"openapi: 3.0.0\na: &a [*a]\n")
+
+    def test_max_input_bytes(self):
+        """Test that oversized inputs are rejected before parsing."""
+        content = get_json_content().encode('utf-8')
+        with self.assertRaises(SpecLimitError):
+            self.load(content, max_input_bytes=len(content) - 1)
+        self.assertEqual(self.load(content, max_input_bytes=len(content)), VALID_OPENAPI_SPEC)
+
+    def test_max_depth(self):
+        """Test the nesting depth limit for YAML, including depth reached through aliases, and JSON."""
+        content = b"openapi: 3.0.0\na: &a {b: {c: 1}}\nd: {e: *a}\n"
+        self.load(content, max_depth=5)
+        with self.assertRaises(SpecLimitError):
+            self.load(content, max_depth=4)
+        with self.assertRaises(SpecLimitError):
+            self.load(get_json_content(), max_depth=3)
+
+    def test_max_nodes(self):
+        """Test the node count limit for YAML and JSON."""
+        with self.assertRaises(SpecLimitError):
+            self.load(get_yaml_content(), max_nodes=10)
+        with self.assertRaises(SpecLimitError):
+            self.load(get_json_content(), max_nodes=10)
+
+
+class TestMappedInput(unittest.TestCase):
+    """Test cases for loading an OpenAPI spec through a memory mapping."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        """Write text to a file in the temporary directory and return its path."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_load_mapped(self):
+        """Test that mapped JSON and YAML files load like read ones."""
+        for name, content in (('spec.json', get_json_content()), ('spec.yaml', get_yaml_content()),
+                              ('spec.txt', get_yaml_content())):
+            with self.subTest(name=name):
+                self.assertEqual(load_openapi_spec(self.write(name, content), use_mmap=True), VALID_OPENAPI_SPEC)
+
+    def test_load_mapped_limits(self):
+        """Test that the input size limit is checked against the mapped file."""
+        content = get_json_content()
+        path = self.write('spec.json', content)
+        with self.assertRaises(SpecLimitError):
+            load_openapi_spec(path, use_mmap=True, limits=LoadLimits(max_input_bytes=len(content) - 1))
+
+    def test_load_mapped_empty_file(self):
+        """Test that an empty file, which cannot be mapped, is rejected as invalid."""
+        with self.assertRaises(ValueError):
+            load_openapi_spec(self.write('spec.json', ''), use_mmap=True)
+
+
+
+class TestProjection(unittest.TestCase):
+    """Test cases for leaving out descriptions and extensions while an OpenAPI spec is loaded."""
+
+    # Merge keys, aliases and a non-string key, which the projection has to handle like the transforms
+    YAML_CONTENT = """
+openapi: 3.0.0
+info: {title: T, version: '1', description: About, x-logo: {url: u}}
+x-base: &base {description: Shared, x-internal: true, type: object}
+paths:
+  /a:
+    get:
+      responses:
+        200: {description: OK, x-ok: 1}
+      requestBody: {<<: *base, required: true}
+components:
+  schemas:
+    Base: *base
+"""
+
+    def assert_projected(self, content, compact=False):
+        """Assert that the projected spec equals the transformed spec, for every combination."""
+        spec = parse_openapi_spec(content, compact=compact)
+        for remove_descriptions_, remove_extensions_ in ((True, False), (False, True), (True, True)):
+            expected = remove_descriptions(spec) if remove_descriptions_ else spec
+            expected = remove_extensions(expected) if remove_extensions_ else expected
+            projection = Projection(remove_descriptions=remove_descriptions_, remove_extensions=remove_extensions_)
+            with self.subTest(projection=projection, compact=compact):
+                projected = parse_openapi_spec(content, compact=compact, projection=projection)
+                self.assertEqual(json.loads(json.dumps(projected, default=to_builtin)),
+                                 json.loads(json.dumps(expected, default=to_builtin)))
+
+    def test_projected_json(self):
+        """Test that projecting JSON gives the same spec as the transforms."""
+        for compact in (False, True):
+            self.assert_projected(json.dumps(OPENAPI_SPEC_WITH_REFS), compact)
+            self.assert_projected(get_json_content(), compact)
+
+    def test_projected_yaml(self):
+        """Test that projecting YAML gives the same spec as the transforms."""
+        for compact in (False, True):
+            self.assert_projected(self.YAML_CONTENT, compact)
+            self.assert_projected(get_yaml_content(), compact)
+
+    def test_projected_yaml_keeps_sharing(self):
+        """Test that an anchored node is projected once and stays shared."""
+        spec = parse_openapi_spec(self.YAML_CONTENT, projection=Projection(remove_extensions=True))
+        self.assertNotIn('x-base', spec)
+        self.assertIs(spec['components']['schemas']['Base'], spec['components']['schemas']['Base'])
+        self.assertEqual(spec['paths']['/a']['get']['requestBody'],
+                         {'description': 'Shared', 'type': 'object', 'required': True})
+
+
+
+class TestJSONScalars(unittest.TestCase):
+    """Test cases for loading YAML with the minimal scalar resolver."""
+
+    def test_scalar_resolution(self):
+        """Test that only null, booleans, integers and floats are recognized in plain scalars."""
+        content = (b"openapi: 3.0.0\n"
+                   b"values: [~, null, '', true, False, 12, -7, 0123, 1.5, 1e3, .5, "
+                   b"2024-01-01, yes, off, 0x1F, 1_000, 12:30, .inf, 3.0.0]\n"
+                   b"responses: {200: {}, '201': {}}\nempty:\n")
+        spec = parse_openapi_spec(content, json_scalars=True)
+        self.assertEqual(spec['values'], [None, None, '', True, False, 12, -7, 123, 1.5, 1000.0, 0.5,
+                                          '2024-01-01', 'yes', 'off', '0x1F', '1_000', '12:30', '.inf', '3.0.0'])
+        self.assertEqual(list(spec['responses']), [200, '201'])
+        self.assertIsNone(spec['empty'])
+        json.dumps(spec)
+        with self.assertRaises(TypeError):
+            json.dumps(parse_openapi_spec(content))
+
+    def test_same_spec_as_default_loader(self):
+        """Test that specs without ambiguous scalars load the same, with merge keys and aliases."""
+        for content in (get_yaml_content(), TestProjection.YAML_CONTENT):
+            with self.subTest(content=content[:20]):
+                self.assertEqual(parse_openapi_spec(content, json_scalars=True), parse_openapi_spec(content))
+        projection = Projection(remove_descriptions=True, remove_extensions=True)
+        self.assertEqual(parse_openapi_spec(TestProjection.YAML_CONTENT, json_scalars=True, projection=projection),
+                         parse_openapi_spec(TestProjection.YAML_CONTENT, projection=projection))
+
+    def test_limits(self):
+        """Test that the loading limits apply in this mode too."""
+        with self.assertRaises(SpecLimitError):
+            parse_openapi_spec(BILLION_LAUGHS_YAML, json_scalars=True)
+        with self.assertRaises(SpecLimitError):
+            parse_openapi_spec(b"openapi: 3.0.0\na: &a [*a]\n", json_scalars=True)
+        with self.assertRaises(SpecLimitError):
+            parse_openapi_spec(b"openapi: 3.0.0\na: &a {b: {c: 1}}\nd: {e: *a}\n", json_scalars=True,
+                               limits=LoadLimits(max_depth=4))
+        with self.assertRaises(ValueError):
+            parse_openapi_spec(b"openapi: [3.0.0\n", json_scalars=True)
+
+    def test_without_libyaml(self):
+        """Test that the mode works with the pure Python parser when PyYAML is built without libyaml."""
+        with patch('openapi_operations._LibYAMLParser', None):
+            self.assertEqual(parse_openapi_spec(TestProjection.YAML_CONTENT, json_scalars=True),
+                             parse_openapi_spec(TestProjection.YAML_CONTENT))
+            self.assertEqual(parse_openapi_spec(b"openapi: 3.0.0\nd: 2024-01-01\n", json_scalars=True)['d'],
+                             '2024-01-01')
+
+    def test_load_file(self):
+        """Test loading YAML files in this mode, read, memory-mapped and compressed."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.yaml')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(get_yaml_content())
+            compressed = path + '.gz'
+            save_openapi_spec(VALID_OPENAPI_SPEC, compressed)
+            for file_path, use_mmap in ((path, False), (path, True), (compressed, False)):
+                with self.subTest(file_path=file_path, use_mmap=use_mmap):
+                    self.assertEqual(load_openapi_spec(file_path, use_mmap=use_mmap, json_scalars=True),
+                                     VALID_OPENAPI_SPEC)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
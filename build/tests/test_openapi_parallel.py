@@ -0,0 +1,62 @@
+"""
+Unit tests for the parallel transformation in the openapi_parallel module.
+"""
+import unittest
+import io
+import json
+from unittest.mock import patch
+import generate_openapi_subset
+from openapi_operations import remove_descriptions, remove_extensions
+from openapi_parallel import write_openapi_spec_parallel
+from tests.test_data import VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS
+
+
+class TestParallelTransform(unittest.TestCase):
+    """Test cases for transforming and serializing a spec with worker processes."""
+
+    def assert_same_output(self, spec, remove_descriptions_=False, remove_extensions_=False, **kwargs):
+        """Assert that the parallel output is byte-identical to transforming and dumping the spec."""
+        expected = spec
+        if remove_descriptions_:
+            expected = remove_descriptions(expected)
+        if remove_extensions_:
+            expected = remove_extensions(expected)
+        stream = io.StringIO()
+        write_openapi_spec_parallel(spec, stream, 2, remove_descriptions=remove_descriptions_,
+                                    remove_extensions=remove_extensions_, **kwargs)
+        self.assertEqual(stream.getvalue(), json.dumps(expected, indent=2))
+
+    def test_same_output(self):
+        """Test the output for every combination of transforms and chunk sizes."""
+        for spec in (VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS):
+            for options in ((False, False), (True, False), (False, True), (True, True)):
+                for chunk_entries in (1, 2, 128):
+                    with self.subTest(options=options, chunk_entries=chunk_entries):
+                        self.assert_same_output(spec, *options, chunk_entries=chunk_entries)
+
+    def test_edge_cases(self):
+        """Test empty containers, removed containers and non-string keys."""
+        self.assert_same_output({})
+        self.assert_same_output({'paths': {}, 'components': {'schemas': {}}})
+        self.assert_same_output({'paths': {'x-internal': {}}, 'components': 'invalid'}, False, True)
+        self.assert_same_output({'components': {'x-extra': {'a': 1}, 'schemas': {'description': {}}}}, True, True)
+        self.assert_same_output({'paths': {'/a': {'responses': {200: {'description': 'OK'}}}}}, True, False)
+
+    @patch('generate_openapi_subset.PARALLEL_MIN_INPUT_BYTES', 0)
+    @patch('generate_openapi_subset.input_size', return_value=1)
+    @patch('generate_openapi_subset.load_openapi_paths_subset', return_value=VALID_OPENAPI_SPEC)
+    @patch('os.access', return_value=True)
+    @patch('os.path.isfile', return_value=True)
+    def test_main_with_jobs(self, mock_isfile, mock_access, mock_load, mock_input_size):
+        """Test that main transforms a subset through the workers with --jobs."""
+        # Without --path, descriptions are left out by the loader instead
+        stdout = io.StringIO()
+        with patch('sys.stdout', stdout):
+            result = generate_openapi_subset.main(['spec.json', '--path', '/test', '--jobs', '2',
+                                                   '--remove-descriptions'])
+        self.assertEqual(result, 0)
+        self.assertEqual(json.loads(stdout.getvalue()), remove_descriptions(VALID_OPENAPI_SPEC))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Unit tests for selecting by JSON pointer in the openapi_pointers module.
+"""
+import unittest
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+import yaml
+import generate_openapi_subset
+from openapi_lazy import load_openapi_pointers_subset
+from openapi_pointers import PointerResolver, parse_json_pointer, select_json_pointers
+from openapi_refs import SelectionNotFoundError
+from tests.test_data import OPENAPI_SPEC_WITH_REFS
+
+TASK_POINTER = '/paths/~1tasks~1{task_gid}'
+
+# Pointers and the components that their selections contain
+SELECTIONS = [
+    ([TASK_POINTER + '/get'], {'schemas': ['TaskResponse', 'TaskCompact', 'UserCompact']}),
+    ([TASK_POINTER], {'parameters': ['task_path_gid'], 'schemas': ['TaskResponse', 'TaskCompact', 'UserCompact']}),
+    (['/components/schemas/UserCompact', '/info'], {'schemas': ['UserCompact']}),
+    (['/paths/~1users~1me/get/responses/200/content'], {'schemas': ['UserCompact']}),
+    (['/security/0/oauth2'], {}),
+]
+
+
+class TestParseJSONPointer(unittest.TestCase):
+    """Test cases for parsing JSON pointers."""
+
+    def test_parse(self):
+        """Test escaped tokens, URI fragments and the empty pointer."""
+        self.assertEqual(parse_json_pointer('/paths/~1tasks~1{task_gid}/get'), ('paths', '/tasks/{task_gid}', 'get'))
+        self.assertEqual(parse_json_pointer('/a~01/~10'), ('a~1', '/0'))
+        self.assertEqual(parse_json_pointer('#/components/schemas/Task%20List'), ('components', 'schemas', 'Task List'))
+        self.assertEqual(parse_json_pointer('/'), ('',))
+        self.assertEqual(parse_json_pointer(''), ())
+        self.assertEqual(parse_json_pointer('#'), ())
+
+    def test_invalid(self):
+        """Test that pointers not starting with '/' are rejected."""
+        for pointer in ('paths', '#paths', '~1tasks'):
+            with self.subTest(pointer=pointer):
+                with self.assertRaises(ValueError):
+                    parse_json_pointer(pointer)
+
+
+class TestPointerResolver(unittest.TestCase):
+    """Test cases for resolving JSON pointers and selecting nodes."""
+
+    def test_resolve(self):
+        """Test resolving mapping keys, array indexes and numeric keys of YAML documents."""
+        resolver = PointerResolver(OPENAPI_SPEC_WITH_REFS)
+        self.assertIs(resolver.resolve(TASK_POINTER), OPENAPI_SPEC_WITH_REFS['paths']['/tasks/{task_gid}'])
+        self.assertEqual(resolver.resolve('/tags/1/name'), 'users')
+        self.assertIs(resolver.resolve(''), OPENAPI_SPEC_WITH_REFS)
+        yaml_spec = yaml.safe_load(yaml.dump(OPENAPI_SPEC_WITH_REFS).replace("'200'", '200'))
+        self.assertIn('content', PointerResolver(yaml_spec).resolve('/paths/~1users~1me/get/responses/200'))
+
+    def test_not_found(self):
+        """Test that pointers to missing nodes fail, including invalid array indexes."""
+        resolver = PointerResolver(OPENAPI_SPEC_WITH_REFS)
+        for pointer in ('/paths/~1missing', '/tags/2', '/tags/01', '/tags/-', '/info/title/x'):
+            with self.subTest(pointer=pointer):
+                with self.assertRaisesRegex(SelectionNotFoundError, 'JSON pointer not found'):
+                    resolver.resolve(pointer)
+
+    def test_select(self):
+        """Test that selections contain the nodes and their $ref closure, in document order."""
+        for pointers, components in SELECTIONS:
+            with self.subTest(pointers=pointers):
+                selection = select_json_pointers(OPENAPI_SPEC_WITH_REFS, pointers)
+                selected = {kind: list(names) for kind, names in selection.get('components', {}).items()}
+                expected = {kind: [name for name in OPENAPI_SPEC_WITH_REFS['components'][kind] if name in names]
+                            for kind, names in components.items()}
+                self.assertEqual(selected, expected)
+                keys = list(selection)
+                self.assertEqual(keys, [key for key in OPENAPI_SPEC_WITH_REFS if key in keys])
+
+    def test_select_shares_nodes(self):
+        """Test that selected nodes are shared with the spec and the spec is left unchanged."""
+        original = json.dumps(OPENAPI_SPEC_WITH_REFS)
+        selection = select_json_pointers(OPENAPI_SPEC_WITH_REFS, [TASK_POINTER + '/get', '/info'])
+        self.assertIs(selection['info'], OPENAPI_SPEC_WITH_REFS['info'])
+        self.assertEqual(list(selection['paths']['/tasks/{task_gid}']), ['get'])
+        self.assertEqual(json.dumps(OPENAPI_SPEC_WITH_REFS), original)
+
+    def test_select_ancestors(self):
+        """Test that selecting a node and one of its ancestors selects the ancestor in full."""
+        spec = OPENAPI_SPEC_WITH_REFS
+        self.assertIs(select_json_pointers(spec, [TASK_POINTER + '/get', '/paths'])['paths'], spec['paths'])
+        self.assertIs(select_json_pointers(spec, ['/info', '']), spec)
+
+    def test_missing_refs_are_ignored(self):
+        """Test that references to missing components do not fail a selection."""
+        spec = {'paths': {'/a': {'$ref': '#/components/schemas/Missing'}}, 'components': {'schemas': {}}}
+        self.assertEqual(select_json_pointers(spec, ['/paths/~1a']), {'paths': {'/a': spec['paths']['/a']}})
+
+    def test_lookups_are_cached(self):
+        """Test that a resolver does not walk the nodes it resolved before again."""
+        resolver = PointerResolver(OPENAPI_SPEC_WITH_REFS)
+        expected = resolver.select([TASK_POINTER + '/get'])
+        with patch.object(PointerResolver, '_child', side_effect=AssertionError('walked again')):
+            self.assertEqual(resolver.select([TASK_POINTER + '/get']), expected)
+            self.assertEqual(resolver.select(['/components/schemas/TaskCompact']),
+                             {'openapi': OPENAPI_SPEC_WITH_REFS['openapi'], 'info': OPENAPI_SPEC_WITH_REFS['info'],
+                              'components': {'schemas': {'TaskCompact': OPENAPI_SPEC_WITH_REFS['components']
+                                                         ['schemas']['TaskCompact']}}})
+
+
+class TestSelectOption(unittest.TestCase):
+    """Test cases for loading selections from files and the --select option."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'spec.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(OPENAPI_SPEC_WITH_REFS, f, indent=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lazy_selection_matches_full(self):
+        """Test that selections decoded lazily from JSON files equal those of the loaded spec."""
+        yaml_path = os.path.join(self.directory.name, 'spec.yaml')
+        with open(yaml_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(OPENAPI_SPEC_WITH_REFS, f, sort_keys=False)
+        for pointers, _ in SELECTIONS + [([''], {})]:
+            expected = json.dumps(select_json_pointers(OPENAPI_SPEC_WITH_REFS, pointers))
+            for path in (self.path, yaml_path):
+                with self.subTest(pointers=pointers, path=path):
+                    self.assertEqual(json.dumps(load_openapi_pointers_subset(path, pointers)), expected)
+        with self.assertRaises(SelectionNotFoundError):
+            load_openapi_pointers_subset(self.path, ['/paths/~1missing'])
+
+    def test_select_option(self):
+        """Test the --select option and its validation."""
+        stdout = io.StringIO()
+        with patch('sys.stdout', stdout):
+            result = generate_openapi_subset.main([self.path, '--select', '/paths/~1users~1me/get',
+                                                   '--select', '/info/title'])
+        self.assertEqual(result, 0)
+        output = json.loads(stdout.getvalue())
+        # The selection is an OpenAPI document
+        self.assertEqual(list(output), ['openapi', 'info', 'paths', 'components'])
+        self.assertEqual(output['info'], OPENAPI_SPEC_WITH_REFS['info'])
+        self.assertEqual(list(output['components']['schemas']), ['UserCompact'])
+
+        self.assertEqual(generate_openapi_subset.main([self.path, '--select', '/paths/~1missing']), 1)
+        with patch('sys.stderr', io.StringIO()):
+            self.assertEqual(generate_openapi_subset.main([self.path, '--select', 'info']), 2)
+            self.assertEqual(generate_openapi_subset.main([self.path, '--select', '/info', '--path', '/users/me']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
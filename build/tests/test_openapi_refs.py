@@ -0,0 +1,104 @@
+"""
+Unit tests for the reference graph and subset extraction in the openapi_refs module.
+"""
+import unittest
+import os
+import json
+import tempfile
+from openapi_refs import (
+    parse_component_ref,
+    collect_component_refs,
+    build_reference_graph,
+    resolve_component_closure,
+    extract_operations_subset,
+    split_openapi_spec,
+    shard_file_names
+)
+from openapi_operations import write_openapi_spec_shards
+from tests.test_data import OPENAPI_SPEC_WITH_REFS, OPENAPI_SPEC_WITH_WEBHOOKS
+
+
+class TestReferenceGraph(unittest.TestCase):
+    """Test cases for building and traversing the reference graph."""
+
+    def test_parse_component_ref(self):
+        """Test parsing local component references, including escaped tokens."""
+        self.assertEqual(parse_component_ref('#/components/schemas/Task'), ('schemas', 'Task'))
+        self.assertEqual(parse_component_ref('#/components/schemas/a~1b~0c'), ('schemas', 'a/b~c'))
+        self.assertIsNone(parse_component_ref('other.yaml#/components/schemas/Task'))
+        self.assertIsNone(parse_component_ref('#/paths/~1tasks'))
+
+    def test_collect_component_refs(self):
+        """Test collecting the components directly referenced from a subtree."""
+        refs = collect_component_refs(OPENAPI_SPEC_WITH_REFS['components']['schemas']['TaskResponse'])
+        self.assertEqual(refs, {('schemas', 'TaskCompact'), ('schemas', 'UserCompact')})
+
+    def test_resolve_component_closure(self):
+        """Test that the closure follows references transitively."""
+        graph = build_reference_graph(OPENAPI_SPEC_WITH_REFS)
+        closure = resolve_component_closure(graph, {('schemas', 'TaskResponse')})
+        self.assertEqual(closure, {('schemas', 'TaskResponse'), ('schemas', 'TaskCompact'), ('schemas', 'UserCompact')})
+
+    def test_resolve_component_closure_with_cycle(self):
+        """Test that cyclic references terminate."""
+        graph = {('schemas', 'A'): {('schemas', 'B')}, ('schemas', 'B'): {('schemas', 'A')}}
+        self.assertEqual(resolve_component_closure(graph, {('schemas', 'A')}), {('schemas', 'A'), ('schemas', 'B')})
+
+
+class TestSubsetExtraction(unittest.TestCase):
+    """Test cases for extracting and splitting subsets."""
+
+    def test_extract_operations_subset(self):
+        """Test that a subset only contains the reached components and used security schemes."""
+        subset = extract_operations_subset(OPENAPI_SPEC_WITH_REFS, {'/users/me': ['get']})
+        self.assertEqual(list(subset['paths']), ['/users/me'])
+        self.assertEqual(subset['components']['schemas'], {'UserCompact': {"type": "object", "properties": {"gid": {"type": "string"}}}})
+        self.assertNotIn('parameters', subset['components'])
+        self.assertEqual(list(subset['components']['securitySchemes']), ['oauth2', 'personalAccessToken'])
+        self.assertEqual(subset['tags'], [{"name": "users"}])
+
+    def test_webhook_references(self):
+        """Test that the components referenced from other top-level properties are kept."""
+        for operations in ({'/users/me': ['get']}, {}):
+            with self.subTest(operations=operations):
+                subset = extract_operations_subset(OPENAPI_SPEC_WITH_WEBHOOKS, operations)
+                self.assertIs(subset['webhooks'], OPENAPI_SPEC_WITH_WEBHOOKS['webhooks'])
+                self.assertEqual(list(subset['components']['requestBodies']), ['TaskEvent'])
+                self.assertIn('Unused', subset['components']['schemas'])
+
+    def test_split_by_tag(self):
+        """Test splitting by tag keeps path-level parameters and their components."""
+        shards = split_openapi_spec(OPENAPI_SPEC_WITH_REFS, 'tag')
+        self.assertEqual(list(shards), ['tasks', 'users'])
+        tasks = shards['tasks']
+        self.assertEqual(list(tasks['paths']), ['/tasks/{task_gid}'])
+        self.assertIn('task_path_gid', tasks['components']['parameters'])
+        self.assertEqual(list(tasks['components']['schemas']), ['TaskResponse', 'TaskCompact', 'UserCompact'])
+
+    def test_split_by_path_prefix(self):
+        """Test splitting by the first path segment."""
+        shards = split_openapi_spec(OPENAPI_SPEC_WITH_REFS, 'path-prefix')
+        self.assertEqual(list(shards), ['tasks', 'users'])
+
+    def test_split_invalid_mode(self):
+        """Test that an unsupported split mode is rejected."""
+        with self.assertRaises(ValueError):
+            split_openapi_spec(OPENAPI_SPEC_WITH_REFS, 'operation')
+
+    def test_shard_file_names(self):
+        """Test that shard file names are sanitized and unique."""
+        names = shard_file_names(['Tasks', 'tasks', 'a/b'], '.json')
+        self.assertEqual(names, {'Tasks': 'Tasks.json', 'tasks': 'tasks_2.json', 'a/b': 'a_b.json'})
+
+    def test_write_openapi_spec_shards(self):
+        """Test that every shard is written to its own file."""
+        shards = split_openapi_spec(OPENAPI_SPEC_WITH_REFS, 'tag')
+        with tempfile.TemporaryDirectory() as output_dir:
+            paths = write_openapi_spec_shards(shards, output_dir, max_workers=2)
+            self.assertEqual(sorted(os.listdir(output_dir)), ['tasks.json', 'users.json'])
+            with open(paths['users'], encoding='utf-8') as f:
+                self.assertEqual(json.load(f), shards['users'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Unit tests for the filter rules in the openapi_rules module.
+"""
+import unittest
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+import generate_openapi_subset
+from openapi_operations import remove_descriptions, remove_extensions
+from openapi_rules import FilterRules, filter_rules_from_options, parse_condition, parse_rule
+from tests.test_data import VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS
+
+
+class TestFilterRules(unittest.TestCase):
+    """Test cases for compiling and applying filter rules."""
+
+    def test_parse_rule(self):
+        """Test splitting rules into unescaped segments."""
+        self.assertEqual(parse_rule('/paths/~1users~1me/get'), ['paths', '/users/me', 'get'])
+        self.assertEqual(parse_rule('**/x-*'), ['**', 'x-*'])
+        for pattern in ('', '/', '/paths//get'):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    parse_rule(pattern)
+
+    def test_removal_options_as_rules(self):
+        """Test that the removal options compiled as rules give the same result as the transforms."""
+        for spec in (VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS):
+            with self.subTest(spec=spec['info']):
+                self.assertEqual(filter_rules_from_options(None, None, remove_descriptions=True).apply(spec),
+                                 remove_descriptions(spec))
+                self.assertEqual(filter_rules_from_options(None, None, remove_extensions=True).apply(spec),
+                                 remove_extensions(spec))
+
+    def test_globs_and_indices(self):
+        """Test literal, glob, '**' and list index segments."""
+        spec = {
+            'paths': {'/a': {'get': {'deprecated': True, 'tags': ['x', 'y']}, 'x-a': 1}},
+            'x-top': {'x-nested': 1},
+            'info': {'title': 'T'},
+        }
+        rules = FilterRules(drop=['/paths/*/get/deprecated', '/paths/**/tags/0', '/**/x-*'])
+        self.assertEqual(rules.apply(spec), {'paths': {'/a': {'get': {'tags': ['y']}}}, 'info': {'title': 'T'}})
+        self.assertEqual(FilterRules(drop=['/paths/**']).apply(spec), {'x-top': {'x-nested': 1}, 'info': {'title': 'T'}})
+
+    def test_keep_overrides_drop(self):
+        """Test an extension allow list made of a drop rule and a keep rule."""
+        spec = {'info': {'x-readme': {'x-internal': 1}, 'x-internal': 2, 'title': 'T'}}
+        rules = FilterRules(drop=['/**/x-*'], keep=['/**/x-readme'])
+        self.assertEqual(rules.apply(spec), {'info': {'x-readme': {}, 'title': 'T'}})
+
+    def test_parse_condition(self):
+        """Test splitting conditions off rules, with JSON and string values."""
+        self.assertEqual(parse_condition('/paths/*/*[deprecated=true]'), ('/paths/*/*', ('deprecated', True)))
+        self.assertEqual(parse_condition('/**[type=string]'), ('/**', ('type', 'string')))
+        self.assertEqual(parse_condition('/**/x-[ab]'), ('/**/x-[ab]', None))
+
+    def test_conditions(self):
+        """Test dropping the deprecated operations, and keeping some of them with a conditional keep rule."""
+        spec = {'paths': {
+            '/a': {'get': {'deprecated': True, 'operationId': 'a'}, 'put': {'deprecated': 1}},
+            '/b': {'get': {'deprecated': False}, 'post': {'deprecated': True, 'x-keep': 'yes'}},
+        }}
+        rules = FilterRules(drop=['/paths/*/*[deprecated=true]'])
+        self.assertEqual(rules.apply(spec), {'paths': {'/a': {'put': {'deprecated': 1}},
+                                                       '/b': {'get': {'deprecated': False}}}})
+        rules = FilterRules(drop=['/paths/*/*[deprecated=true]'], keep=['/paths/**[x-keep=yes]'])
+        self.assertEqual(list(rules.apply(spec)['paths']['/b']), ['get', 'post'])
+        rules = FilterRules(drop=['/paths/*/*'], keep=['/paths/*/*[operationId="a"]'])
+        self.assertEqual(rules.apply(spec), {'paths': {'/a': {'get': spec['paths']['/a']['get']}, '/b': {}}})
+
+    def test_unmatched_parts_are_shared(self):
+        """Test that the input is left unchanged and parts no rule can match are not copied."""
+        spec = json.loads(json.dumps(OPENAPI_SPEC_WITH_REFS))
+        original = json.dumps(spec)
+        result = FilterRules(drop=['/paths/*/get/summary']).apply(spec)
+        self.assertEqual(json.dumps(spec), original)
+        self.assertIs(result['components'], spec['components'])
+
+    def test_drop_option(self):
+        """Test that --keep makes exceptions to --remove-extensions."""
+        spec = dict(VALID_OPENAPI_SPEC, **{'x-readme': {'a': 1}, 'x-other': 2})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(spec, f)
+            stdout = io.StringIO()
+            with patch('sys.stdout', stdout):
+                result = generate_openapi_subset.main([path, '--remove-extensions', '--keep', '/x-readme'])
+            self.assertEqual(result, 0)
+            output = json.loads(stdout.getvalue())
+            self.assertEqual(output['x-readme'], {'a': 1})
+            self.assertNotIn('x-other', output)
+            self.assertEqual(generate_openapi_subset.main([path, '--drop', '/paths//get']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for profiling runs in the profiling module.
+"""
+import unittest
+import io
+import os
+import re
+import pstats
+import tempfile
+from unittest.mock import patch
+import generate_openapi_subset
+from profiling import collapsed_stacks, profile_call
+from tests.test_data import get_json_content
+
+MAIN = ('main.py', 1, 'main')
+LOAD = ('load.py', 1, 'load')
+PARSE = ('load.py', 10, 'parse')
+LEN = ('~', 0, "<built-in method builtins.len>")
+
+# main (1 s own) calls load twice and len once; load (2 s own) calls parse, which recurses
+PROFILE_STATS = {
+    MAIN: (1, 1, 1.0, 8.0, {}),
+    LOAD: (2, 2, 2.0, 6.5, {MAIN: (2, 2, 2.0, 6.5)}),
+    PARSE: (2, 6, 4.5, 4.5, {LOAD: (2, 2, 3.0, 4.5), PARSE: (4, 4, 1.5, 1.5)}),
+    LEN: (1, 1, 0.5, 0.5, {MAIN: (1, 1, 0.5, 0.5)}),
+}
+
+
+def work():
+    """Allocate and compute something to profile."""
+    data = [list(range(100)) for _ in range(100)]
+    return sum(len(item) for item in data)
+
+
+class TestCollapsedStacks(unittest.TestCase):
+    """Test cases for rebuilding call stacks from cProfile statistics."""
+
+    def test_stacks(self):
+        """Test that own times are attributed to stacks and recursive calls are folded."""
+        stacks = collapsed_stacks(PROFILE_STATS)
+        self.assertEqual(dict(stacks), {
+            (MAIN,): 1.0,
+            (MAIN, LOAD): 2.0,
+            (MAIN, LOAD, PARSE): 4.5,
+            (MAIN, LEN): 0.5,
+        })
+
+    def test_shared_callee(self):
+        """Test that a function called from two callers splits its callees between both stacks."""
+        other = ('main.py', 5, 'other')
+        stats = {
+            MAIN: (1, 1, 0.0, 4.0, {}),
+            other: (1, 1, 0.0, 1.0, {MAIN: (1, 1, 0.0, 1.0)}),
+            LOAD: (4, 4, 0.0, 4.0, {MAIN: (3, 3, 0.0, 3.0), other: (1, 1, 0.0, 1.0)}),
+            PARSE: (4, 4, 4.0, 4.0, {LOAD: (4, 4, 4.0, 4.0)}),
+        }
+        stacks = collapsed_stacks(stats)
+        self.assertAlmostEqual(stacks[(MAIN, LOAD, PARSE)], 3.0)
+        self.assertAlmostEqual(stacks[(MAIN, other, LOAD, PARSE)], 1.0)
+
+
+class TestProfileCall(unittest.TestCase):
+    """Test cases for profiling a call."""
+
+    def test_profile_files(self):
+        """Test that the profile is written as pstats and collapsed stacks."""
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, 'profiles', 'run')
+            self.assertEqual(profile_call(work, prefix), 10000)
+            stats = pstats.Stats(prefix + '.pstats')
+            self.assertTrue(any(name == 'work' for _, _, name in stats.stats))
+            with open(prefix + '.collapsed', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            self.assertTrue(lines)
+            for line in lines:
+                self.assertRegex(line, r'^[^;]+(;[^;]+)* \d+$')
+            self.assertTrue(any(re.match(r'^work \(test_profiling\.py:\d+\)', line) for line in lines))
+            self.assertFalse(os.path.exists(prefix + '.tracemalloc.txt'))
+
+    def test_trace_memory(self):
+        """Test that the allocation sites are reported with memory tracing."""
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, 'run')
+            profile_call(work, prefix, trace_memory=True, top_allocations=3)
+            with open(prefix + '.tracemalloc.txt', encoding='utf-8') as f:
+                report = f.read()
+            self.assertTrue(report.startswith('Peak traced memory: '))
+            self.assertEqual(len(re.findall(r'^#\d+: ', report, re.MULTILINE)), 3)
+            self.assertIn('test_profiling.py', report)
+
+    def test_failing_call(self):
+        """Test that the profile is written when the call raises."""
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, 'run')
+            with self.assertRaises(ZeroDivisionError):
+                profile_call(lambda: 1 / 0, prefix)
+            self.assertTrue(os.path.exists(prefix + '.pstats'))
+            self.assertTrue(os.path.exists(prefix + '.collapsed'))
+
+    def test_main_with_profile(self):
+        """Test that main profiles the generation of a subset and of an index."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(get_json_content())
+            prefix = os.path.join(directory, 'run')
+            with patch('sys.stdout', io.StringIO()):
+                self.assertEqual(generate_openapi_subset.main([path, '--profile', prefix, '--profile-memory']), 0)
+                self.assertEqual(generate_openapi_subset.main([os.path.join(directory, 'missing.json'),
+                                                               '--profile', prefix]), 1)
+            for suffix in ('.pstats', '.collapsed', '.tracemalloc.txt'):
+                self.assertTrue(os.path.exists(prefix + suffix))
+            with open(prefix + '.collapsed', encoding='utf-8') as f:
+                self.assertIn('run_subset_command', f.read())
+
+            index_prefix = os.path.join(directory, 'index')
+            self.assertEqual(generate_openapi_subset.main(['index', path, '--profile', index_prefix]), 0)
+            self.assertTrue(os.path.exists(index_prefix + '.pstats'))
+
+            with patch('sys.stderr', io.StringIO()):
+                self.assertEqual(generate_openapi_subset.main([path, '--profile-memory']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
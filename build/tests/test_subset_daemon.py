@@ -0,0 +1,195 @@
+"""
+Unit tests for the local daemon in the subset_daemon and daemon_client modules.
+"""
+import unittest
+import io
+import os
+import json
+import socket
+import tempfile
+import threading
+from unittest.mock import patch
+import generate_openapi_subset
+from daemon_client import NO_DAEMON_ENV, SOCKET_ENV, daemon_socket_path, delegate_to_daemon, send_frame
+from openapi_operations import LoadLimits, Projection
+from subset_daemon import SpecCache, SubsetDaemon
+from tests.test_data import VALID_OPENAPI_SPEC, OPENAPI_SPEC_WITH_REFS, get_json_content
+
+
+def captured_stream():
+    """Return a text stream over a bytes buffer, like the standard streams of the console."""
+    return io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+
+
+class TestSpecCache(unittest.TestCase):
+    """Test cases for the cache of loaded specifications."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'spec.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(get_json_content())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hits(self):
+        """Test that a specification is loaded once per file version and options."""
+        cache = SpecCache()
+        spec = cache.load(self.path)
+        self.assertEqual(spec, VALID_OPENAPI_SPEC)
+        self.assertIs(cache.load(self.path, limits=LoadLimits()), spec)
+        self.assertIsNot(cache.load(self.path, projection=Projection(remove_descriptions=True)), spec)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+
+    def test_file_changes(self):
+        """Test that a changed file is loaded again and its older versions are dropped."""
+        cache = SpecCache()
+        cache.load(self.path)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(OPENAPI_SPEC_WITH_REFS, f)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(cache.load(self.path), OPENAPI_SPEC_WITH_REFS)
+        self.assertEqual((cache.misses, len(cache)), (2, 1))
+
+    def test_least_recently_used(self):
+        """Test that the least recently used specification is dropped when the cache is full."""
+        cache = SpecCache(max_entries=2)
+        first = cache.load(self.path)
+        cache.load(self.path, compact=True)
+        cache.load(self.path)
+        cache.load(self.path, json_scalars=True)
+        self.assertIs(cache.load(self.path), first)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 3, 2))
+
+
+class TestDaemon(unittest.TestCase):
+    """Test cases for running the console application in the daemon."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, 'daemon.sock')
+        with open(os.path.join(self.directory.name, 'spec.json'), 'w', encoding='utf-8') as f:
+            json.dump(OPENAPI_SPEC_WITH_REFS, f)
+        self.server = SubsetDaemon(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def delegate(self, argv):
+        """Run a command line in the daemon from the directory of the spec and return (exit code, stdout)."""
+        stdout, stderr = captured_stream(), captured_stream()
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            with patch('sys.stdout', stdout), patch('sys.stderr', stderr):
+                exit_code = delegate_to_daemon(argv, self.socket_path)
+        finally:
+            os.chdir(cwd)
+        stdout.seek(0)
+        stderr.seek(0)
+        self.stderr = stderr.read()
+        return exit_code, stdout.read()
+
+    def test_run(self):
+        """Test that the output and the exit code are streamed back and the spec is cached."""
+        exit_code, output = self.delegate(['spec.json'])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(json.loads(output), OPENAPI_SPEC_WITH_REFS)
+
+        exit_code, output = self.delegate(['spec.json', '--path', '/users/me'])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(list(json.loads(output)['paths']), ['/users/me'])
+        self.assertEqual((self.server.spec_cache.hits, self.server.spec_cache.misses), (1, 1))
+
+    def test_errors(self):
+        """Test the exit codes of failing runs."""
+        self.assertEqual(self.delegate(['missing.json']), (1, ''))
+        self.assertEqual(self.delegate(['spec.json', '--unknown'])[0], 2)
+
+    def test_same_output_as_in_process(self):
+        """Test that usage errors and log records of the daemon read as those of the console application."""
+        stderr = io.StringIO()
+        with patch('sys.argv', ['generate_openapi_subset.py']), patch('sys.stderr', stderr):
+            self.assertEqual(generate_openapi_subset.main(['spec.json', '--unknown']), 2)
+        with patch('sys.argv', ['subset_daemon.py']):
+            self.assertEqual(self.delegate(['spec.json', '--unknown'])[0], 2)
+        self.assertEqual(self.stderr, stderr.getvalue())
+        self.assertTrue(self.stderr.startswith('usage: generate_openapi_subset.py '))
+        self.delegate(['missing.json'])
+        self.assertIn(' - __main__ - ERROR - ', self.stderr)
+
+    def test_in_process(self):
+        """Test the runs that the client leaves to the console application."""
+        self.assertIsNone(delegate_to_daemon(['-'], self.socket_path))
+        self.assertIsNone(delegate_to_daemon(['spec.json'], os.path.join(self.directory.name, 'none.sock')))
+        with patch.dict(os.environ, {NO_DAEMON_ENV: '1'}):
+            self.assertIsNone(delegate_to_daemon(['spec.json'], self.socket_path))
+
+    def test_socket(self):
+        """Test the default socket path and that a listening daemon is not replaced."""
+        with patch.dict(os.environ, {SOCKET_ENV: self.socket_path}):
+            self.assertEqual(daemon_socket_path(), self.socket_path)
+        with self.assertRaises(OSError):
+            SubsetDaemon(self.socket_path)
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+
+    def test_foreign_socket(self):
+        """Test that the client does not connect to a path that is not a socket of the current user."""
+        stderr = captured_stream()
+        with patch('sys.stderr', stderr):
+            with patch('os.getuid', return_value=os.getuid() + 1):
+                self.assertIsNone(delegate_to_daemon(['spec.json'], self.socket_path))
+            file_path = os.path.join(self.directory.name, 'spec.json')
+            self.assertIsNone(delegate_to_daemon(['spec.json'], file_path))
+            with patch('daemon_client._peer_is_current_user', return_value=False):
+                self.assertIsNone(delegate_to_daemon(['spec.json'], self.socket_path))
+        stderr.seek(0)
+        self.assertEqual(stderr.read().count('Warning: Ignoring'), 3)
+        self.assertEqual(self.server.spec_cache.misses, 0)
+
+    def test_protocol_error(self):
+        """Test that a response on an unknown channel is reported as an error."""
+        socket_path = os.path.join(self.directory.name, 'other.sock')
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        listener.listen(1)
+
+        def answer():
+            connection, _ = listener.accept()
+            with connection:
+                connection.makefile('rb').readline()
+                send_frame(connection, b'z', b'data')
+
+        thread = threading.Thread(target=answer)
+        thread.start()
+        stdout, stderr = captured_stream(), captured_stream()
+        try:
+            with patch('sys.stdout', stdout), patch('sys.stderr', stderr):
+                self.assertEqual(delegate_to_daemon(['spec.json'], socket_path), 1)
+        finally:
+            thread.join()
+            listener.close()
+        stderr.seek(0)
+        self.assertIn("Unexpected channel b'z'", stderr.read())
+
+    def test_stale_socket(self):
+        """Test that a socket file that no daemon listens on is replaced."""
+        stale_path = os.path.join(self.directory.name, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(stale_path)
+        stale.close()
+        self.assertIsNone(delegate_to_daemon(['spec.json'], stale_path))
+        server = SubsetDaemon(stale_path)
+        server.server_close()
+        self.assertFalse(os.path.exists(stale_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
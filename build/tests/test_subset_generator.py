@@ -0,0 +1,110 @@
+"""
+Unit tests for the in-process API in the subset_generator module.
+"""
+import unittest
+import io
+import os
+import copy
+import gzip
+import json
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import generate_openapi_subset
+from subset_generator import SubsetGenerator
+from openapi_operations import remove_descriptions, remove_extensions
+from tests.test_data import (
+    VALID_OPENAPI_SPEC,
+    OPENAPI_SPEC_WITHOUT_DESCRIPTIONS,
+    OPENAPI_SPEC_WITH_REFS,
+    get_json_content
+)
+
+
+class TestSubsetGenerator(unittest.TestCase):
+    """Test cases for the SubsetGenerator class."""
+
+    def test_generate_from_dict(self):
+        """Test generating subsets from an already loaded spec without modifying it."""
+        spec = copy.deepcopy(VALID_OPENAPI_SPEC)
+        generator = SubsetGenerator(spec)
+        self.assertEqual(generator.generate(), VALID_OPENAPI_SPEC)
+        self.assertEqual(generator.generate(remove_descriptions=True), OPENAPI_SPEC_WITHOUT_DESCRIPTIONS)
+        self.assertEqual(generator.generate(remove_descriptions=True, remove_extensions=True),
+                         remove_extensions(OPENAPI_SPEC_WITHOUT_DESCRIPTIONS))
+        self.assertEqual(spec, VALID_OPENAPI_SPEC)
+
+    def test_generate_from_path(self):
+        """Test loading the spec from a file once."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(get_json_content())
+            generator = SubsetGenerator(path)
+        self.assertEqual(generator.generate(), VALID_OPENAPI_SPEC)
+
+    def test_unsupported_source(self):
+        """Test that a source that is neither a path nor a spec is rejected."""
+        with self.assertRaises(ValueError):
+            SubsetGenerator(['openapi'])
+
+    def test_output(self):
+        """Test serializing subsets to bytes, compressed bytes and text streams."""
+        generator = SubsetGenerator(VALID_OPENAPI_SPEC)
+        expected = json.dumps(VALID_OPENAPI_SPEC, indent=2).encode('utf-8')
+        self.assertEqual(generator.to_bytes(), expected)
+        self.assertEqual(gzip.decompress(generator.to_bytes(compression='gzip')), expected)
+        stream = io.StringIO()
+        generator.write(stream, use_yaml=True, remove_descriptions=True)
+        self.assertNotIn('description', stream.getvalue())
+
+    def test_size_budget(self):
+        """Test that the size budget is reported, and enforced by generate()."""
+        generator = SubsetGenerator(OPENAPI_SPEC_WITH_REFS)
+        spec, report = generator.generate_with_report(max_bytes=2000)
+        self.assertTrue(report["fits"])
+        self.assertLessEqual(len(json.dumps(spec, indent=2)), 2000)
+        self.assertIsNone(generator.generate_with_report()[1])
+        with self.assertRaises(ValueError):
+            generator.generate(max_bytes=10)
+
+    def test_split(self):
+        """Test splitting a subset into shards."""
+        shards = SubsetGenerator(OPENAPI_SPEC_WITH_REFS).split('tag', remove_descriptions=True)
+        self.assertTrue(shards)
+        for shard in shards.values():
+            self.assertEqual(shard, remove_descriptions(shard))
+
+    def test_concurrent_calls(self):
+        """Test that concurrent calls with different options give the same results as sequential ones."""
+        generator = SubsetGenerator(OPENAPI_SPEC_WITH_REFS)
+        options = [{}, {'remove_descriptions': True}, {'remove_extensions': True}, {'max_bytes': 2000}] * 8
+        expected = [generator.to_bytes(**kwargs) for kwargs in options]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda kwargs: generator.to_bytes(**kwargs), options))
+        self.assertEqual(results, expected)
+
+
+class TestEmbeddedMain(unittest.TestCase):
+    """Test cases for running the console application in-process with main(argv)."""
+
+    def test_main_with_argv(self):
+        """Test that main(argv) returns exit codes without configuring logging."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spec.json')
+            output = os.path.join(directory, 'subset.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(get_json_content())
+            with patch.object(logging, 'basicConfig') as mock_basic_config:
+                self.assertEqual(generate_openapi_subset.main([path, '-o', output]), 0)
+                with open(output, encoding='utf-8') as f:
+                    self.assertEqual(json.load(f), VALID_OPENAPI_SPEC)
+                self.assertEqual(generate_openapi_subset.main([os.path.join(directory, 'missing.json')]), 1)
+                with patch('sys.stderr', io.StringIO()):
+                    self.assertEqual(generate_openapi_subset.main([path, '--unknown']), 2)
+            mock_basic_config.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()